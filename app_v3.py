@@ -1,8 +1,18 @@
-import io
-import re
-import pandas as pd
+import json
+import os
+from contextlib import nullcontext
+
 import streamlit as st
-from typing import List, Dict, Optional, Tuple
+
+from lab_reader import LabResultParser, TesseractNotFoundError, metrics, profiling
+from lab_reader.export import EXCEL_MIME, PARQUET_MIME, lazy_export, parquet_available
+from lab_reader.dedup import AnalyteDeduplicator
+from lab_reader.frame import concat_results
+from lab_reader.metrics import page_frame, timing_frame
+from lab_reader.pipeline import UPLOAD_TYPES, file_extension, iter_page_results, list_input_files
+from lab_reader.session import FileResults, file_key
+from lab_reader.store import ResultStore, default_store_dir, report_info
+from ui_jobs import current_job, forget_job, show_job
 
 # ---------------- UI ----------------
 st.set_page_config(page_title="Čitač nalaza – v3 (univerzalni)", page_icon="🧪", layout="wide")
@@ -29,58 +39,8 @@ pip install pytesseract pillow pymupdf
 ```
 """)
 
-# ---------------- PDF text extraction ----------------
-def extract_pdf_text_native(file_bytes: bytes) -> str:
-    text = ""
-    try:
-        import pdfplumber
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for p in pdf.pages:
-                text += (p.extract_text() or "") + "\n"
-        if text.strip():
-            return text
-    except Exception:
-        pass
-    try:
-        from PyPDF2 import PdfReader
-        r = PdfReader(io.BytesIO(file_bytes))
-        for p in r.pages:
-            text += (p.extract_text() or "") + "\n"
-        if text.strip():
-            return text
-    except Exception:
-        pass
-    return ""
-
-# ---------------- OCR for images ----------------
-def extract_text_from_image(file_bytes: bytes) -> str:
-    """Extract text from image using OCR"""
-    try:
-        from PIL import Image
-        import pytesseract
-        import os
-        
-        # Try to find Tesseract executable
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
-            'tesseract'  # If in PATH
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            if os.path.exists(path) or path == 'tesseract':
-                try:
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    pytesseract.get_tesseract_version()
-                    tesseract_found = True
-                    break
-                except:
-                    continue
-        
-        if not tesseract_found:
-            st.error("""
+# ---------------- OCR greške ----------------
+TESSERACT_HELP = """
             **Tesseract OCR nije instaliran!**
             
             **Instaliraj Tesseract OCR:**
@@ -97,375 +57,57 @@ def extract_text_from_image(file_bytes: bytes) -> str:
             # Preko Scoop
             scoop install tesseract
             ```
-            """)
-            return ""
-        
-        # Open image
-        image = Image.open(io.BytesIO(file_bytes))
-        
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Extract text using OCR
-        text = pytesseract.image_to_string(image, lang='eng+srp')
-        return text.strip()
-    except ImportError as e:
-        st.error(f"OCR biblioteke nisu instalirane. Instaliraj: pip install pytesseract pillow")
-        return ""
-    except Exception as e:
-        st.error(f"OCR greška: {str(e)}")
-        return ""
+            """
 
-def extract_text_from_pdf_with_ocr(file_bytes: bytes) -> str:
-    """Extract text from PDF using OCR (for scanned PDFs)"""
+def read_and_parse(name: str, file_bytes: bytes):
+    """Čita fajl stranicu po stranicu preko lab_reader jezgra (native, pa OCR; sa kešom) i odmah parsira
+
+    Vraća (tekst, DataFrame); djelimični rezultat se prikazuje čim je koja
+    stranica gotova, a greške se prikazuju u UI.
+    """
+    if file_extension(name) == 'pdf':
+        ocr_msg, libs = f"📷 {name}: Pokušavam OCR...", "pytesseract pillow pymupdf"
+    else:
+        ocr_msg, libs = f"📷 {name}: Koristim OCR...", "pytesseract pillow"
+    texts = []
+    dedup = AnalyteDeduplicator(parser.REF_COLUMNS)
+    live = st.empty()
     try:
-        import fitz  # PyMuPDF
-        from PIL import Image
-        import pytesseract
-        import os
-        
-        # Try to find Tesseract executable
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
-            'tesseract'  # If in PATH
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            if os.path.exists(path) or path == 'tesseract':
-                try:
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    pytesseract.get_tesseract_version()
-                    tesseract_found = True
-                    break
-                except:
-                    continue
-        
-        if not tesseract_found:
-            st.error("""
-            **Tesseract OCR nije instaliran!**
-            
-            **Instaliraj Tesseract OCR:**
-            1. Idi na: https://github.com/tesseract-ocr/tesseract/releases
-            2. Preuzmi najnoviju verziju za Windows
-            3. Instaliraj sa default opcijama
-            4. Restartuj aplikaciju
-            """)
-            return ""
-        
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        text = ""
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            
-            # First try to extract text normally
-            page_text = page.get_text()
-            if page_text.strip():
-                text += page_text + "\n"
-            else:
-                # If no text, use OCR on the page image
-                mat = fitz.Matrix(2, 2)  # Scale up for better OCR
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                
-                # Convert to PIL Image
-                image = Image.open(io.BytesIO(img_data))
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # OCR
-                ocr_text = pytesseract.image_to_string(image, lang='eng+srp')
-                text += ocr_text + "\n"
-        
-        doc.close()
-        return text.strip()
-    except ImportError as e:
-        st.error(f"OCR biblioteke nisu instalirane. Instaliraj: pip install pytesseract pillow pymupdf")
-        return ""
+        for page, rows in iter_page_results(name, file_bytes, parser, on_ocr=lambda: st.info(ocr_msg)):
+            texts.append(page.text)
+            dedup.extend(rows)
+            with live.container():
+                st.caption(f"📄 {name}: strana {page.number + 1} – {len(dedup)} analita do sada")
+                if len(dedup):
+                    st.dataframe(dedup.frame()[["Analit", "Vrijednost", "Jedinica", "Status"]], use_container_width=True)
+        metrics.count("dedup_dropped", dedup.dropped)
+        return "".join(t + "\n" for t in texts), dedup.frame(parser.EMPTY_COLUMNS)
+    except TesseractNotFoundError:
+        st.error(TESSERACT_HELP)
+    except ImportError:
+        st.error(f"OCR biblioteke nisu instalirane. Instaliraj: pip install {libs}")
     except Exception as e:
-        st.error(f"PDF OCR greška: {str(e)}")
-        return ""
+        st.error(f"OCR greška: {str(e)}")
+    finally:
+        live.empty()
+    return "", None
 
-# ---------------- Smart Parser ----------------
-class LabResultParser:
-    def __init__(self):
-        # Poznati analiti
-        self.known_analytes = {
-            "hemoglobin", "hb", "eritrociti", "rbc", "leukociti", "wbc", "trombociti", "plt",
-            "hematokrit", "hct", "glukoza", "glucose", "urea", "kreatinin", "creatinine",
-            "alt", "gpt", "ast", "got", "ggt", "gamma gt", "holesterol", "cholesterol",
-            "hdl", "ldl", "trigliceridi", "triglycerides", "natrijum", "na", "kalijum", "k",
-            "kalcijum", "ca", "neutrofili", "neutrophils", "limfociti", "lymphocytes",
-            "monociti", "monocytes", "eozinofili", "eosinophils", "bazofili", "basophils",
-            "mcv", "mch", "mchc", "rdw", "pdw", "mpv", "pct", "p-lcr", "ig", "sedimentacija",
-            "protrombinsko", "inr", "aptt", "fibrinogen", "bilirubin", "urobilinogen",
-            "glukoza u urinu", "eritrociti u urinu", "proteini u urinu", "ketoni u urinu",
-            "nitriti", "leukociti u urinu", "krv u urinu", "ph urina", "specifina težina"
-        }
-        
-        # Reči koje treba preskočiti
-        self.skip_words = {
-            "laboratorijska", "dijagnostika", "uzorkovanja", "vrijeme", "datum", "pacijent", 
-            "doktor", "dr", "serum", "plazma", "citrat", "punkt", "protokola", "br.",
-            "aligrudić", "golubovci", "filip", "mara", "džomić", "qo", "med", "dijag",
-            "normalan", "negativan", "pozitivan", "granulociti", "epitelne", "cel",
-            "neskvamozne", "bubrežni", "epitel", "elije", "težina", "specifina"
-        }
-        
-        # Regex patterni
-        self.num_pattern = r"[-+]?\d+(?:[.,]\d+)?"
-        self.qual_pattern = r"(?:Negativan|Normalan|Pozitivan)"
-        self.unit_pattern = r"(?:10[\*\^]\d+\/[A-Za-z]+|[A-Za-z%\/\*\.\-\^]+)"
-        self.range_pattern = rf"(?:{self.num_pattern}\s*[~\-]\s*{self.num_pattern}|<\s*{self.num_pattern}|>\s*{self.num_pattern}|{self.qual_pattern})"
-    
-    def is_valid_analyte(self, name: str) -> bool:
-        """Proverava da li je naziv valjan analit"""
-        if not name or len(name.strip()) < 2:
-            return False
-        
-        name_lower = name.lower().strip()
-        
-        # Preskoči ako sadrži skip reči
-        for skip_word in self.skip_words:
-            if skip_word in name_lower:
-                return False
-        
-        # Proveri da li sadrži poznate analite
-        for analyte in self.known_analytes:
-            if analyte in name_lower:
-                return True
-        
-        # Proveri da li je kratak i smislen (1-3 reči)
-        words = name_lower.split()
-        if len(words) <= 3 and all(len(w) > 1 for w in words):
-            if not all(w.isdigit() or len(w) < 3 for w in words):
-                return True
-        
-        return False
-    
-    def parse_value(self, val_str: str) -> Tuple[Optional[float], Optional[str]]:
-        """Parsira vrednost - vraća (numerička_vrednost, kvalitativna_vrednost)"""
-        if not val_str:
-            return None, None
-        
-        val_str = val_str.strip()
-        
-        # Proveri da li je kvalitativna vrednost
-        if re.fullmatch(self.qual_pattern, val_str):
-            return None, val_str
-        
-        # Pokušaj da parsiraš numeričku vrednost
-        try:
-            # Zameni zarez tačkom
-            val_clean = val_str.replace(",", ".")
-            return float(val_clean), None
-        except:
-            return None, val_str
-    
-    def is_qualitative_result(self, analyte: str, value: str) -> bool:
-        """Proverava da li je kvalitativni rezultat (npr. urin analiza)"""
-        qualitative_analytes = {
-            "glukoza u urinu", "eritrociti u urinu", "proteini u urinu", 
-            "bilirubin u urinu", "urobilinogen u urinu", "krv u urinu",
-            "ketoni u urinu", "nitriti", "leukociti u urinu"
-        }
-        
-        analyte_lower = analyte.lower()
-        for qual_analyte in qualitative_analytes:
-            if qual_analyte in analyte_lower:
-                return True
-        return False
-    
-    def parse_reference(self, ref_str: str) -> Tuple[Optional[float], Optional[float], str, Optional[str]]:
-        """Parsira referentne vrednosti - vraća (low, high, type, qual_ref)"""
-        if not ref_str:
-            return None, None, "none", None
-        
-        ref_str = ref_str.strip()
-        
-        # Kvalitativna referenca
-        if re.fullmatch(self.qual_pattern, ref_str):
-            return None, None, "qual", ref_str
-        
-        # Range format (npr. "4.5-6.2")
-        range_match = re.match(rf"^{self.num_pattern}\s*[~\-]\s*{self.num_pattern}$", ref_str)
-        if range_match:
-            parts = re.split(r"[~\-]", ref_str)
-            low = float(parts[0].strip().replace(",", "."))
-            high = float(parts[1].strip().replace(",", "."))
-            return low, high, "range", None
-        
-        # Less than format (npr. "<10")
-        lt_match = re.match(rf"^<\s*{self.num_pattern}$", ref_str)
-        if lt_match:
-            high = float(lt_match.group(0).split("<")[1].strip().replace(",", "."))
-            return None, high, "<", None
-        
-        # Greater than format (npr. ">5")
-        gt_match = re.match(rf"^>\s*{self.num_pattern}$", ref_str)
-        if gt_match:
-            low = float(gt_match.group(0).split(">")[1].strip().replace(",", "."))
-            return low, None, ">", None
-        
-        return None, None, "none", None
-    
-    def calculate_status(self, val_num: Optional[float], val_qual: Optional[str], 
-                        ref_low: Optional[float], ref_high: Optional[float], 
-                        ref_type: str, qual_ref: Optional[str]) -> str:
-        """Računa status vrednosti"""
-        if val_num is not None:
-            if ref_type == "range" and ref_low is not None and ref_high is not None:
-                if val_num < ref_low:
-                    return "⬇️ ispod"
-                elif val_num > ref_high:
-                    return "⬆️ iznad"
-                else:
-                    return "✅ u referentnom"
-            elif ref_type == "<" and ref_high is not None:
-                return "✅ u referentnom" if val_num < ref_high else "⬆️ iznad"
-            elif ref_type == ">" and ref_low is not None:
-                return "✅ u referentnom" if val_num > ref_low else "⬇️ ispod"
-            else:
-                return ""
-        
-        if val_qual is not None and qual_ref is not None:
-            return "✅ u referentnom" if val_qual == qual_ref else "⚠️ odstupanje"
-        
-        return ""
-    
-    def clean_analyte_name(self, name: str) -> Tuple[str, str]:
-        """Čisti naziv analita i određuje tip"""
-        name = name.strip()
-        
-        # Ukloni prefikse
-        if name.lower().startswith(("k-", "s-")):
-            name = name[2:].strip()
-        
-        # Normalizuj razmake
-        name = re.sub(r"\s+", " ", name.replace("aps.", "aps")).strip()
-        
-        typ = ""
-        
-        # Proveri tip
-        if name.endswith("%"):
-            typ = "%"
-            name = name[:-1].strip()
-        elif name.lower().endswith(" aps"):
-            typ = "aps"
-            name = name[:-3].strip()
-        
-        return name, typ
-    
-    def parse_line(self, line: str) -> Optional[Dict]:
-        """Parsira jednu liniju teksta"""
-        if not line.strip():
-            return None
-        
-        # Različiti patterni za različite formate
-        patterns = [
-            # Format: Analit Vrijednost Jedinica Ref
-            rf"^(?P<analyte>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s+(?P<value>{self.num_pattern}|{self.qual_pattern})\s+(?P<unit>{self.unit_pattern})?\s*(?P<ref>{self.range_pattern})?\s*$",
-            
-            # Format: Analit Vrijednost Jedinica (bez ref)
-            rf"^(?P<analyte>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s+(?P<value>{self.num_pattern}|{self.qual_pattern})\s+(?P<unit>{self.unit_pattern})\s*$",
-            
-            # Format: Vrijednost Jedinica Analit
-            rf"^(?P<value>{self.num_pattern}|{self.qual_pattern})\s+(?P<unit>{self.unit_pattern})\s+(?P<analyte>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s*$",
-            
-            # Format: Analit Vrijednost (bez jedinice)
-            rf"^(?P<analyte>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s+(?P<value>{self.num_pattern}|{self.qual_pattern})\s*$"
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, line.strip())
-            if match:
-                groups = match.groupdict()
-                analyte = groups.get("analyte", "").strip()
-                value = groups.get("value", "").strip()
-                unit = groups.get("unit", "").strip()
-                ref = groups.get("ref", "").strip()
-                
-                # Validiraj analit
-                if not self.is_valid_analyte(analyte):
-                    continue
-                
-                # Parsiraj vrednost
-                val_num, val_qual = self.parse_value(value)
-                
-                # Specijalna logika za kvalitativne rezultate
-                if self.is_qualitative_result(analyte, value):
-                    # Za kvalitativne rezultate, vrednost je kvalitativna, ne jedinica
-                    if val_qual and unit.lower() in ["negativan", "normalan", "pozitivan"]:
-                        unit = ""  # Jedinica je zapravo vrednost
-                        val_qual = unit
-                
-                # Parsiraj referencu
-                ref_low, ref_high, ref_type, qual_ref = self.parse_reference(ref)
-                
-                # Čisti naziv analita
-                clean_name, typ = self.clean_analyte_name(analyte)
-                
-                # Računaj status
-                status = self.calculate_status(val_num, val_qual, ref_low, ref_high, ref_type, qual_ref)
-                
-                return {
-                    "Analit": clean_name,
-                    "Tip": typ,
-                    "Vrijednost": val_num if val_num is not None else val_qual,
-                    "Jedinica": unit,
-                    "Ref_low": ref_low,
-                    "Ref_high": ref_high,
-                    "Ref_tip": ref_type,
-                    "Ref_kval": qual_ref,
-                    "Flag": "",
-                    "Status": status,
-                    "Izvor": "smart",
-                    "Linija": line
-                }
-        
-        return None
-    
-    def parse_text(self, text: str) -> pd.DataFrame:
-        """Parsira ceo tekst"""
-        results = []
-        
-        # Podeli tekst na linije
-        lines = []
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Pokušaj da podeliš na kolone (ako su razdvojene sa 2+ razmaka)
-            parts = re.split(r"\s{2,}", line)
-            if len(parts) > 1:
-                lines.extend([p.strip() for p in parts if p.strip()])
-            else:
-                lines.append(line)
-        
-        # Parsiraj svaku liniju
-        for line in lines:
-            result = self.parse_line(line)
-            if result:
-                results.append(result)
-        
-        if not results:
-            return pd.DataFrame(columns=["Analit","Tip","Vrijednost","Jedinica","Ref_low","Ref_high","Ref_tip","Ref_kval","Flag","Status","Izvor","Linija"])
-        
-        df = pd.DataFrame(results)
-        
-        # Deduplikacija - prioritet rezultatima sa referentnim vrednostima
-        df["_priority"] = df[["Ref_low", "Ref_high", "Ref_tip"]].notna().sum(axis=1)
-        df["_has_unit"] = df["Jedinica"].notna() & (df["Jedinica"] != "")
-        df = df.sort_values(["_priority", "_has_unit", "Analit"], ascending=[False, False, True])
-        df = df.drop_duplicates(subset=["Analit"], keep="first")
-        df = df.drop(columns=["_priority", "_has_unit"])
-        
-        return df
+class _LocalFile:
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.file_id = os.path.abspath(path)
+        self.size = os.path.getsize(path)
+        self._path = path
+    def read(self):
+        with open(self._path, "rb") as fh:
+            return fh.read()
+
+def selected_inputs(uploaded_files, folder_path: str) -> list:
+    """Zajednička lista: upload-ovani fajlovi, pa PDF-ovi i slike iz foldera"""
+    selected_files = list(uploaded_files or [])
+    if (folder_path or "").strip():
+        selected_files.extend(_LocalFile(p) for p in list_input_files(folder_path))
+    return selected_files
 
 # ---------------- Main App ----------------
 parser = LabResultParser()
@@ -476,12 +118,32 @@ with st.sidebar:
     show_preview = st.checkbox("Prikaži preview teksta", value=True)
     st.markdown("---")
     st.subheader("Unos")
-    upload_mode = st.radio("Izvor podataka", ["PDF/Slike", "Tekst (paste)"])
+    upload_mode = st.radio("Izvor podataka", ["PDF/Slike", "Tekst (paste)", "Arhiva (Parquet)"])
     
     folder_path = ""
     if upload_mode == "PDF/Slike":
         folder_path = st.text_input("📁 Folder sa PDF-ovima/slikama (opciono)", "")
         st.caption("Ako uneseš folder, svi PDF i slike (.pdf, .png, .jpg, .jpeg, .tiff, .bmp) biće učitani.")
+    background = upload_mode == "PDF/Slike" and st.checkbox(
+        "Obrada u pozadini", value=bool(st.query_params.get("job")),
+        help="Fajlovi idu u red poslova na serveru; stranica prikazuje napredak i može se osvježiti bez gubitka posla.")
+
+    st.markdown("---")
+    st.subheader("📦 Arhiva rezultata")
+    store_dir = st.text_input("Folder arhive", default_store_dir())
+    save_to_store = upload_mode == "PDF/Slike" and st.checkbox("Dodaj obrađene nalaze u arhivu", value=False)
+    if upload_mode == "Arhiva (Parquet)":
+        date_range = st.date_input("Period uzorkovanja", value=())
+        store_labs = st.text_input("Laboratorije (zarezom, prazno = sve)", "")
+        store_analytes = st.text_input("Analiti (zarezom, prazno = svi)", "")
+
+    # Skriveno profilisanje (?profile=1 u URL-u ili LAB_READER_PROFILE=1) - za prijave "ovaj nalaz je spor"
+    profile_mode = None
+    if profiling.ui_enabled(st.query_params.get("profile")):
+        st.markdown("---")
+        if st.checkbox("🔬 Profilisanje obrade", value=False,
+                       help="Novi fajlovi se obrađuju kroz profiler; vrijeme i po formatu linije parsera"):
+            profile_mode = st.radio("Profiler", profiling.MODES, horizontal=True)
 
 # Main input
 uploaded_files = None
@@ -489,14 +151,22 @@ text_input_fallback = None
 
 if upload_mode == "Tekst (paste)":
     text_input_fallback = st.text_area("📋 Zalijepi tekst nalaza", "", height=200)
-else:
+elif upload_mode == "PDF/Slike":
     uploaded_files = st.file_uploader("📤 Učitaj PDF/Slike (više datoteka dozvoljeno)", 
-                                     type=["pdf", "png", "jpg", "jpeg", "tiff", "bmp", "gif"], 
+                                     type=UPLOAD_TYPES, 
                                      accept_multiple_files=True,
                                      help="Podržani formati: PDF (tekstualni i skenirani), PNG, JPG, JPEG, TIFF, BMP, GIF")
 
 # Processing
 dataframes = []
+# Vremena faza po fajlu (lab_reader.metrics) i zadnjeg izvoza po formatu - za panel "Vremena obrade"
+timings = st.session_state.setdefault("v3_metrics", {})
+export_times = st.session_state.setdefault("v3_export_times", {})
+shown_timings = []
+# Profili obrađenih fajlova dok je profilisanje uključeno (lab_reader.profiling)
+profiles = st.session_state.setdefault("v3_profiles", {})
+if profile_mode is None:
+    profiles.clear()
 
 # Debug info
 if uploaded_files:
@@ -510,59 +180,81 @@ if upload_mode == "Tekst (paste)":
         if show_preview:
             st.text_area("📄 Tekst iz nalaza (preview)", text, height=230)
         
-        df = parser.parse_text(text)
+        with metrics.collect("tekst") as m:
+            with metrics.stage("parse"):
+                df = parser.parse_text(text)
+        m.info["rows"] = len(df)
+        shown_timings.append(m.to_dict())
         if not df.empty:
             dataframes.append(df)
         else:
             st.warning("⚠️ Nije prepoznat nijedan red iz zalijepljenog teksta.")
     else:
         st.info("📋 Zalijepi tekst nalaza u polje sa lijeve strane.")
+elif upload_mode == "Arhiva (Parquet)":
+    # Čitaju se samo particije iz perioda/laboratorija i samo kolone za prikaz - bez ponovnog parsiranja
+    split = lambda value: [v.strip() for v in value.split(",") if v.strip()] or None
+    dates = [d.isoformat() for d in date_range] if date_range else []
+    try:
+        df = ResultStore(store_dir).read(
+            columns=["Datum", "Laboratorija", "Pacijent", "Fajl", "Analit", "Tip", "Vrijednost", "Jedinica",
+                     "Ref_low", "Ref_high", "Ref_tip", "Status", "Izvor"],
+            start=dates[0] if dates else None, end=dates[-1] if dates else None,
+            labs=split(store_labs), analytes=split(store_analytes), text_values=True)
+    except ImportError as e:
+        st.error(str(e))
+    else:
+        st.write(f"📦 {store_dir}: {len(df)} redova")
+        if not df.empty:
+            st.dataframe(df[["Datum", "Laboratorija", "Pacijent", "Fajl"]].drop_duplicates(), use_container_width=True)
+            dataframes.append(df)
+        else:
+            st.info("📦 Nema rezultata za izabrani period/filtere.")
+elif background:
+    # Posao je u bazi, a njegov id u sesiji i URL-u - osvježavanje stranice nastavlja praćenje istog posla
+    job_id = current_job(selected_inputs(uploaded_files, folder_path), "v3")
+    if job_id:
+        frames, _, job_timings = show_job(job_id, "v3", preview=show_preview)
+        dataframes.extend(frames)
+        shown_timings.extend(job_timings)
+    else:
+        st.info("📂 Učitaj jedan ili više PDF-ova/slika - obrada ide u pozadini.")
 else:
+    if upload_mode == "PDF/Slike":
+        forget_job("v3")
     if uploaded_files or (folder_path or "").strip():
-        # Pripremi zajedničku listu fajlova
-        selected_files = []
-        if uploaded_files:
-            selected_files.extend(uploaded_files)
-        if (folder_path or "").strip():
-            import os, glob
-            class _LocalFile:
-                def __init__(self, path):
-                    self.name = os.path.basename(path)
-                    self._path = path
-                def read(self):
-                    with open(self._path, "rb") as fh:
-                        return fh.read()
-            # Add PDF files
-            for p in sorted(glob.glob(os.path.join(folder_path, "*.pdf"))):
-                selected_files.append(_LocalFile(p))
-            
-            # Add image files
-            for ext in ["*.png", "*.jpg", "*.jpeg", "*.tiff", "*.bmp"]:
-                for p in sorted(glob.glob(os.path.join(folder_path, ext))):
-                    selected_files.append(_LocalFile(p))
+        selected_files = selected_inputs(uploaded_files, folder_path)
 
+        # Rezultati ostaju u sesiji - promjena widget-a ne obrađuje ponovo već obrađene fajlove
+        results = FileResults(st.session_state, "v3_files")
+        archived = st.session_state.setdefault("v3_archived", set())
+        keys = []
         for f in selected_files:
             by = f.read()
-            file_ext = f.name.lower().split('.')[-1] if '.' in f.name else ''
-            
-            # Debug info
-            st.write(f"🔍 Processing: {f.name} (type: {file_ext})")
-            
-            with st.spinner(f"⏳ Čitam {f.name}..."):
-                text = ""
-                
-                if file_ext == 'pdf':
-                    # Try normal PDF extraction first
-                    text = extract_pdf_text_native(by)
-                    
-                    # If no text, try OCR
-                    if not text.strip():
-                        st.info(f"📷 {f.name}: Pokušavam OCR...")
-                        text = extract_text_from_pdf_with_ocr(by)
-                else:
-                    # Image file - use OCR
-                    st.info(f"📷 {f.name}: Koristim OCR...")
-                    text = extract_text_from_image(by)
+            file_ext = file_extension(f.name)
+            key = file_key(f.file_id, by)
+            keys.append(key)
+
+            cached = results.get(key)
+            if cached is not None:
+                text, df = cached
+            else:
+                # Debug info
+                st.write(f"🔍 Processing: {f.name} (type: {file_ext})")
+
+                with st.spinner(f"⏳ Čitam {f.name}..."):
+                    # PDF: prvo native, pa OCR ako nema teksta; slike: OCR - parsira se stranicu po stranicu
+                    profiled = profiling.profile(profile_mode) if profile_mode else nullcontext()
+                    with metrics.collect(f.name) as m, profiled as prof:
+                        text, df = read_and_parse(f.name, by)
+                if prof is not None:
+                    profiles[f.name] = prof
+                m.info["rows"] = 0 if df is None else len(df)
+                timings[key] = m.to_dict()
+                if df is not None:
+                    results.put(key, text, df)
+            if key in timings:
+                shown_timings.append(timings[key])
             
             if not text.strip():
                 st.error(f"❌ {f.name}: Nije moguće izvući tekst.")
@@ -572,17 +264,28 @@ else:
                 with st.expander(f"📄 Tekst: {f.name}"):
                     st.text_area("", text, height=200)
             
-            df = parser.parse_text(text)
             if not df.empty:
                 dataframes.append(df)
+                if save_to_store and (store_dir, key) not in archived:
+                    try:
+                        out = df.assign(Fajl=f.name)
+                        ResultStore(store_dir).append(out, report_info(text, by))
+                        archived.add((store_dir, key))
+                    except ImportError as e:
+                        st.error(str(e))
             else:
                 st.warning(f"⚠️ {f.name}: Nije prepoznat nijedan red.")
+        results.retain(keys)
+        for stale in set(timings) - set(keys):
+            del timings[stale]
     else:
+        FileResults(st.session_state, "v3_files").retain(())
+        timings.clear()
         st.info("📂 Učitaj jedan ili više PDF-ova/slika ili pređi na 'Tekst (paste)'.")
 
 # Results
 if dataframes:
-    combined = pd.concat(dataframes, ignore_index=True)
+    combined = concat_results(dataframes)
     view_cols = ["Analit","Tip","Vrijednost","Jedinica","Ref_low","Ref_high","Ref_tip","Status","Izvor"]
     
     st.subheader("📊 Izvučeni podaci")
@@ -596,29 +299,54 @@ if dataframes:
     # Summary
     st.markdown("---")
     st.subheader("📈 Sažetak statusa")
-    counts = combined["Status"].fillna("").replace({"": "Bez statusa"}).value_counts()
+    counts = combined["Status"].astype(object).fillna("").replace({"": "Bez statusa"}).value_counts()
     st.bar_chart(counts)
 
-    # Downloads
+    # Downloads - fajl se pravi tek na klik i pamti po hash-u rezultata
     st.subheader("⬇️ Preuzimanja")
-    csv_bytes = combined.to_csv(index=False).encode("utf-8")
-    st.download_button("Preuzmi CSV", data=csv_bytes, file_name="lab_extract_v3.csv", mime="text/csv")
-    
-    import io as _io
-    out = _io.BytesIO()
-    with pd.ExcelWriter(out, engine="xlsxwriter") as w:
-        combined.to_excel(w, index=False, sheet_name="Nalazi")
-    st.download_button("Preuzmi Excel", data=out.getvalue(),
+    st.download_button("Preuzmi CSV", data=lazy_export(combined, "csv", on_built=export_times.__setitem__),
+                       file_name="lab_extract_v3.csv", mime="text/csv")
+    st.download_button("Preuzmi Excel", data=lazy_export(combined, "xlsx", on_built=export_times.__setitem__),
                        file_name="lab_extract_v3.xlsx",
-                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                       mime=EXCEL_MIME)
+    if parquet_available():
+        st.download_button("Preuzmi Parquet", data=lazy_export(combined, "parquet", on_built=export_times.__setitem__),
+                           file_name="lab_extract_v3.parquet", mime=PARQUET_MIME)
+    else:
+        st.caption("Parquet izvoz traži pyarrow (pip install pyarrow).")
 
     # Per-file export
     if len(dataframes) > 1:
         with st.expander("Per-file export"):
             for i, dfi in enumerate(dataframes):
-                c_bytes = dfi.to_csv(index=False).encode("utf-8")
                 fname = f"file_{i+1}"
-                st.download_button(f"CSV – {fname}", data=c_bytes, file_name=f"lab_extract_{fname}_v3.csv", mime="text/csv")
+                st.download_button(f"CSV – {fname}", data=lazy_export(dfi, "csv"), file_name=f"lab_extract_{fname}_v3.csv", mime="text/csv")
 
 else:
     st.info("📂 Učitaj jedan ili više tekstualnih PDF-ova ili pređi na 'Tekst (paste)'.")
+
+# Vremena obrade - gdje ide vrijeme (izvlačenje, OCR, parsiranje, dedup, izvoz) po fajlu i po stranici
+if shown_timings or export_times:
+    with st.expander("⏱️ Vremena obrade", expanded=False):
+        if shown_timings:
+            st.dataframe(timing_frame(shown_timings), use_container_width=True)
+            pages = page_frame(shown_timings)
+            if not pages.empty:
+                st.caption("Po stranici")
+                st.dataframe(pages, use_container_width=True)
+        if export_times:
+            st.caption("Zadnji izvoz: " + ", ".join(f"{kind} {sec * 1000:.0f} ms" for kind, sec in export_times.items()))
+
+# Profil - najskuplje funkcije i formati linije; pstats/folded za snakeviz, flamegraph, speedscope
+if profiles:
+    with st.expander("🔬 Profil obrade", expanded=True):
+        for i, (name, prof) in enumerate(profiles.items()):
+            st.markdown(f"**{name}** – {prof.seconds * 1000:.0f} ms ({prof.mode})")
+            st.code(prof.summary(), language=None)
+            stem = os.path.splitext(name)[0]
+            st.download_button(f"Preuzmi {stem}{prof.suffix}", prof.dump(), file_name=stem + prof.suffix,
+                               key=f"v3_profile_{i}")
+            st.download_button(f"Preuzmi {stem}.patterns.json",
+                               json.dumps(prof.report(), ensure_ascii=False, indent=2),
+                               file_name=f"{stem}.patterns.json", mime="application/json",
+                               key=f"v3_profile_patterns_{i}")
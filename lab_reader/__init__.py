@@ -0,0 +1,26 @@
+"""Headless jezgro čitača laboratorijskih nalaza.
+
+Ne uvozi Streamlit; pdfplumber, PyMuPDF, pytesseract i pandas se uvoze tek
+kada zatrebaju, pa je samo parsiranje teksta brzo za pokretanje.
+"""
+from .dedup import drop_duplicate_analytes
+from .extract import extract_pdf_text_native
+from .ocr import TesseractNotFoundError, extract_text_from_image, extract_text_from_pdf_with_ocr
+from .parser import COLUMNS, LabResultParser
+from .parser_v4 import LabResultParserV4
+from .pipeline import extract_text, process_file
+
+__version__ = "3.0.0"
+
+__all__ = [
+    "COLUMNS",
+    "LabResultParser",
+    "LabResultParserV4",
+    "TesseractNotFoundError",
+    "drop_duplicate_analytes",
+    "extract_pdf_text_native",
+    "extract_text",
+    "extract_text_from_image",
+    "extract_text_from_pdf_with_ocr",
+    "process_file",
+]
@@ -0,0 +1,364 @@
+"""Provjera tačnosti i brzine parsera (v2, v3, v4) nad označenim korpusom.
+
+Sve tri generacije parsera rade nad istim tekstom: ``merge_auto_target`` iz
+app_v2 (auto + ciljani), ``LabResultParser`` iz app_v3 i ``LabResultParserV4``
+iz app_v4. Za svaki dokument korpusa poznati su tačni rezultati (sintetički
+nalazi iz lab_reader.corpus ili ručno označeni ``<ime>.expected.csv`` pored
+pravog nalaza, vidi folder ``golden/``), pa se za svaki parser dobija
+precision/recall po analitu i ukupno, tačnost jedinice i reference i
+latencija po dokumentu (najbolje od ``repeat`` parsiranja, bez izvlačenja
+teksta - ono se mjeri posebno i isto je za sve parsere).
+
+Red rezultata je pogođen kad se naziv (bez prefiksa ``K-``/``S-``, tačaka,
+velikih slova; ``Tip`` se dodaje nazivu) i vrijednost poklope sa očekivanim
+redom; pogrešna vrijednost pod tačnim nazivom je i lažni pogodak i promašaj.
+
+Izlaz je JSON kao kod ``lab-reader bench``; ``compare`` sa ranijim izlazom
+(``--baseline``) javlja pad preciznosti/odziva, pa se ubrzanje regex-a može
+provjeriti da nije izgubilo rezultate.
+
+``lab-reader accuracy --golden golden --docs . --baseline prije.json``
+"""
+import glob
+import math
+import os
+import re
+import statistics
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .bench import environment
+from .corpus import LAYOUTS, Expected, generate_corpus, report_bytes
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PARSERS = {
+    "v2": "merge_auto_target (app_v2: auto + ciljani)",
+    "v3": "LabResultParser (app_v3)",
+    "v4": "LabResultParserV4 (app_v4)",
+}
+DEFAULT_FORMATS = ("text", "pdf")
+EXPECTED_SUFFIX = ".expected.csv"
+VALUE_TOLERANCE = 1e-6  # relativno; vrijednosti su iz teksta pa se porede skoro tačno
+
+_PREFIX = re.compile(r"^[a-z]-(?=\S)")
+
+
+class Document(NamedTuple):
+    name: str
+    group: str  # raspored sintetičkog nalaza ili "golden" (u izvještaju uz izvor: state/pdf)
+    source: str  # text, pdf, scan ili ekstenzija pravog fajla
+    text: str
+    expected: List[Expected]
+    extract_seconds: float
+
+
+def make_parser(name: str) -> Callable[[str], "pd.DataFrame"]:
+    """tekst -> DataFrame za parser ``v2``, ``v3`` ili ``v4``"""
+    if name == "v2":
+        from .targeted import merge_auto_target
+        return merge_auto_target
+    if name == "v3":
+        from .parser import LabResultParser
+        return LabResultParser().parse_text
+    if name == "v4":
+        from .parser_v4 import LabResultParserV4
+        return LabResultParserV4().parse_text
+    raise ValueError(f"Nepoznat parser: {name}")
+
+
+def _text(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value).strip()
+
+
+def _number(value) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def analyte_key(name, typ=None) -> str:
+    """Naziv za poređenje: ``K-Neutrofili aps.`` i (``Neutrofili``, ``aps``) daju isti ključ"""
+    tokens = _PREFIX.sub("", _text(name).casefold().replace(".", " ").strip()).split()
+    typ = _text(typ).casefold().replace(".", "")
+    if typ and typ not in tokens:
+        tokens.append(typ)
+    return " ".join(tokens)
+
+
+def unit_key(unit) -> str:
+    return _text(unit).casefold().replace("^", "*").replace("µ", "u").replace("μ", "u").replace(" ", "")
+
+
+def same_value(found, expected) -> bool:
+    number = _number(expected)
+    if number is None:
+        return _text(found).casefold() == _text(expected).casefold()
+    got = _number(found)
+    return got is not None and abs(got - number) <= VALUE_TOLERANCE * max(1.0, abs(number))
+
+
+def _same_bound(found, expected) -> bool:
+    if _number(expected) is None:
+        return _number(found) is None
+    return same_value(found, expected)
+
+
+class Score(NamedTuple):
+    tp: int
+    fp: int
+    fn: int
+    unit_ok: int
+    ref_ok: int
+    analytes: Dict[str, List[int]]  # ključ -> [tp, fp, fn]
+    names: Dict[str, str]  # ključ -> naziv za prikaz
+
+
+def score(frame: "pd.DataFrame", expected: Sequence[Expected]) -> Score:
+    """Poređenje rezultata parsera sa očekivanim redovima jednog dokumenta"""
+    pending: Dict[str, List[Expected]] = defaultdict(list)
+    names: Dict[str, str] = {}
+    for e in expected:
+        key = analyte_key(e.analyte)
+        pending[key].append(e)
+        names.setdefault(key, e.analyte)
+
+    n = len(frame)
+    column = lambda c: frame[c].tolist() if c in frame.columns else [None] * n
+    analytes: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+    unit_ok = ref_ok = 0
+    for name, typ, value, unit, low, high in zip(*(column(c) for c in (
+            "Analit", "Tip", "Vrijednost", "Jedinica", "Ref_low", "Ref_high"))):
+        key = analyte_key(name, typ)
+        names.setdefault(key, _text(name))
+        candidates = pending.get(key, [])
+        hit = next((i for i, e in enumerate(candidates) if same_value(value, e.value)), None)
+        if hit is None:
+            analytes[key][1] += 1
+            continue
+        e = candidates.pop(hit)
+        analytes[key][0] += 1
+        unit_ok += unit_key(unit) == unit_key(e.unit)
+        ref_ok += _same_bound(low, e.ref_low) and _same_bound(high, e.ref_high)
+    for key, left in pending.items():
+        if left:
+            analytes[key][2] += len(left)
+    tp, fp, fn = (sum(c[i] for c in analytes.values()) for i in range(3))
+    return Score(tp, fp, fn, unit_ok, ref_ok, dict(analytes), names)
+
+
+def _ratios(tp: int, fp: int, fn: int) -> Dict:
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else 0.0
+    return {"precision": _round(precision), "recall": _round(recall), "f1": _round(f1)}
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+# ---- korpus ----
+def _extract(name: str, data: bytes) -> Tuple[str, float]:
+    from .pipeline import extract_text
+
+    start = time.perf_counter()
+    if name.lower().endswith(".txt"):
+        text = data.decode("utf-8")
+    else:
+        text, _ = extract_text(name, data, use_cache=False)
+    return text, time.perf_counter() - start
+
+
+def synthetic_documents(layouts: Sequence[str] = LAYOUTS, sizes: Sequence[int] = (30,), files: int = 1,
+                        formats: Sequence[str] = DEFAULT_FORMATS, seed: int = 0) -> List[Document]:
+    """Sintetički nalazi (lab_reader.corpus) u svakom formatu; ``scan`` traži Tesseract"""
+    docs = []
+    for report in generate_corpus(layouts, sizes, files, seed):
+        for fmt in formats:
+            name, data = report_bytes(report, fmt)
+            text, seconds = _extract(name, data)
+            docs.append(Document(name, report.layout, fmt, text, report.expected, seconds))
+    return docs
+
+
+def load_expected(path: str) -> List[Expected]:
+    """``<ime>.expected.csv`` (Analit, Vrijednost, Jedinica, Ref_low, Ref_high) - vrijednost može biti tekst"""
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8")
+    out = []
+    for row in df.itertuples(index=False):
+        value = _number(row.Vrijednost)
+        out.append(Expected(row.Analit, row.Vrijednost if value is None else value, row.Jedinica,
+                            _number(row.Ref_low), _number(row.Ref_high)))
+    return out
+
+
+def golden_documents(folder: str, search: Sequence[str] = ()) -> List[Document]:
+    """Za svaki ``<ime>.expected.csv`` iz foldera: nalazi ``<ime>.*`` i ``<ime>-scan.pdf`` iz foldera i ``search``"""
+    from .pipeline import FOLDER_PATTERNS
+
+    docs = []
+    for path in sorted(glob.glob(os.path.join(folder, "*" + EXPECTED_SUFFIX))):
+        stem = os.path.basename(path)[:-len(EXPECTED_SUFFIX)]
+        expected = load_expected(path)
+        seen = set()
+        for directory in (folder, *search):
+            for pattern in ("*.txt", *FOLDER_PATTERNS):
+                for candidate in (stem + pattern[1:], f"{stem}-scan{pattern[1:]}"):
+                    doc_path = os.path.join(directory, candidate)
+                    if candidate in seen or not os.path.isfile(doc_path):
+                        continue
+                    seen.add(candidate)
+                    with open(doc_path, "rb") as fh:
+                        text, seconds = _extract(candidate, fh.read())
+                    source = "scan" if candidate.startswith(f"{stem}-scan.") else candidate.rsplit(".", 1)[-1].lower()
+                    docs.append(Document(candidate, "golden", source, text, expected, seconds))
+    return docs
+
+
+# ---- pokretanje ----
+def _latency(seconds: List[float]) -> Dict:
+    ms = sorted(s * 1000 for s in seconds)
+    if not ms:
+        return {}
+    return {"mean_ms": round(statistics.fmean(ms), 3), "p50_ms": round(statistics.median(ms), 3),
+            "p95_ms": round(ms[min(len(ms) - 1, math.ceil(0.95 * len(ms)) - 1)], 3), "max_ms": round(ms[-1], 3)}
+
+
+def _summary(parser: str, group: Optional[str], rows: List[Dict]) -> Dict:
+    tp, fp, fn, unit_ok, ref_ok = (sum(r[k] for r in rows) for k in ("tp", "fp", "fn", "unit_ok", "ref_ok"))
+    out = {"parser": parser}
+    if group is not None:
+        out["group"] = group
+    out.update({"documents": len(rows), "tp": tp, "fp": fp, "fn": fn, **_ratios(tp, fp, fn),
+                "unit_accuracy": _round(unit_ok / tp if tp else None),
+                "ref_accuracy": _round(ref_ok / tp if tp else None),
+                **_latency([r["seconds"] for r in rows]),
+                "lines_per_s": round(sum(r["lines"] for r in rows) / sum(r["seconds"] for r in rows), 1)
+                if rows and sum(r["seconds"] for r in rows) else None})
+    return out
+
+
+def run_accuracy(documents: Sequence[Document], parsers: Sequence[str] = tuple(PARSERS), repeat: int = 3,
+                 label: str = "", progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """Svaki parser nad svakim dokumentom; vraća rječnik spreman za JSON (vidi ``format_table``)"""
+    per_doc, per_analyte = [], {}
+    for parser in parsers:
+        if progress:
+            progress(f"{parser}: {PARSERS[parser]}, {len(documents)} dokumenata")
+        parse = make_parser(parser)
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+        names: Dict[str, str] = {}
+        for doc in documents:
+            best, frame = float("inf"), None
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                frame = parse(doc.text)
+                best = min(best, time.perf_counter() - start)
+            s = score(frame, doc.expected)
+            for key, counts in s.analytes.items():
+                totals[key] = [a + b for a, b in zip(totals[key], counts)]
+                names.setdefault(key, s.names[key])
+            per_doc.append({"parser": parser, "document": doc.name, "group": doc.group, "source": doc.source,
+                            "lines": doc.text.count("\n"), "expected": len(doc.expected), "rows": len(frame),
+                            "tp": s.tp, "fp": s.fp, "fn": s.fn, "unit_ok": s.unit_ok, "ref_ok": s.ref_ok,
+                            **_ratios(s.tp, s.fp, s.fn), "seconds": round(best, 6),
+                            "extract_seconds": round(doc.extract_seconds, 6)})
+        per_analyte[parser] = [{"analyte": names[key], "key": key, "tp": tp, "fp": fp, "fn": fn,
+                                **_ratios(tp, fp, fn)}
+                               for key, (tp, fp, fn) in sorted(totals.items())]
+
+    summary = []
+    for parser in parsers:
+        rows = [r for r in per_doc if r["parser"] == parser]
+        summary.append(_summary(parser, None, rows))
+        # Po rasporedu i ulazu (npr. state/text, state/pdf) - parseri se ponašaju različito nad tekstom i PDF-om
+        for group, source in sorted({(r["group"], r["source"]) for r in rows}):
+            summary.append(_summary(parser, f"{group}/{source}",
+                                    [r for r in rows if r["group"] == group and r["source"] == source]))
+    return {"environment": environment(label),
+            "config": {"parsers": list(parsers), "repeat": repeat,
+                       "documents": [{"name": d.name, "group": d.group, "source": d.source,
+                                      "expected": len(d.expected)} for d in documents]},
+            "summary": summary, "analytes": per_analyte, "documents": per_doc}
+
+
+def same_corpus(current: Dict, baseline: Dict) -> bool:
+    return current["config"]["documents"] == baseline.get("config", {}).get("documents")
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.0) -> List[str]:
+    """Padovi preciznosti/odziva u odnosu na raniji izvještaj; prazno = ok
+
+    Porede se dokumenti prisutni u oba izvještaja; ukupno, po grupi i po
+    analitu samo kad je korpus isti (inače zbirovi nisu uporedivi).
+    """
+    problems = []
+    old_docs = {(r["parser"], r["document"]): r for r in baseline.get("documents", [])}
+    for row in current["documents"]:
+        before = old_docs.get((row["parser"], row["document"]))
+        if before is not None and row["tp"] < before["tp"]:
+            problems.append(f"{row['parser']}: {row['document']} pogođeno {before['tp']} -> {row['tp']}")
+    if not same_corpus(current, baseline):
+        return problems
+
+    old = {(r["parser"], r.get("group")): r for r in baseline.get("summary", [])}
+    for row in current["summary"]:
+        before = old.get((row["parser"], row.get("group")))
+        if before is None:
+            continue
+        where = row["parser"] + (f"/{row['group']}" if row.get("group") else "")
+        for metric in ("precision", "recall"):
+            if before[metric] is not None and (row[metric] or 0.0) < before[metric] - tolerance:
+                problems.append(f"{where}: {metric} {before[metric]:.4f} -> {row[metric] or 0.0:.4f}")
+    for parser, rows in current.get("analytes", {}).items():
+        old_rows = {r["key"]: r for r in baseline.get("analytes", {}).get(parser, [])}
+        for row in rows:
+            before = old_rows.get(row["key"])
+            if before and before["tp"] > row["tp"]:
+                problems.append(f"{parser}: {row['analyte']} pogođeno {before['tp']} -> {row['tp']}")
+    return problems
+
+
+def latency_changes(current: Dict, baseline: Dict) -> List[str]:
+    """Promjena srednje latencije po parseru (informativno - zavisi od mašine); samo za isti korpus"""
+    if not same_corpus(current, baseline):
+        return []
+    old = {r["parser"]: r for r in baseline.get("summary", []) if "group" not in r}
+    out = []
+    for row in current["summary"]:
+        before = old.get(row["parser"]) if "group" not in row else None
+        if before and before.get("mean_ms") and row.get("mean_ms"):
+            out.append(f"{row['parser']}: {before['mean_ms']:.2f} ms -> {row['mean_ms']:.2f} ms "
+                       f"({row['mean_ms'] / before['mean_ms']:.2f}x)")
+    return out
+
+
+def _pct(value: Optional[float]) -> str:
+    return f"{value * 100:>7.1f}%" if value is not None else f"{'-':>8}"
+
+
+def format_table(report: Dict, analytes: bool = False) -> str:
+    """Kratak pregled za terminal: parser (ukupno i po grupi), opciono i po analitu"""
+    lines = [f"{'parser':<8}{'grupa':<18}{'dok':>4}{'precision':>10}{'recall':>8}{'F1':>8}"
+             f"{'jedinica':>9}{'ref':>8}{'ms p50':>9}{'ms p95':>9}"]
+    for r in report["summary"]:
+        lines.append(f"{r['parser']:<8}{r.get('group', 'ukupno'):<18}{r['documents']:>4}{_pct(r['precision']):>10}"
+                     f"{_pct(r['recall'])}{_pct(r['f1'])}{_pct(r['unit_accuracy']):>9}{_pct(r['ref_accuracy'])}"
+                     f"{r.get('p50_ms', 0):>9.2f}{r.get('p95_ms', 0):>9.2f}")
+    if analytes:
+        for parser, rows in report["analytes"].items():
+            lines.append("")
+            lines.append(f"{parser}: {'analit':<30}{'tp':>5}{'fp':>5}{'fn':>5}{'precision':>10}{'recall':>8}")
+            for r in rows:
+                lines.append(f"{'':<{len(parser) + 2}}{r['analyte'][:29]:<30}{r['tp']:>5}{r['fp']:>5}{r['fn']:>5}"
+                             f"{_pct(r['precision']):>10}{_pct(r['recall'])}")
+    return "\n".join(lines)
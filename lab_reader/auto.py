@@ -0,0 +1,228 @@
+"""Auto parser iz app_v2 (bez pretpostavki o formatu nalaza).
+
+Prije patterna se za svaku liniju jeftinim pretragama (broj, opseg,
+kvalitativno) provjeri koje familije patterna uopšte mogu pogoditi liniju -
+linija bez broja ili kvalitativnog rezultata ne ide ni kroz jedan regex,
+PAT_A/PAT_B se pokreću samo ako linija ima referencu itd.
+Isti kandidat (naziv, vrijednost, jedinica, ref, flag) koji pogodi više
+familija tumači se samo jednom, a za svaki (Analit, Tip) se odmah čuva samo
+najbolji red - ogromni DataFrame sa duplikatima se više ne pravi.
+
+Rezultat je isti kao kad se svih osam patterna iz app_v2 pusti na svaku
+liniju i duplikati izbace na kraju preko ``drop_duplicates``. Tablični
+pattern (kolone razdvojene sa 2+ razmaka) se ne pokreće: ``split_lines``
+svodi razmake na jedan, pa on nikad ne pogađa.
+
+Ako se iz zaglavlja prepozna laboratorija (lab_reader.formats), linije idu
+samo kroz patterne tog formata, a redovi tabele koje je napravio
+lab_reader.layout se čitaju direktno iz ćelija; generički put ostaje za
+nepoznate formate.
+"""
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .common import NUM, NUM_RE, QUAL, QUAL_RE, RANGE, UNIT, clean_name_and_type, d2f, normalize_units, parse_ref, status_from
+from .formats import LabFormat, detect_format
+from .frame import results_frame, set_column, status_column
+from .layout import split_cells
+from .matcher import KeywordMatcher
+from .record import LabResult
+from .parser import COLUMNS, KNOWN_ANALYTES, SKIP_WORDS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Poboljšani patterni koji rade sa različitim formatima
+PAT_UNIVERSAL = re.compile(
+    rf"(?P<an>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s+(?P<val>{NUM}|{QUAL})\s+(?P<un>{UNIT})?\s*(?P<ref>{RANGE})?"
+)
+
+# Pattern za državni sistem (format: Analit Vrijednost Jedinica Ref)
+PAT_STATE = re.compile(
+    rf"^(?P<an>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)\s+(?P<val>{NUM}|{QUAL})\s+(?P<un>{UNIT})?\s*(?P<ref>{RANGE})?\s*$"
+)
+
+# Stari patterni za kompatibilnost
+PAT_A = re.compile(  # Ime → [H/L]? → Vrijednost → (Jedinica) → Ref
+    rf"(?P<an>[A-Za-zČĆŠĐŽčćšđž\.\-% ]+?)\s+(?P<fl>[HL])?\s*(?P<val>{NUM}|{QUAL})\s+(?P<un>{UNIT})?\s*(?P<ref>{RANGE})"
+)
+PAT_B = re.compile(  # [H/L]? → Vrijednost → (Jedinica) → Ref → Ime
+    rf"(?P<fl>[HL])?\s*(?P<val>{NUM}|{QUAL})\s+(?P<un>{UNIT})?\s*(?P<ref>{RANGE})\s+(?P<an>[A-Za-zČĆŠĐŽčćšđž\.\-% ]+)"
+)
+PAT_C = re.compile(  # Ime → Vrijednost → Jedinica (bez ref)
+    rf"(?P<an>[A-Za-zČĆŠĐŽčćšđž\.\-% ]+?)\s+(?P<val>{NUM})\s+(?P<un>{UNIT})\b"
+)
+PAT_D = re.compile(  # Vrijednost → Jedinica → Ime (bez ref)
+    rf"(?P<val>{NUM})\s+(?P<un>{UNIT})\s+(?P<an>[A-Za-zČĆŠĐŽčćšđž\.\-% ]+)"
+)
+PAT_MOJLAB = re.compile(  # Specifično: val unit ref_low - ref_high K-Analit
+    rf"(?P<val>{NUM})\s+(?P<un>{UNIT})\s*(?P<low>{NUM})\s*-\s*(?P<high>{NUM})\s*(?P<an>K-[A-Za-zČĆŠĐŽčćšđž\.\-% ]+)$"
+)
+
+# Aho–Corasick automati nad rječnicima - jedan prolaz kroz naziv po rječniku
+SKIP_MATCHER = KeywordMatcher(SKIP_WORDS)
+KNOWN_MATCHER = KeywordMatcher(KNOWN_ANALYTES)
+
+def is_valid_analyte(name: str) -> bool:
+    """Proverava da li je naziv valjan analit"""
+    if not name or len(name.strip()) < 2:
+        return False
+
+    name_lower = name.lower().strip()
+
+    # Preskoči ako sadrži skip reči
+    if SKIP_MATCHER.search(name_lower):
+        return False
+
+    # Proveri da li sadrži poznate analite
+    if KNOWN_MATCHER.search(name_lower):
+        return True
+
+    # Proveri da li je kratak i smislen (1-3 reči)
+    words = name_lower.split()
+    if len(words) <= 3 and all(len(w) > 1 for w in words):
+        # Dodatna provera - ne sme biti samo brojevi ili kratke reči
+        if not all(w.isdigit() or len(w) < 3 for w in words):
+            return True
+
+    return False
+
+def interpret_auto_match(name_raw, val_raw, unit_raw, ref_raw, flag_raw, line, status=True) -> Optional[LabResult]:
+    name, typ = clean_name_and_type(name_raw, unit_raw or "")
+    unit = normalize_units(unit_raw or "")
+    # value
+    v_num = d2f(val_raw) if NUM_RE.fullmatch(val_raw or "") else None
+    v_qual = val_raw if v_num is None and val_raw else None
+
+    # Skip if no meaningful analyte name or invalid analyte
+    if not name or len(name.strip()) < 2 or not is_valid_analyte(name):
+        return None
+
+    # ref
+    ref_low, ref_high, ref_type, qual_ref = parse_ref(ref_raw)
+    return LabResult(
+        name, v_num if v_num is not None else v_qual, unit, typ=typ,
+        ref_low=ref_low, ref_high=ref_high, ref_type=ref_type, qual_ref=qual_ref,
+        flag=(flag_raw or "").strip(),
+        status=status_from(v_num, ref_low, ref_high, ref_type, v_qual, qual_ref) if status else None,
+        source="auto", text=line,
+    )
+
+# ---------------- Filteri linije ----------------
+# Nadskup onoga što familije traže: filter nikad ne preskoči liniju koju bi pattern pogodio
+_RANGE_RE = re.compile(rf"{NUM}\s*[~\-]\s*{NUM}|[<>]\s*{NUM}")
+
+
+def _groups(g: Dict, ref_key: Optional[str] = "ref", flag_key: Optional[str] = None) -> Tuple:
+    return (g["an"], g["val"], g.get("un"), g.get(ref_key) if ref_key else "", g.get(flag_key) if flag_key else "")
+
+
+def _candidates(line: str):
+    """Kandidati (an, val, un, ref, fl) redom kao u originalnom auto_parse, samo iz
+    familija koje po filterima linije mogu pogoditi liniju"""
+    has_num = NUM_RE.search(line) is not None
+    has_qual = QUAL_RE.search(line) is not None
+    if not (has_num or has_qual):
+        return
+    has_range = has_num and _RANGE_RE.search(line) is not None
+
+    # MojLab specifično
+    if has_range and "K-" in line:
+        m = PAT_MOJLAB.search(line)
+        if m:
+            g = m.groupdict()
+            yield g["an"], g["val"], g["un"], f"{g['low']}-{g['high']}", ""
+
+    # Novi univerzalni patterni (prioritet)
+    for m in PAT_UNIVERSAL.finditer(line):
+        yield _groups(m.groupdict())
+    for m in PAT_STATE.finditer(line):
+        yield _groups(m.groupdict())
+
+    # Stari patterni (fallback)
+    if has_range or has_qual:  # referenca (opseg, <x, >x ili kvalitativna) - za PAT_A i PAT_B
+        for m in PAT_A.finditer(line):
+            yield _groups(m.groupdict(), flag_key="fl")
+        for m in PAT_B.finditer(line):
+            yield _groups(m.groupdict(), flag_key="fl")
+    if has_num:
+        for m in PAT_C.finditer(line):
+            yield _groups(m.groupdict(), ref_key=None)
+        for m in PAT_D.finditer(line):
+            yield _groups(m.groupdict(), ref_key=None)
+
+
+def split_lines(text: str) -> List[str]:
+    lines = []
+    for ln in text.splitlines():
+        if split_cells(ln) is not None:  # red tabele iz lab_reader.layout - ćelije ostaju
+            lines.append(ln)
+            continue
+        s = " ".join(ln.split())
+        if not s: continue
+        parts = re.split(r"\s{3,}|\t+", s)  # dvokolonski split
+        if len(parts) > 1: lines.extend([p.strip() for p in parts if p.strip()])
+        else: lines.append(s)
+    return lines
+
+
+def _sort_key(row: LabResult) -> Tuple:
+    # isto kao sort_values(["Ref_low", "Ref_high"], na_position="last")
+    low, high = row.ref_low, row.ref_high
+    return (low is None, low or 0.0, high is None, high or 0.0)
+
+
+def _line_candidates(line: str, fmt: Optional[LabFormat]):
+    """Kandidati linije: ćelije direktno, poznat format preko svojih patterna, ostalo generičkim putem"""
+    cells = split_cells(line)
+    if cells is not None:
+        return [(cells.analyte, cells.value, cells.unit or None, cells.ref, cells.flag)]
+    if fmt is not None:
+        return fmt.candidates(line)
+    return _candidates(line)
+
+
+def auto_parse(text: str, detect: bool = True) -> "pd.DataFrame":
+    """Redovi iz teksta nalaza; sa ``detect`` se format laboratorije prepoznaje iz
+    zaglavlja (lab_reader.formats) i poznat format ne ide kroz generičke patterne"""
+    import pandas as pd
+
+    fmt = detect_format(text) if detect else None
+
+    # (Analit, Tip) -> (ključ sortiranja, redni broj reda, red)
+    best: Dict[Tuple[str, str], Tuple[Tuple, int, LabResult]] = {}
+    emitted = 0  # koliko bi redova originalni auto_parse napravio (za isti index)
+    line_counts: Dict[str, int] = {}
+
+    for line in split_lines(text):
+        # Ista linija daje iste redove, a kasniji duplikat nikad ne pobjeđuje raniji
+        if line in line_counts:
+            emitted += line_counts[line]
+            continue
+        first = emitted
+        seen: Dict[Tuple, Optional[LabResult]] = {}
+        for cand in _line_candidates(line, fmt):
+            if cand in seen:
+                if seen[cand] is not None:
+                    emitted += 1
+                continue
+            row = seen[cand] = interpret_auto_match(*cand, line, status=False)
+            if row is None:
+                continue
+            key = _sort_key(row)
+            slot = (row.analyte, row.typ)
+            if slot not in best or key < best[slot][0]:
+                best[slot] = (key, emitted, row)
+            emitted += 1
+        line_counts[line] = emitted - first
+
+    if not best:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # Poboljšana deduplikacija - red po referenci kao i ranije, pa po redosljedu pojavljivanja
+    ordered = sorted(best.values(), key=lambda item: (item[0], item[1]))
+    df = results_frame([row for _, _, row in ordered], COLUMNS, index=[idx for _, idx, _ in ordered])
+    # Status samo za redove koji su ostali, nad cijelom kolonom
+    set_column(df, "Status", status_column(df["Vrijednost"], df["Ref_low"], df["Ref_high"],
+                                           df["Ref_tip"], df["Ref_kval"]))
+    return df
@@ -0,0 +1,107 @@
+"""Paralelna obrada foldera - fajlovi se dijele na više procesa.
+
+Svaki proces radi kompletan put iz pipeline-a (native izvlačenje, pa OCR
+kao rezerva, parsiranje stranicu po stranicu) i vraća DataFrame; rezultati se vraćaju redom kojim se fajlovi
+završavaju, pa izlaz može da se piše odmah.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional
+
+from . import metrics
+from .dedup import AnalyteDeduplicator
+from .parser import COLUMNS, LabResultParser
+from .pipeline import iter_page_results
+from .preprocess import OcrSettings
+from .routing import document_method
+from .store import ReportInfo, report_info
+from .utils import default_workers
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+OUTPUT_COLUMNS = COLUMNS + ["Fajl"]
+
+_parser: Optional[LabResultParser] = None
+
+
+class BatchResult(NamedTuple):
+    path: str
+    method: str
+    frame: Optional["pd.DataFrame"]
+    error: Optional[str]
+    info: Optional[ReportInfo] = None  # particija za Parquet arhivu (lab_reader.store)
+    metrics: Optional[Dict] = None  # lab_reader.metrics (Metrics.to_dict), samo sa with_metrics
+
+
+def process_path(path: str, ocr_workers: Optional[int] = None, use_cache: bool = True,
+                 ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None,
+                 with_metrics: bool = False) -> BatchResult:
+    """Obrađuje jedan fajl u radnom procesu (parser se pravi jednom po procesu)
+
+    Sa ``with_metrics`` rezultat nosi vremena faza i brojače fajla (lab_reader.metrics).
+    """
+    if not with_metrics:
+        return _process_path(path, ocr_workers, use_cache, ocr_settings, layout)
+    with metrics.collect(os.path.basename(path)) as m:
+        res = _process_path(path, ocr_workers, use_cache, ocr_settings, layout)
+    m.info.update(method=res.method, rows=len(res.frame) if res.frame is not None else 0)
+    if res.info is not None:
+        m.info["lab"] = res.info.lab
+    if res.error:
+        m.info["error"] = res.error
+    return res._replace(metrics=m.to_dict())
+
+
+def _process_path(path: str, ocr_workers: Optional[int], use_cache: bool, ocr_settings: Optional[OcrSettings],
+                  layout: Optional[bool]) -> BatchResult:
+    global _parser
+    if _parser is None:
+        _parser = LabResultParser()
+
+    name = os.path.basename(path)
+    dedup = AnalyteDeduplicator(_parser.REF_COLUMNS)
+    methods, text_found, header = [], False, ""
+    try:
+        with open(path, "rb") as fh:
+            file_bytes = fh.read()
+        for page, rows in iter_page_results(name, file_bytes, _parser, ocr_workers=ocr_workers, use_cache=use_cache,
+                                            ocr_settings=ocr_settings, layout=layout):
+            methods.append(page.method)
+            text_found = text_found or bool(page.text.strip())
+            header = header or page.text
+            dedup.extend(rows)
+    except Exception as e:
+        return BatchResult(path, "", None, str(e))
+    metrics.count("dedup_dropped", dedup.dropped)
+    method = document_method(methods)
+    if not text_found:
+        return BatchResult(path, method, None, "Nije moguće izvući tekst.")
+
+    if not len(dedup):
+        return BatchResult(path, method, None, "Nije prepoznat nijedan red.")
+    df = dedup.frame()
+    df["Fajl"] = name
+    return BatchResult(path, method, df.reindex(columns=OUTPUT_COLUMNS), None, report_info(header, file_bytes))
+
+
+def iter_batch(paths: List[str], workers: Optional[int] = None, use_cache: bool = True,
+               ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None,
+               with_metrics: bool = False) -> Iterator[BatchResult]:
+    """Pokreće obradu na ``workers`` procesa i vraća rezultate kako koji fajl završi"""
+    workers = workers or default_workers()
+    if workers == 1:
+        for path in paths:
+            yield process_path(path, use_cache=use_cache, ocr_settings=ocr_settings, layout=layout,
+                               with_metrics=with_metrics)
+        return
+
+    # Paralelizam je već po fajlovima - OCR stranica unutar procesa ide na jednoj niti
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(process_path, p, 1, use_cache, ocr_settings, layout, with_metrics) for p in paths]
+        try:
+            for fut in as_completed(futures):
+                yield fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
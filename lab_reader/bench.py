@@ -0,0 +1,191 @@
+"""Benchmark faza obrade nad sintetičkim korpusom (lab_reader.corpus), rezultat u JSON-u.
+
+Za svaki raspored i veličinu nalaza mjeri se svaka faza posebno:
+native izvlačenje iz tekstualnog PDF-a, OCR skeniranog PDF-a, parsiranje
+(``LabResultParser.parse_text`` iz v3, ``LabResultParserV4`` iz v4,
+``auto_parse`` i ``targeted_parse`` iz v2) nad tekstom i nad tekstom
+izvučenim iz PDF-a, deduplikacija i izvoz (CSV, Excel). Za svaku fazu:
+fajlova/stranica/linija u sekundi (najbolje od ``repeat`` ponavljanja) i
+vrhunac Python memorije (tracemalloc, posebno pokretanje - alokacije u C
+bibliotekama kao MuPDF se ne vide).
+
+JSON ima ``label`` i podatke o okruženju, pa se izlazi dvije verzije mogu
+direktno porediti. Faza koja ne može da radi (npr. nema Tesseract-a) ima
+``skipped`` sa razlogom.
+
+``lab-reader bench --sizes 30,300 --files 3 -o bench.json``
+"""
+import datetime
+import io
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .corpus import FORMATS, LAYOUTS, SyntheticReport, generate_corpus, report_bytes, to_pdf, to_scanned_pdf
+from .utils import default_workers
+
+DEFAULT_SIZES = (30, 300)
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(fn: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure(stage: str, fn: Callable[[], object], files: int, pages: int, lines: int, repeat: int = 3,
+            memory: bool = True, **extra) -> Dict:
+    """Jedan red rezultata: ``fn`` obrađuje ``files`` fajlova sa ukupno ``pages`` stranica i ``lines`` linija"""
+    seconds = _best_time(fn, repeat)
+    row = {"stage": stage, **extra, "files": files, "pages": pages, "lines": lines,
+           "seconds": round(seconds, 6),
+           "files_per_s": round(files / seconds, 2) if seconds else None,
+           "pages_per_s": round(pages / seconds, 2) if seconds else None,
+           "lines_per_s": round(lines / seconds, 1) if seconds else None}
+    if memory:
+        row["peak_mb"] = round(_peak_mb(fn), 2)
+    return row
+
+
+def _skipped(stage: str, reason: str, **extra) -> Dict:
+    return {"stage": stage, **extra, "skipped": reason}
+
+
+def environment(label: str = "") -> Dict:
+    from . import __version__
+
+    return {"label": label, "lab_reader": __version__, "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": default_workers(),
+            "time": datetime.datetime.now().isoformat(timespec="seconds")}
+
+
+def _group_stages(reports: List[SyntheticReport], formats: Sequence[str], repeat: int, memory: bool,
+                  ocr_dpi: int, extra: Dict) -> List[Dict]:
+    import pandas as pd
+
+    from .auto import auto_parse
+    from .dedup import drop_duplicate_analytes
+    from .export import write_csv, write_excel
+    from .ocr import TesseractNotFoundError, extract_pages_from_pdf_with_ocr
+    from .parser import LabResultParser
+    from .parser_v4 import LabResultParserV4
+    from .pipeline import extract_pages
+    from .targeted import targeted_parse
+
+    out = []
+    files = len(reports)
+    pages = sum(len(r.pages) for r in reports)
+    lines = sum(r.lines for r in reports)
+    sources = {}
+    if "text" in formats:
+        sources["text"] = [r.text for r in reports]
+
+    if "pdf" in formats or "scan" in formats:
+        pdfs = [to_pdf(r) for r in reports]
+        if "pdf" in formats:
+            extract = lambda: [extract_pages(f"{r.name}.pdf", b, use_cache=False) for r, b in zip(reports, pdfs)]
+            out.append(measure("extract_native", extract, files, pages, lines, repeat, memory, input="pdf", **extra))
+            sources["pdf"] = ["".join(p + "\n" for p in pg) for pg, _ in extract()]
+        if "scan" in formats:
+            scans = [to_scanned_pdf(r, dpi=ocr_dpi, pdf_bytes=b) for r, b in zip(reports, pdfs)]
+            ocr = lambda: [extract_pages_from_pdf_with_ocr(b) for b in scans]
+            try:
+                ocr()
+            except (TesseractNotFoundError, ImportError) as e:
+                out.append(_skipped("ocr", str(e) or type(e).__name__, input="scan", **extra))
+            else:
+                out.append(measure("ocr", ocr, files, pages, lines, repeat=1, memory=memory, input="scan", **extra))
+
+    v3, v4 = LabResultParser(), LabResultParserV4()
+    parsers = [("parse_text", v3.parse_text), ("parse_text_v4", v4.parse_text),
+               ("auto_parse", auto_parse), ("targeted_parse", targeted_parse)]
+    for source, texts in sources.items():
+        for stage, parse in parsers:
+            run = lambda: [parse(t) for t in texts]
+            row = measure(stage, run, files, pages, lines, repeat, memory, input=source, **extra)
+            row["rows"] = sum(len(df) for df in run())
+            out.append(row)
+
+    # Deduplikacija i izvoz nad rezultatima auto_parse (radi na svim rasporedima); svaki nalaz dvaput
+    texts = sources.get("text") or sources.get("pdf") or []
+    if texts:
+        frames = [auto_parse(t) for t in texts]
+        combined = pd.concat(frames + frames, ignore_index=True)
+        ref_cols = [c for c in ("Ref_low", "Ref_high", "Ref_tip") if c in combined.columns]
+        out.append(measure("dedup", lambda: drop_duplicate_analytes(combined, ref_cols), files, pages, lines,
+                           repeat, memory, rows=len(combined), **extra))
+        result = drop_duplicate_analytes(combined, ref_cols)
+        out.append(measure("export_csv", lambda: write_csv(result, io.BytesIO()), files, pages, lines,
+                           repeat, memory, rows=len(result), **extra))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.xlsx")
+            out.append(measure("export_xlsx", lambda: write_excel(result, path), files, pages, lines,
+                               repeat, memory, rows=len(result), **extra))
+    return out
+
+
+def run_benchmark(layouts: Sequence[str] = LAYOUTS, sizes: Sequence[int] = DEFAULT_SIZES, files: int = 3,
+                  formats: Sequence[str] = FORMATS, repeat: int = 3, memory: bool = True, seed: int = 0,
+                  ocr_dpi: int = 200, label: str = "",
+                  progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """Sve faze za svaki (raspored, veličina); vraća rječnik spreman za JSON"""
+    results = []
+    for layout in layouts:
+        for size in sizes:
+            if progress:
+                progress(f"{layout}, {size} redova x {files} fajlova")
+            reports = generate_corpus([layout], [size], files, seed)
+            results.extend(_group_stages(reports, formats, repeat, memory, ocr_dpi,
+                                         {"layout": layout, "size": size}))
+    return {"environment": environment(label),
+            "config": {"layouts": list(layouts), "sizes": list(sizes), "files": files, "formats": list(formats),
+                       "repeat": repeat, "memory": memory, "seed": seed, "ocr_dpi": ocr_dpi},
+            "results": results}
+
+
+def save_corpus(folder: str, layouts: Sequence[str] = LAYOUTS, sizes: Sequence[int] = DEFAULT_SIZES,
+                files: int = 3, formats: Sequence[str] = FORMATS, seed: int = 0) -> List[str]:
+    """Upisuje korpus u folder (fajl po nalazu i formatu + ``<ime>.expected.csv`` sa očekivanim rezultatima)"""
+    import pandas as pd
+
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for report in generate_corpus(layouts, sizes, files, seed):
+        for fmt in formats:
+            name, data = report_bytes(report, fmt)
+            path = os.path.join(folder, name)
+            with open(path, "wb") as fh:
+                fh.write(data)
+            written.append(path)
+        expected = pd.DataFrame(report.expected, columns=["Analit", "Vrijednost", "Jedinica", "Ref_low", "Ref_high"])
+        expected.to_csv(os.path.join(folder, f"{report.name}.expected.csv"), index=False)
+    return written
+
+
+def format_table(results: List[Dict]) -> str:
+    """Kratak pregled za terminal"""
+    lines = [f"{'faza':<16}{'raspored':<13}{'redova':>7} {'ulaz':<6}{'s':>9}{'linija/s':>12}{'str/s':>9}{'MB':>8}"]
+    for r in results:
+        head = f"{r['stage']:<16}{r.get('layout', ''):<13}{r.get('size', ''):>7} {r.get('input', ''):<6}"
+        if "skipped" in r:
+            lines.append(head + f"  preskočeno: {r['skipped']}")
+            continue
+        peak = r.get("peak_mb")
+        lines.append(head + f"{r['seconds']:>9.4f}{r['lines_per_s']:>12.0f}{r['pages_per_s']:>9.1f}"
+                     + (f"{peak:>8.1f}" if peak is not None else ""))
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+"""Trajni keš izvučenog teksta na disku (SQLite).
+
+Ključ je SHA-256 sadržaja fajla + verzija podešavanja ekstrakcije/OCR-a, a
+vrijednost tekst i metod (native/ocr) po stranicama. Keš dijele UI i CLI, pa
+ponovni upload istog nalaza ili ponovno pokretanje nakon izmjene parsera ne
+ide ponovo kroz PDF parsiranje i OCR. Kad keš pređe ``max_bytes``, brišu se
+najdavnije korišćeni unosi (LRU).
+
+Lokacija: ``LAB_READER_CACHE_DIR`` (podrazumijevano ``~/.cache/lab_reader``),
+limit: ``LAB_READER_CACHE_MAX_MB`` (512), isključivanje: ``LAB_READER_CACHE=0``.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .routing import document_method
+
+DEFAULT_MAX_MB = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    method TEXT,
+    PRIMARY KEY (key, page)
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+# Kolone dodate poslije prve verzije tabela - baza napravljena ranije ih dobija pri otvaranju
+_ADDED_COLUMNS = {"pages": {"method": "TEXT"}}
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("LAB_READER_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "lab_reader")
+
+
+def make_key(file_bytes: bytes, settings: str) -> str:
+    """Ključ keša: hash sadržaja + hash podešavanja ekstrakcije"""
+    content = hashlib.sha256(file_bytes).hexdigest()
+    return content + ":" + hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+
+class ExtractionCache:
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), "extract.sqlite3")
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("LAB_READER_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+            for table, columns in _ADDED_COLUMNS.items():
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, kind in columns.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Nova konekcija po pozivu - radi iz više niti (Streamlit) i procesa (batch)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[List[str], List[str]]]:
+        """Vraća (stranice, metod po stranici) ili None ako ključ nije u kešu (ili keš nije dostupan)"""
+        try:
+            return self._get(key)
+        except sqlite3.Error:
+            self.misses += 1
+            return None
+
+    def put(self, key: str, pages: List[str], methods: List[str]) -> None:
+        """Upisuje rezultat (metod za svaku stranicu); greške keša (zaključan/pun disk) ne smiju prekinuti obradu"""
+        try:
+            self._put(key, pages, methods)
+        except sqlite3.Error:
+            pass
+
+    def _get(self, key: str) -> Optional[Tuple[List[str], List[str]]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT method FROM entries WHERE key = ?", (key,)).fetchone()
+            rows = conn.execute("SELECT text, method FROM pages WHERE key = ? ORDER BY page", (key,)).fetchall()
+            # Unos iz vremena bez metoda po stranici: "mixed" se ne može raspodijeliti po stranicama
+            if row is None or (row[0] == "mixed" and any(m is None for _, m in rows)):
+                self.misses += 1
+                return None
+            with conn:
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+        self.hits += 1
+        return [t for t, _ in rows], [m or row[0] for _, m in rows]
+
+    def _put(self, key: str, pages: List[str], methods: List[str]) -> None:
+        size = sum(len(p.encode("utf-8")) for p in pages) + len(key)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                conn.execute("INSERT OR REPLACE INTO entries (key, method, size, last_access) VALUES (?, ?, ?, ?)",
+                             (key, document_method(methods), size, time.time()))
+                conn.executemany("INSERT INTO pages (key, page, text, method) VALUES (?, ?, ?, ?)",
+                                 [(key, i, p, m) for i, (p, m) in enumerate(zip(pages, methods))])
+            self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Briše najdavnije korišćene unose dok ukupna veličina ne padne ispod limita"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        with conn:
+            conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM pages")
+                conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        finally:
+            conn.close()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+_default_cache: Optional[ExtractionCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ExtractionCache]:
+    """Zajednički keš procesa; None ako je isključen (LAB_READER_CACHE=0) ili nedostupan"""
+    global _default_cache
+    if os.environ.get("LAB_READER_CACHE", "1") in ("0", "false", "no"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ExtractionCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return _default_cache
@@ -0,0 +1,487 @@
+"""Komandna linija.
+
+``lab-reader parse <fajlovi/folderi> -o izlaz.csv`` - serijski, u jednom procesu
+``lab-reader batch <fajlovi/folderi> -o izlaz.csv -j 8`` - paralelno, izlaz se piše čim fajl završi
+``lab-reader batch <fajlovi/folderi> --store [folder]`` - isto, ali se svaki nalaz dodaje u Parquet arhivu
+``lab-reader batch <fajlovi/folderi> -o izlaz.csv --metrics m.jsonl`` - uz vremena faza po fajlu (JSON Lines)
+``lab-reader batch <fajlovi/folderi> -o izlaz.csv --profile spor-lab`` - uz profil (pstats) i vrijeme po formatu linije
+``lab-reader query --from 2024-06-01 --to 2024-06-30 -c Analit,Vrijednost`` - čitanje iz arhive
+``lab-reader cache --stats|--clear`` - trajni keš izvučenog teksta
+``lab-reader worker -j 2`` - radnik reda poslova iz UI-ja (obrada u pozadini)
+``lab-reader serve --port 8765 -j 4`` - lokalni HTTP servis (POST /extract sa PDF-om/slikom -> JSON)
+``lab-reader bench --sizes 30,300 -o bench.json`` - benchmark faza nad sintetičkim nalazima
+``lab-reader accuracy --golden golden --docs . -o acc.json`` - tačnost i brzina parsera v2/v3/v4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from . import metrics, profiling
+from .batch import OUTPUT_COLUMNS, default_workers, iter_batch
+from .cache import ExtractionCache
+from .jobs import JobQueue, default_job_workers
+from .pipeline import list_input_files, process_file
+from .preprocess import OcrSettings
+from .store import PARTITION_COLUMNS, ResultStore
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Folderi se proširuju na PDF-ove i slike u njima, fajlovi ostaju kakvi jesu"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(list_input_files(item))
+        else:
+            paths.append(item)
+    return paths
+
+
+def ocr_settings_from_args(args: argparse.Namespace) -> OcrSettings:
+    """Podešavanja iz okruženja, pa izmjene sa komandne linije"""
+    settings = OcrSettings.from_env()
+    if args.ocr_dpi is not None:
+        settings = settings._replace(dpi=0 if args.ocr_dpi == "auto" else int(args.ocr_dpi))
+    if args.ocr_binarize:
+        settings = settings._replace(binarize=True)
+    if args.no_ocr_crop:
+        settings = settings._replace(crop=False)
+    if args.ocr_color:
+        settings = settings._replace(grayscale=False)
+    return settings
+
+
+def _open_metrics(args: argparse.Namespace):
+    """Izlaz za --metrics: fajl (dopisuje se) ili stderr; None bez opcije"""
+    if args.metrics is None:
+        return None
+    return open(args.metrics, "a", encoding="utf-8") if args.metrics else sys.stderr
+
+
+@contextmanager
+def _profiled(args: argparse.Namespace) -> Iterator[None]:
+    """Sa --profile obrada u bloku ide kroz profiler; izlaz se upisuje i pregled štampa na kraju"""
+    if args.profile is None:
+        yield
+        return
+    with profiling.profile(args.profile_mode) as prof:
+        yield
+    paths = prof.write(args.profile or profiling.default_prefix())
+    print(prof.summary(), file=sys.stderr)
+    print(f"Profil: {', '.join(paths)}", file=sys.stderr)
+
+
+def _log_file_metrics(log, record: dict, export_seconds: float, run: metrics.Metrics) -> None:
+    if export_seconds:
+        record["stages"]["export"] = round(record["stages"].get("export", 0.0) + export_seconds, 6)
+    run.merge(record)
+    metrics.write_json_line(record, log)
+
+
+def _cmd_parse(args: argparse.Namespace) -> int:
+    settings = ocr_settings_from_args(args)
+    log = _open_metrics(args)
+    out = None  # izlaz se otvara tek uz prvi rezultat (bez praznog fajla kad nema ničega)
+    files = failed = rows = 0
+    try:
+        with metrics.collect("parse", scope="run") as run, _profiled(args):
+            for path in expand_inputs(args.inputs):
+                name = os.path.basename(path)
+                files += 1
+                with metrics.collect(name) as m:
+                    try:
+                        with open(path, "rb") as fh:
+                            df = process_file(name, fh.read(), use_cache=not args.no_cache, ocr_settings=settings,
+                                              layout=False if args.no_layout else None)
+                    except Exception as e:
+                        df, m.info["error"] = None, str(e)
+                    m.info["rows"] = 0 if df is None else len(df)
+                record = m.to_dict()
+                if df is None or df.empty:
+                    failed += 1
+                    if df is None:
+                        print(f"❌ {name}: {record['error']}", file=sys.stderr)
+                    else:
+                        print(f"⚠️ {name}: Nije prepoznat nijedan red.", file=sys.stderr)
+                    if log is not None:
+                        _log_file_metrics(log, record, 0.0, run)
+                    continue
+                df["Fajl"] = name
+                # Svaki fajl se upisuje čim je obrađen - izlaz ne čeka na cijeli spisak
+                start = time.perf_counter()
+                header = out is None
+                if header:
+                    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+                df.to_csv(out, header=header, index=False, columns=OUTPUT_COLUMNS)
+                out.flush()
+                rows += len(df)
+                if log is not None:
+                    _log_file_metrics(log, record, time.perf_counter() - start, run)
+        if log is not None:
+            run.info.update(files=files, failed=failed, rows=rows)
+            metrics.write_json_line(run.to_dict(), log)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+        if log is not None and log is not sys.stderr:
+            log.close()
+
+    if out is None:
+        print("No results parsed.", file=sys.stderr)
+        return 1
+    if args.output:
+        print(f"Saved: {args.output}", file=sys.stderr)
+    return 0
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("Nema PDF-ova/slika za obradu.", file=sys.stderr)
+        return 1
+
+    # Sa --store bez -o nema CSV-a - rezultati idu samo u arhivu
+    store = ResultStore(args.store or None) if args.store is not None else None
+    if args.output:
+        out = open(args.output, "w", encoding="utf-8", newline="")
+    else:
+        out = sys.stdout if store is None else None
+    log = _open_metrics(args)
+    run = metrics.Metrics("batch", scope="run")
+    workers = args.workers
+    if args.profile is not None and workers != 1:
+        # Profiler vidi samo svoj proces - sa --profile fajlovi se obrađuju redom u ovom procesu
+        print("--profile: obrada u jednom procesu (-j 1)", file=sys.stderr)
+        workers = 1
+    header = True
+    rows = failed = 0
+    try:
+        with _profiled(args):
+            for i, res in enumerate(iter_batch(paths, workers=workers, use_cache=not args.no_cache,
+                                               ocr_settings=ocr_settings_from_args(args),
+                                               layout=False if args.no_layout else None,
+                                               with_metrics=log is not None), 1):
+                name = os.path.basename(res.path)
+                if res.frame is None:
+                    failed += 1
+                    print(f"[{i}/{len(paths)}] ❌ {name}: {res.error}", file=sys.stderr)
+                    if log is not None:
+                        _log_file_metrics(log, res.metrics, 0.0, run)
+                    continue
+                start = time.perf_counter()
+                if out is not None:
+                    res.frame.to_csv(out, header=header, index=False, columns=OUTPUT_COLUMNS)
+                    out.flush()
+                    header = False
+                if store is not None:
+                    store.append(res.frame, res.info)
+                rows += len(res.frame)
+                if log is not None:
+                    _log_file_metrics(log, res.metrics, time.perf_counter() - start, run)
+                print(f"[{i}/{len(paths)}] ✅ {name}: {len(res.frame)} redova ({res.method})", file=sys.stderr)
+        if log is not None:
+            run.finish()
+            run.info.update(files=len(paths), failed=failed, rows=rows, workers=workers)
+            metrics.write_json_line(run.to_dict(), log)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+        if log is not None and log is not sys.stderr:
+            log.close()
+
+    print(f"Gotovo: {len(paths) - failed}/{len(paths)} fajlova, {rows} redova.", file=sys.stderr)
+    if store is not None:
+        print(f"Arhiva: {store.root}", file=sys.stderr)
+    return 0 if rows else 1
+
+
+def _cmd_query(args: argparse.Namespace) -> int:
+    store = ResultStore(args.store)
+    columns = args.columns.split(",") if args.columns else None
+    df = store.read(columns=columns, start=args.date_from, end=args.date_to, labs=args.lab,
+                    patients=args.patient, analytes=args.analyte, text_values=True)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Saved: {args.output} ({len(df)} redova)", file=sys.stderr)
+    else:
+        df.to_csv(sys.stdout, index=False)
+    return 0 if len(df) else 1
+
+
+def _cmd_cache(args: argparse.Namespace) -> int:
+    cache = ExtractionCache()
+    if args.clear:
+        cache.clear()
+        print(f"Keš obrisan: {cache.path}", file=sys.stderr)
+    stats = cache.stats()
+    print(f"{cache.path}: {stats['entries']} unosa, {stats['bytes'] / 1024 / 1024:.1f} MB "
+          f"(limit {cache.max_bytes / 1024 / 1024:.0f} MB)")
+    return 0
+
+
+def _cmd_worker(args: argparse.Namespace) -> int:
+    queue = JobQueue()
+    print(f"Radnik reda poslova: {queue.path} ({args.workers} niti), Ctrl+C za kraj", file=sys.stderr)
+    queue.start_workers(args.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .server import ExtractionService, make_server
+
+    service = ExtractionService(workers=args.workers, max_concurrent=args.max_concurrent, timeout=args.timeout,
+                                queue_wait=args.queue_wait, max_bytes=args.max_mb * 1024 * 1024,
+                                ocr_settings=ocr_settings_from_args(args))
+    print(f"Zagrijavam {service.workers} radnih procesa...", file=sys.stderr)
+    try:
+        service.start()
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    server = make_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Servis: http://{host}:{port}/extract (OCR: {service.ocr}), Ctrl+C za kraj", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from .bench import format_table, run_benchmark, save_corpus
+
+    options = dict(layouts=args.layouts, sizes=args.sizes, files=args.files, formats=args.formats, seed=args.seed)
+    if args.save_corpus:
+        written = save_corpus(args.save_corpus, **options)
+        print(f"Korpus: {args.save_corpus} ({len(written)} fajlova)", file=sys.stderr)
+        return 0
+    report = run_benchmark(repeat=args.repeat, memory=not args.no_memory, label=args.label,
+                           progress=lambda msg: print(f"⏱ {msg}", file=sys.stderr), **options)
+    print(format_table(report["results"]), file=sys.stderr)
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(data + "\n")
+        print(f"Saved: {args.output}", file=sys.stderr)
+    else:
+        print(data)
+    return 0
+
+
+def _cmd_accuracy(args: argparse.Namespace) -> int:
+    from .accuracy import (compare, format_table, golden_documents, latency_changes, run_accuracy, same_corpus,
+                           synthetic_documents)
+
+    docs = []
+    if not args.no_synthetic:
+        docs.extend(synthetic_documents(args.layouts, args.sizes, args.files, args.formats, args.seed))
+    for folder in args.golden or []:
+        found = golden_documents(folder, args.docs or [])
+        if not found:
+            print(f"Upozorenje: nema dokumenata za *.expected.csv u {folder}", file=sys.stderr)
+        docs.extend(found)
+    if not docs:
+        print("Nema dokumenata za provjeru.", file=sys.stderr)
+        return 1
+    report = run_accuracy(docs, args.parsers, repeat=args.repeat, label=args.label,
+                          progress=lambda msg: print(f"⏱ {msg}", file=sys.stderr))
+    print(format_table(report, analytes=args.analytes), file=sys.stderr)
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(data + "\n")
+        print(f"Saved: {args.output}", file=sys.stderr)
+    else:
+        print(data)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if not same_corpus(report, baseline):
+        print("Upozorenje: korpus se razlikuje od --baseline, porede se samo zajednički dokumenti", file=sys.stderr)
+    for line in latency_changes(report, baseline):
+        print(f"⏱ {line}", file=sys.stderr)
+    problems = compare(report, baseline, args.tolerance)
+    for line in problems:
+        print(f"❌ {line}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def _csv_list(choices: Optional[List[str]] = None, convert=str):
+    def parse(value: str) -> list:
+        items = [convert(v.strip()) for v in value.split(",") if v.strip()]
+        unknown = [v for v in items if choices is not None and v not in choices]
+        if unknown or not items:
+            raise argparse.ArgumentTypeError(f"očekuje se lista odvojena zarezom iz: {', '.join(choices or [])}")
+        return items
+    return parse
+
+
+def _positive_int(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"očekuje se cijeli broj veći od 0, a ne {value!r}")
+    return n
+
+
+def _dpi(value: str) -> str:
+    if value != "auto" and not (value.isdigit() and int(value) > 0):
+        raise argparse.ArgumentTypeError("očekuje se 'auto' ili pozitivan broj")
+    return value
+
+
+def _add_metrics_argument(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--metrics", nargs="?", const="", metavar="FILE",
+                   help="Vremena faza i brojači po fajlu i stranici kao JSON Lines (dopisuje u FILE, bez FILE na stderr)")
+
+
+def _add_profile_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--profile", nargs="?", const="", metavar="PREFIX",
+                   help="Profiliši izvlačenje/OCR/parsiranje: PREFIX.prof (ili .folded) i PREFIX.patterns.json "
+                        "(vrijeme po formatu linije); bez PREFIX ime sa vremenom pokretanja")
+    p.add_argument("--profile-mode", choices=profiling.MODES, default="cprofile",
+                   help="cprofile (pstats) ili sample (uzorkovanje steka svih niti, za flamegraph)")
+
+
+def _add_ocr_arguments(p: argparse.ArgumentParser) -> None:
+    g = p.add_argument_group("OCR (podrazumijevano iz LAB_READER_OCR_* promjenljivih)")
+    g.add_argument("--ocr-dpi", type=_dpi, help="DPI renderovanja skeniranih stranica ili 'auto' (po veličini stranice)")
+    g.add_argument("--ocr-binarize", action="store_true", help="Binarizuj sliku prije OCR-a (Otsu prag)")
+    g.add_argument("--no-ocr-crop", action="store_true", help="Ne isijecaj sliku na oblast sa sadržajem")
+    g.add_argument("--ocr-color", action="store_true", help="OCR nad slikom u boji umjesto sivih tonova")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="lab-reader", description="Čitač laboratorijskih nalaza (bez UI)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("parse", help="Parsira PDF-ove/slike u jedan CSV")
+    p.add_argument("inputs", nargs="+", help="Fajlovi ili folderi sa PDF-ovima/slikama")
+    p.add_argument("-o", "--output", help="Izlazni CSV (podrazumijevano stdout)")
+    p.add_argument("--no-cache", action="store_true", help="Ne koristi trajni keš izvučenog teksta")
+    p.add_argument("--no-layout", action="store_true", help="Ne čitaj kolone tabele iz položaja riječi (samo tekst)")
+    _add_metrics_argument(p)
+    _add_profile_arguments(p)
+    _add_ocr_arguments(p)
+    p.set_defaults(func=_cmd_parse)
+
+    b = sub.add_parser("batch", help="Paralelna obrada mnogo fajlova (više procesa)")
+    b.add_argument("inputs", nargs="+", help="Fajlovi ili folderi sa PDF-ovima/slikama")
+    b.add_argument("-o", "--output", help="Izlazni CSV (podrazumijevano stdout)")
+    b.add_argument("-j", "--workers", type=_positive_int, default=default_workers(),
+                   help="Broj radnih procesa (podrazumijevano broj jezgara)")
+    b.add_argument("--no-cache", action="store_true", help="Ne koristi trajni keš izvučenog teksta")
+    b.add_argument("--no-layout", action="store_true", help="Ne čitaj kolone tabele iz položaja riječi (samo tekst)")
+    b.add_argument("--store", nargs="?", const="", metavar="FOLDER",
+                   help="Dodaj rezultate u Parquet arhivu (podrazumijevano LAB_READER_STORE_DIR); bez -o nema CSV-a")
+    _add_metrics_argument(b)
+    _add_profile_arguments(b)
+    _add_ocr_arguments(b)
+    b.set_defaults(func=_cmd_batch)
+
+    q = sub.add_parser("query", help="Čita rezultate iz Parquet arhive u CSV")
+    q.add_argument("--store", metavar="FOLDER", help="Folder arhive (podrazumijevano LAB_READER_STORE_DIR)")
+    q.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD", help="Od datuma uzorkovanja")
+    q.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD", help="Do datuma uzorkovanja (uključivo)")
+    q.add_argument("--lab", action="append", help="Samo ova laboratorija (može više puta)")
+    q.add_argument("--patient", action="append", help="Samo ovaj pacijent (hash, može više puta)")
+    q.add_argument("--analyte", action="append", help="Samo ovaj analit (može više puta)")
+    q.add_argument("-c", "--columns",
+                   help=f"Kolone odvojene zarezom (podrazumijevano sve, uz {', '.join(PARTITION_COLUMNS)})")
+    q.add_argument("-o", "--output", help="Izlazni CSV (podrazumijevano stdout)")
+    q.set_defaults(func=_cmd_query)
+
+    c = sub.add_parser("cache", help="Stanje trajnog keša izvučenog teksta")
+    c.add_argument("--clear", action="store_true", help="Obriši sve unose")
+    c.set_defaults(func=_cmd_cache)
+
+    w = sub.add_parser("worker", help="Obrađuje red poslova iz UI-ja (obrada u pozadini); može više procesa")
+    w.add_argument("-j", "--workers", type=_positive_int, default=default_job_workers(),
+                   help="Broj radnih niti (podrazumijevano LAB_READER_JOB_WORKERS ili broj jezgara)")
+    w.set_defaults(func=_cmd_worker)
+
+    from .server import DEFAULT_HOST, DEFAULT_MAX_MB, DEFAULT_PORT, DEFAULT_QUEUE_WAIT, DEFAULT_TIMEOUT
+
+    s = sub.add_parser("serve", help="Lokalni HTTP servis: POST /extract (PDF/slika) vraća redove kao JSON")
+    s.add_argument("--host", default=DEFAULT_HOST, help="Adresa (podrazumijevano %(default)s - samo ovaj računar)")
+    s.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port (podrazumijevano %(default)s)")
+    s.add_argument("-j", "--workers", type=_positive_int, default=default_workers(),
+                   help="Zagrijanih radnih procesa (podrazumijevano broj jezgara)")
+    s.add_argument("--max-concurrent", type=_positive_int,
+                   help="Najviše fajlova u obradi istovremeno (podrazumijevano broj radnih procesa)")
+    s.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                   help="Sekundi po zahtjevu prije odgovora 504 (podrazumijevano %(default)s)")
+    s.add_argument("--queue-wait", type=float, default=DEFAULT_QUEUE_WAIT,
+                   help="Sekundi čekanja na slobodno mjesto prije odgovora 503 (podrazumijevano %(default)s)")
+    s.add_argument("--max-mb", type=_positive_int, default=DEFAULT_MAX_MB, help="Najveći fajl u MB (podrazumijevano %(default)s)")
+    _add_ocr_arguments(s)
+    s.set_defaults(func=_cmd_serve)
+
+    from .bench import DEFAULT_SIZES
+    from .corpus import FORMATS, LAYOUTS
+
+    n = sub.add_parser("bench", help="Benchmark faza (izvlačenje, OCR, parseri, dedup, izvoz) u JSON")
+    n.add_argument("--layouts", type=_csv_list(LAYOUTS), default=LAYOUTS,
+                   help=f"Rasporedi nalaza (podrazumijevano {','.join(LAYOUTS)})")
+    n.add_argument("--sizes", type=_csv_list(convert=int), default=list(DEFAULT_SIZES),
+                   help="Broj redova po nalazu, odvojeno zarezom (podrazumijevano %(default)s)")
+    n.add_argument("--files", type=int, default=3, help="Nalaza po rasporedu i veličini (podrazumijevano 3)")
+    n.add_argument("--formats", type=_csv_list(FORMATS), default=FORMATS,
+                   help=f"Ulazi: {','.join(FORMATS)} (scan = rasterizovani PDF za OCR)")
+    n.add_argument("--repeat", type=int, default=3, help="Ponavljanja po fazi, uzima se najbrže")
+    n.add_argument("--seed", type=int, default=0, help="Seed generatora korpusa")
+    n.add_argument("--no-memory", action="store_true", help="Bez mjerenja memorije (tracemalloc je spor)")
+    n.add_argument("--label", default="", help="Oznaka pokretanja u JSON-u (npr. verzija ili grana)")
+    n.add_argument("--save-corpus", metavar="FOLDER", help="Samo upiši generisani korpus u folder i završi")
+    n.add_argument("-o", "--output", help="Izlazni JSON (podrazumijevano stdout)")
+    n.set_defaults(func=_cmd_bench)
+
+    from .accuracy import DEFAULT_FORMATS, PARSERS
+
+    a = sub.add_parser("accuracy", help="Precision/recall po analitu i latencija parsera v2/v3/v4 nad označenim korpusom")
+    a.add_argument("--parsers", type=_csv_list(list(PARSERS)), default=list(PARSERS),
+                   help=f"Parseri (podrazumijevano {','.join(PARSERS)})")
+    a.add_argument("--golden", action="append", metavar="FOLDER",
+                   help="Folder sa <ime>.expected.csv ručno označenih nalaza (može više puta)")
+    a.add_argument("--docs", action="append", metavar="FOLDER",
+                   help="Gdje još tražiti nalaze za --golden (podrazumijevano samo isti folder)")
+    a.add_argument("--no-synthetic", action="store_true", help="Bez sintetičkih nalaza, samo --golden")
+    a.add_argument("--layouts", type=_csv_list(LAYOUTS), default=LAYOUTS,
+                   help=f"Rasporedi sintetičkih nalaza (podrazumijevano {','.join(LAYOUTS)})")
+    a.add_argument("--sizes", type=_csv_list(convert=int), default=[30],
+                   help="Broj redova po sintetičkom nalazu, odvojeno zarezom (podrazumijevano %(default)s)")
+    a.add_argument("--files", type=int, default=1, help="Sintetičkih nalaza po rasporedu i veličini")
+    a.add_argument("--formats", type=_csv_list(FORMATS), default=list(DEFAULT_FORMATS),
+                   help=f"Ulazi sintetičkih nalaza: {','.join(FORMATS)} (podrazumijevano {','.join(DEFAULT_FORMATS)})")
+    a.add_argument("--seed", type=int, default=0, help="Seed generatora korpusa")
+    a.add_argument("--repeat", type=int, default=3, help="Parsiranja po dokumentu, latencija je najbrže")
+    a.add_argument("--analytes", action="store_true", help="Ispiši i tabelu po analitu")
+    a.add_argument("--label", default="", help="Oznaka pokretanja u JSON-u (npr. verzija ili grana)")
+    a.add_argument("--baseline", metavar="JSON", help="Raniji izlaz; izlazni kod 1 ako je precision/recall pao")
+    a.add_argument("--tolerance", type=float, default=0.0, help="Dozvoljeni pad precision/recall uz --baseline")
+    a.add_argument("-o", "--output", help="Izlazni JSON (podrazumijevano stdout)")
+    a.set_defaults(func=_cmd_accuracy)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
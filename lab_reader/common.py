@@ -0,0 +1,97 @@
+"""Zajednički dijelovi auto i ciljanog parsera (iz app_v2)."""
+import re
+from typing import Optional, Tuple
+
+
+def d2f(s: str):
+    try:
+        return float(s.replace(",", "."))
+    except:
+        return None
+
+NUM   = r"[-+]?\d+(?:[.,]\d+)?"
+QUAL  = r"(?:Negativan|Normalan|Pozitivan)"
+RANGE = rf"(?:{NUM}\s*[~\-]\s*{NUM}|<\s*{NUM}|>\s*{NUM}|{QUAL})"
+UNIT  = r"(?:10[\*\^]\d+\/[A-Za-z]+|[A-Za-z%\/\*\.\-\^]+)"
+
+NUM_RE = re.compile(NUM)
+QUAL_RE = re.compile(QUAL)
+_REF_RANGE_RE = re.compile(rf"^{NUM}\s*[~\-]\s*{NUM}$")
+_REF_LT_RE = re.compile(rf"^<\s*{NUM}$")
+_REF_GT_RE = re.compile(rf"^>\s*{NUM}$")
+_RANGE_SEP = re.compile(r"[~\-]")
+_WS = re.compile(r"\s+")
+
+def normalize_units(u: str) -> str:
+    if not u:
+        return ""
+    u = u.replace("^", "*")
+    u = u.replace("µ", "u")
+    return _WS.sub("", u)
+
+UNIT_TAIL = re.compile(
+    r"(?:"
+    r"(?:10[\*\^]\d+\/[A-Za-z]+)"
+    r"|(?:[fpnumk]?g\/L|ng\/mL|ug\/mL|mg\/dL|mmol\/L|mol\/L|U\/L|IU\/L|mIU\/L)"
+    r"|(?:L\/L)"
+    r"|(?:fL|pL|nL|pg)"
+    r"|(?:%)"
+    r")\s*$",
+    re.IGNORECASE
+)
+
+def clean_name_and_type(name: str, unit_guess: str):
+    name = (name or "").strip()
+    if name.lower().startswith(("k-", "s-")):
+        name = name[2:].strip()
+    name = _WS.sub(" ", name.replace("aps.", "aps")).strip()
+    typ = ""
+    if name.endswith("%"):
+        typ = "%"
+        name = name[:-1].strip()
+    if name.lower().endswith(" aps"):
+        typ = "aps"
+        name = name[:-3].strip()
+    while UNIT_TAIL.search(name):
+        name = UNIT_TAIL.sub("", name).strip()
+    if not typ and (unit_guess or "").strip() == "%":
+        typ = "%"
+
+    # Čišćenje kvalitativnih rezultata
+    if unit_guess and unit_guess.lower() in ["negativan", "normalan", "pozitivan"]:
+        unit_guess = ""
+
+    return name, typ
+
+def parse_ref(ref_raw: str) -> Tuple[Optional[float], Optional[float], str, Optional[str]]:
+    """Referenca -> (low, high, tip, kvalitativna_ref)"""
+    ref_low = ref_high = None
+    ref_type = "none"
+    qual_ref = None
+    if ref_raw:
+        ref_raw = ref_raw.strip()
+        if _REF_RANGE_RE.match(ref_raw):
+            a,b = _RANGE_SEP.split(ref_raw)
+            ref_low, ref_high = d2f(a.strip()), d2f(b.strip()); ref_type = "range"
+        elif _REF_LT_RE.match(ref_raw):
+            ref_high = d2f(ref_raw.split("<")[1].strip()); ref_type = "<"
+        elif _REF_GT_RE.match(ref_raw):
+            ref_low = d2f(ref_raw.split(">")[1].strip()); ref_type = ">"
+        elif QUAL_RE.fullmatch(ref_raw):
+            qual_ref = ref_raw; ref_type = "qual"
+    return ref_low, ref_high, ref_type, qual_ref
+
+def status_from(v_num, ref_low, ref_high, ref_type, v_qual=None, qual_ref=None):
+    if v_num is not None:
+        if ref_type == "range" and ref_low is not None and ref_high is not None:
+            if v_num < ref_low: return "⬇️ ispod"
+            if v_num > ref_high: return "⬆️ iznad"
+            return "✅ u referentnom"
+        if ref_type == "<" and ref_high is not None:
+            return "✅ u referentnom" if v_num < ref_high else "⬆️ iznad"
+        if ref_type == ">" and ref_low is not None:
+            return "✅ u referentnom" if v_num > ref_low else "⬇️ ispod"
+        return ""
+    if v_qual is not None and qual_ref is not None:
+        return "✅ u referentnom" if v_qual == qual_ref else "⚠️ odstupanje"
+    return ""
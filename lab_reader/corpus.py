@@ -0,0 +1,228 @@
+"""Sintetički laboratorijski nalazi sa poznatim rezultatima (za benchmark i provjeru tačnosti).
+
+Nalaz se generiše u jednom od poznatih rasporeda - državni sistem
+(``Analiza Vrijednost JM Ref.vr``), MojLab (``K-Analit vrijednost low - high
+jedinica``), tabela sa kolonama razdvojenim razmacima i obrnuti red gdje je
+vrijednost prva (kao MojLab linije iz nekih PDF-ova, ``auto.PAT_MOJLAB``) -
+sa zadatim brojem redova, kao tekst, tekstualni PDF ili skenirani
+(rasterizovani) PDF. Uz svaki nalaz ide lista očekivanih rezultata.
+
+Generator je determinističan za isti ``seed``, pa se isti korpus može
+praviti ponovo bez čuvanja fajlova.
+"""
+import random
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+ROWS_PER_PAGE = 45
+PAGE_SIZE = (595, 842)  # A4 u tačkama
+FONT_SIZE = 8.5
+LINE_HEIGHT = 13
+MARGIN = 40
+
+# (naziv, jedinica, ref_low, ref_high, decimale, MojLab prefiks)
+ANALYTES: List[Tuple[str, str, float, float, int, str]] = [
+    ("Glukoza", "mmol/L", 3.9, 5.9, 1, "S"),
+    ("Urea", "mmol/L", 2.9, 7.5, 1, "S"),
+    ("Kreatinin", "µmol/L", 44, 106, 0, "S"),
+    ("Ukupni bilirubin", "µmol/L", 0, 21, 1, "S"),
+    ("Natrijum", "mmol/L", 136, 145, 0, "S"),
+    ("Kalijum", "mmol/L", 3.5, 5.1, 2, "S"),
+    ("Kalcijum", "mmol/L", 2.1, 2.55, 2, "S"),
+    ("AST", "U/L", 0, 40, 0, "S"),
+    ("ALT", "U/L", 0, 41, 0, "S"),
+    ("GGT", "U/L", 10, 71, 0, "S"),
+    ("Trigliceridi", "mmol/L", 0.4, 1.7, 2, "S"),
+    ("Ukupni holesterol", "mmol/L", 3.1, 5.2, 2, "S"),
+    ("HDL holesterol", "mmol/L", 1.0, 2.1, 2, "S"),
+    ("LDL holesterol", "mmol/L", 1.5, 3.4, 2, "S"),
+    ("Eritrociti", "10^12/L", 4.5, 5.8, 2, "K"),
+    ("Hemoglobin", "g/L", 130, 170, 0, "K"),
+    ("Hematokrit", "L/L", 0.38, 0.51, 3, "K"),
+    ("MCV", "fL", 81, 97, 1, "K"),
+    ("MCH", "pg", 28, 33, 1, "K"),
+    ("MCHC", "g/L", 318, 360, 0, "K"),
+    ("RDW", "%", 11.5, 15.1, 1, "K"),
+    ("Leukociti", "10^9/L", 4.0, 10.0, 2, "K"),
+    ("Trombociti", "10^9/L", 150, 400, 0, "K"),
+    ("MPV", "fL", 9.1, 11.9, 1, "K"),
+    ("PCT", "%", 0.16, 0.35, 2, "K"),
+    ("Neutrofili aps.", "10^9/L", 0.8, 7.5, 2, "K"),
+    ("Limfociti aps.", "10^9/L", 0.8, 4.0, 2, "K"),
+    ("Monociti aps.", "10^9/L", 0.0, 1.0, 2, "K"),
+    ("Fibrinogen", "g/L", 2.0, 4.0, 2, "P"),
+    ("APTT", "s", 22, 32, 1, "P"),
+]
+
+LAYOUTS = ["state", "mojlab", "table", "value_first"]
+FORMATS = ["text", "pdf", "scan"]
+
+
+class Expected(NamedTuple):
+    analyte: str
+    value: Union[float, str]  # tekst za kvalitativne rezultate (ručno označeni nalazi, lab_reader.accuracy)
+    unit: str
+    ref_low: Optional[float]
+    ref_high: Optional[float]
+
+
+class SyntheticReport(NamedTuple):
+    name: str
+    layout: str
+    pages: List[List[str]]  # stranica -> linije, svaka linija je lista ćelija
+    expected: List[Expected]
+
+    @property
+    def text(self) -> str:
+        return "".join(render_line(self.layout, cells) + "\n" for page in self.pages for cells in page)
+
+    @property
+    def lines(self) -> int:
+        return sum(len(page) for page in self.pages)
+
+
+def _fmt(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+def _header(layout: str, rng: random.Random, page: int, pages: int) -> List[List[str]]:
+    day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2019, 2025)
+    born = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2010)}"
+    name = rng.choice(["MARKO, PETAR, PETROVIĆ", "Ana Jovanović", "Đorđe Šćekić", "Milica Vuković"])
+    if layout == "state":
+        head = [["DOM ZDRAVLJA GLAVNOG GRADA"], ["CENTAR ZA LABORATORIJSKU DIJAGNOSTIKU"],
+                ["Laboratorijski nalaz"], [f"Ime i prezime {name} Lab.broj {rng.randint(1, 999)}"],
+                [f"Datum rođenja{born}"],
+                [f"Vrijeme uzorkovanja: {day:02d}.{month:02d}.{year} 07:{rng.randint(10, 59)}:00"],
+                ["Biohemijske analize"]]
+        return head + [["Analiza", "Vrijednost", "JM", "Ref.vr", "Uzorak/Metoda"]]
+    if layout == "mojlab":
+        head = [["Poliklinika MojLab"], ["Laboratorija"], ["Laboratorijski nalaz"],
+                [f"Ime i prezime: {name} Lab broj: {rng.randint(1, 999)} / {day:02d}.{month:02d}.{year}"],
+                [f"Datum rođenja: {born}"], [f"Vrijeme uzorkovanja: {day:02d}.{month:02d}.{year}. 08:49"],
+                ["Hematološke analize"]]
+        return head + [["Konstituent", "Rezultat", "Referentni interval", "Jedinica", "Metoda ispitivanja"]]
+    head = [["Laboratorija Centar"], [f"Pacijent: {name}"], [f"Datum: {day:02d}.{month:02d}.{year}"],
+            [f"Strana {page + 1} / {pages}"]]
+    if layout == "table":
+        return head + [["Analit", "Rezultat", "Jedinica", "Referentne vrijednosti"]]
+    return head
+
+
+def _row(layout: str, analyte: str, prefix: str, value: str, unit: str, low: str, high: str,
+         flag: str) -> List[str]:
+    if layout == "state":
+        return [analyte, f"{flag} {value}".strip(), unit, f"{low}~{high}", "Serum/SPFT"]
+    if layout == "mojlab":
+        return [f"{prefix}-{analyte}", value, f"{low} - {high}", unit.replace("^", "*")]
+    if layout == "table":
+        return [analyte, value, unit, f"{low} - {high}"]
+    return [value, unit, f"{low} - {high}", f"{prefix}-{analyte}"]
+
+
+def render_line(layout: str, cells: Sequence[str]) -> str:
+    """Linija kakvu daje izvlačenje teksta - tabela ima kolone razdvojene sa 2+ razmaka"""
+    if layout == "table" and len(cells) > 1:
+        return "    ".join(cells)
+    return " ".join(cells)
+
+
+def generate_report(layout: str, rows: int, seed: int = 0, name: Optional[str] = None) -> SyntheticReport:
+    """Nalaz sa ``rows`` rezultata u rasporedu ``layout`` (vidi LAYOUTS)"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Nepoznat raspored: {layout}")
+    rng = random.Random(f"{layout}:{rows}:{seed}")
+    pages_count = max(1, -(-rows // ROWS_PER_PAGE))
+    pages, expected = [], []
+    for page in range(pages_count):
+        lines = _header(layout, rng, page, pages_count)
+        for i in range(page * ROWS_PER_PAGE, min(rows, (page + 1) * ROWS_PER_PAGE)):
+            analyte, unit, low, high, decimals, prefix = ANALYTES[i % len(ANALYTES)]
+            if i >= len(ANALYTES):  # više redova nego analita - ponovljeni analit je zaseban red
+                analyte = f"{analyte} {i // len(ANALYTES) + 1}"
+            span = (high - low) or 1.0
+            value = round(rng.uniform(low - 0.3 * span, high + 0.3 * span), decimals)
+            value = max(value, 0.0)
+            flag = "H" if value > high else "L" if value < low else ""
+            lines.append(_row(layout, analyte, prefix, _fmt(value, decimals), unit,
+                              _fmt(low, decimals), _fmt(high, decimals), flag))
+            expected.append(Expected(analyte, value, unit, float(low), float(high)))
+        pages.append(lines)
+    return SyntheticReport(name or f"{layout}-{rows}-{seed}", layout, pages, expected)
+
+
+def generate_corpus(layouts: Sequence[str] = LAYOUTS, sizes: Sequence[int] = (30,), files: int = 1,
+                    seed: int = 0) -> List[SyntheticReport]:
+    return [generate_report(layout, rows, seed + i)
+            for layout in layouts for rows in sizes for i in range(files)]
+
+
+def _columns(report: SyntheticReport) -> List[float]:
+    """x pozicija svake kolone: najšira ćelija kolone + razmak"""
+    widths: List[float] = []
+    for page in report.pages:
+        for cells in page:
+            if len(cells) < 2:
+                continue
+            for c, cell in enumerate(cells):
+                w = len(cell) * FONT_SIZE * 0.52 + 14
+                if c < len(widths):
+                    widths[c] = max(widths[c], w)
+                else:
+                    widths.append(w)
+    xs, x = [], float(MARGIN)
+    for w in widths:
+        xs.append(x)
+        x += w
+    return xs
+
+
+def to_pdf(report: SyntheticReport) -> bytes:
+    """Tekstualni PDF: ćelije tabele su na fiksnim x pozicijama kolona (kao pravi nalazi)"""
+    import fitz  # PyMuPDF
+
+    font = fitz.Font("helv")
+    xs = _columns(report)
+    doc = fitz.open()
+    try:
+        for lines in report.pages:
+            page = doc.new_page(width=PAGE_SIZE[0], height=PAGE_SIZE[1])
+            page.insert_font(fontname="lr", fontbuffer=font.buffer)
+            y = MARGIN
+            for cells in lines:
+                if len(cells) == 1:
+                    page.insert_text((MARGIN, y), cells[0], fontname="lr", fontsize=FONT_SIZE)
+                else:
+                    for x, cell in zip(xs, cells):
+                        page.insert_text((x, y), cell, fontname="lr", fontsize=FONT_SIZE)
+                y += LINE_HEIGHT
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def to_scanned_pdf(report: SyntheticReport, dpi: int = 200, pdf_bytes: Optional[bytes] = None) -> bytes:
+    """Skenirani PDF: svaka stranica tekstualnog PDF-a kao slika u sivim tonovima (bez sloja teksta)"""
+    import fitz  # PyMuPDF
+
+    src = fitz.open(stream=pdf_bytes or to_pdf(report), filetype="pdf")
+    out = fitz.open()
+    try:
+        for page in src:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            dst = out.new_page(width=page.rect.width, height=page.rect.height)
+            dst.insert_image(dst.rect, stream=pix.tobytes("png"))
+        return out.tobytes(garbage=3, deflate=True)
+    finally:
+        src.close()
+        out.close()
+
+
+def report_bytes(report: SyntheticReport, fmt: str) -> Tuple[str, bytes]:
+    """(ime fajla, sadržaj) nalaza u formatu ``text``, ``pdf`` ili ``scan``"""
+    if fmt == "text":
+        return f"{report.name}.txt", report.text.encode("utf-8")
+    if fmt == "pdf":
+        return f"{report.name}.pdf", to_pdf(report)
+    if fmt == "scan":
+        return f"{report.name}-scan.pdf", to_scanned_pdf(report)
+    raise ValueError(f"Nepoznat format: {fmt}")
@@ -0,0 +1,95 @@
+"""Deduplikacija rezultata - po analitu zadržava najinformativniji red."""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+from .frame import results_frame
+from .record import LabResult
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+def best_positions(keys, score) -> "np.ndarray":
+    """Pozicije najboljih redova: po ključu prvi red sa najvećim ``score`` (groupby-argmax)"""
+    import pandas as pd
+
+    return pd.Series(score).groupby(keys, sort=False, observed=True, dropna=False).idxmax().to_numpy()
+
+
+def drop_duplicate_analytes(df: "pd.DataFrame", ref_cols: List[str]) -> "pd.DataFrame":
+    """Zadržava po jedan red po analitu - prioritet imaju redovi sa referencom, pa sa jedinicom
+
+    Jedan groupby-argmax nad skorom (2 x broj popunjenih ``ref_cols`` + ima
+    jedinicu), bez pomoćnih kolona i sortiranja cijelog frame-a; redovi su
+    poredani po skoru pa po analitu, kao ranije.
+    """
+    if df.empty:
+        return df
+    import numpy as np
+    import pandas as pd
+
+    unit = df["Jedinica"]
+    score = 2 * df[ref_cols].notna().sum(axis=1).to_numpy() + (unit.notna() & (unit != "")).to_numpy()
+    best = best_positions(df["Analit"].array, score)
+    names = np.asarray(df["Analit"].array[best], dtype=object)
+    order = pd.DataFrame({"score": -score[best], "name": names}).sort_values(
+        ["score", "name"], kind="stable").index.to_numpy()
+    return df.iloc[best[order]]
+
+
+def _present(value) -> bool:
+    # isto što i pandas notna za vrijednosti iz parsera (None / NaN)
+    return value is not None and value == value
+
+
+class AnalyteDeduplicator:
+    """Isto što i drop_duplicate_analytes, ali red po red - za parsiranje u toku
+
+    Po analitu se čuva samo najbolji red (više popunjenih ``ref_cols``, pa
+    jedinica, pa raniji red), pa memorija zavisi od broja analita, a ne od
+    broja prepoznatih linija. ``frame()`` se može pozvati bilo kad za
+    trenutni presjek; na kraju daje isti rezultat (i index) kao
+    ``drop_duplicate_analytes`` nad svim redovima.
+    """
+
+    def __init__(self, ref_cols: List[str]):
+        self.ref_cols = ref_cols
+        self.rows_seen = 0
+        # Analit -> (prioritet, ima jedinicu, redni broj reda, red)
+        self._best: Dict[str, Tuple[int, bool, int, LabResult]] = {}
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def add(self, row: LabResult) -> bool:
+        """Dodaje red; True ako je postao najbolji za svoj analit"""
+        idx = self.rows_seen
+        self.rows_seen += 1
+        priority = sum(1 for col in self.ref_cols if _present(row.get(col)))
+        unit = row.get("Jedinica")
+        has_unit = _present(unit) and unit != ""
+        current = self._best.get(row["Analit"])
+        if current is not None and (current[0], current[1]) >= (priority, has_unit):
+            return False
+        self._best[row["Analit"]] = (priority, has_unit, idx, row)
+        return True
+
+    def extend(self, rows: Iterable[LabResult]) -> None:
+        with metrics.stage("dedup"):
+            for row in rows:
+                self.add(row)
+
+    @property
+    def dropped(self) -> int:
+        """Redovi koji nisu ostali (lošiji duplikat istog analita)"""
+        return self.rows_seen - len(self._best)
+
+    def frame(self, empty_columns: Optional[List[str]] = None) -> "pd.DataFrame":
+        import pandas as pd
+
+        if not self._best:
+            return pd.DataFrame(columns=empty_columns)
+        with metrics.stage("dedup"):
+            ordered = sorted(self._best.items(), key=lambda kv: (-kv[1][0], not kv[1][1], kv[0]))
+            return results_frame([item[3] for _, item in ordered], index=[item[2] for _, item in ordered])
@@ -0,0 +1,206 @@
+"""Izvoz rezultata u CSV, Excel i Parquet.
+
+Za UI se izvoz ne pravi pri svakom pokretanju skripte nego tek kad se
+klikne preuzimanje (``lazy_export`` vraća funkciju za ``st.download_button``).
+Fajl se piše postepeno u privremeni fajl - CSV u komadima od
+``CSV_CHUNK_ROWS`` redova, Excel red po red u xlsxwriter ``constant_memory``
+modu (openpyxl: ``write_only``) - umjesto cijele radne sveske u BytesIO, i
+pamti se po hash-u rezultata, pa ponovni klik na isti skup rezultata samo
+pročita gotov fajl.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import IO, TYPE_CHECKING, Callable, Iterator, Optional
+
+from . import metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET_MIME = "application/vnd.apache.parquet"
+CSV_CHUNK_ROWS = 10_000
+EXPORT_CACHE_SIZE = 16  # koliko gotovih izvoza se čuva u privremenom folderu
+
+_exports: "OrderedDict[str, str]" = OrderedDict()
+_exports_lock = threading.Lock()
+
+
+def to_csv_bytes(df: "pd.DataFrame") -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def to_excel_bytes(df: "pd.DataFrame", sheet_name: str = "Nalazi", engine: str = "xlsxwriter") -> bytes:
+    import pandas as pd
+
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine=engine) as w:
+        df.to_excel(w, index=False, sheet_name=sheet_name)
+    return out.getvalue()
+
+
+def to_parquet_bytes(df: "pd.DataFrame") -> bytes:
+    """Parquet sa šemom arhive (lab_reader.store) - tipovi kolona ostaju, za razliku od CSV-a"""
+    import pyarrow.parquet as pq
+
+    from .store import to_arrow
+
+    out = io.BytesIO()
+    pq.write_table(to_arrow(df), out, compression="zstd")
+    return out.getvalue()
+
+
+def parquet_available() -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def iter_csv_chunks(df: "pd.DataFrame", chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV u komadima od ``chunk_rows`` redova (zaglavlje u prvom) - u memoriji je samo tekući komad"""
+    if not len(df):
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def write_csv(df: "pd.DataFrame", fh: IO[bytes], chunk_rows: int = CSV_CHUNK_ROWS) -> None:
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        fh.write(chunk)
+
+
+def _cell(value):
+    """Vrijednost za Excel ćeliju; prazno (None/NaN/NA) -> None"""
+    try:
+        return None if value is None or value != value else value
+    except TypeError:  # pd.NA
+        return None
+
+
+def write_excel(df: "pd.DataFrame", path: str, sheet_name: str = "Nalazi", engine: str = "xlsxwriter") -> None:
+    """Excel red po red direktno na disk (pandas ExcelWriter piše kolonu po kolonu, pa drži cijelu svesku)"""
+    columns = [str(c) for c in df.columns]
+    rows = df.itertuples(index=False, name=None)
+    if engine == "openpyxl":
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        header = []
+        for name in columns:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        ws.append(header)
+        for row in rows:
+            ws.append([_cell(v) for v in row])
+        wb.save(path)
+        return
+
+    import xlsxwriter
+
+    with xlsxwriter.Workbook(path, {"constant_memory": True}) as wb:
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, columns, wb.add_format({"bold": True, "border": 1, "align": "center"}))
+        for r, row in enumerate(rows, 1):
+            for c, value in enumerate(row):
+                value = _cell(value)
+                if value is not None:
+                    ws.write(r, c, value)
+
+
+def frame_digest(df: "pd.DataFrame") -> str:
+    """Hash skupa rezultata (kolone + vrijednosti, bez indeksa)"""
+    import pandas as pd
+
+    h = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:32]
+
+
+def _export_dir() -> str:
+    path = os.path.join(tempfile.gettempdir(), "lab_reader_exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def export_file(df: "pd.DataFrame", kind: str = "csv", sheet_name: str = "Nalazi",
+                engine: str = "xlsxwriter") -> str:
+    """Putanja gotovog izvoza (``csv``, ``xlsx`` ili ``parquet``); isti rezultati -> isti fajl bez ponovnog pisanja
+
+    Fajl može da obriše izbacivanje starih izvoza iz druge sesije (``EXPORT_CACHE_SIZE``) -
+    pozivalac ga čita odmah i na FileNotFoundError pozove ponovo (vidi ``lazy_export``).
+    """
+    if kind not in ("csv", "xlsx", "parquet"):
+        raise ValueError(f"Nepoznat format izvoza: {kind}")
+    key = f"{frame_digest(df)}-{kind}" + (f"-{engine}-{sheet_name}" if kind == "xlsx" else "")
+    with _exports_lock:
+        path = _exports.get(key)
+        if path is not None and os.path.exists(path):
+            _exports.move_to_end(key)
+            return path
+
+    folder = _export_dir()
+    path = os.path.join(folder, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.{kind}")
+    if not os.path.exists(path):
+        with metrics.stage("export"):
+            tmp = os.path.join(folder, f".{uuid.uuid4().hex}.{kind}")
+            try:
+                if kind == "csv":
+                    with open(tmp, "wb") as fh:
+                        write_csv(df, fh)
+                elif kind == "xlsx":
+                    write_excel(df, tmp, sheet_name=sheet_name, engine=engine)
+                else:
+                    import pyarrow.parquet as pq
+
+                    from .store import to_arrow
+
+                    pq.write_table(to_arrow(df), tmp, compression="zstd")
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    with _exports_lock:
+        _exports[key] = path
+        _exports.move_to_end(key)
+        while len(_exports) > EXPORT_CACHE_SIZE:
+            _, old = _exports.popitem(last=False)
+            if old != path and os.path.exists(old):
+                os.remove(old)
+    return path
+
+
+def lazy_export(df: "pd.DataFrame", kind: str = "csv", on_built: Optional[Callable[[str, float], None]] = None,
+                **kwargs) -> Callable[[], bytes]:
+    """Funkcija za ``st.download_button(data=...)``: izvoz se pravi tek na klik (vidi ``export_file``)
+
+    Funkciju kao ``data`` prima Streamlit od 1.52.0 (minimalna verzija u setup.py).
+
+    ``on_built(kind, sekunde)`` dobija trajanje izvoza (npr. za panel vremena u UI-ju).
+    """
+    def build() -> bytes:
+        start = time.perf_counter()
+        for attempt in range(3):
+            try:
+                with open(export_file(df, kind, **kwargs), "rb") as fh:
+                    data = fh.read()
+                break
+            except FileNotFoundError:
+                # Druga sesija je izbacila fajl između export_file i open - pravi se ponovo
+                if attempt == 2:
+                    raise
+        if on_built is not None:
+            on_built(kind, time.perf_counter() - start)
+        return data
+    return build
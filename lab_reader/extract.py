@@ -0,0 +1,55 @@
+"""Izvlačenje teksta iz tekstualnih PDF-ova (pdfplumber, pa PyPDF2 kao rezerva)."""
+import io
+from typing import Iterator, List
+
+
+def _pdfplumber_pages(file_bytes: bytes, start: int) -> Iterator[str]:
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        for page in pdf.pages[start:]:
+            text = page.extract_text() or ""
+            page.close()  # oslobađa keš stranice (karakteri, layout) - u memoriji je samo tekuća stranica
+            yield text
+
+
+def _pypdf2_pages(file_bytes: bytes, start: int) -> Iterator[str]:
+    from PyPDF2 import PdfReader
+    r = PdfReader(io.BytesIO(file_bytes))
+    for i in range(start, len(r.pages)):
+        yield r.pages[i].extract_text() or ""
+
+
+def iter_pdf_pages_native(file_bytes: bytes) -> Iterator[str]:
+    """Tekst stranicu po stranicu, čim je izvučena; ništa ako PDF nema tekstualni sloj
+
+    Prazne stranice na početku se zadržavaju dok se ne pojavi prva stranica sa
+    tekstom - ako je cijeli PDF bez teksta, pokušava se PyPDF2, a za potpuno
+    prazan (skeniran) PDF ne vraća se ništa. Ako pdfplumber pukne usred
+    dokumenta, PyPDF2 nastavlja od stranice na kojoj je stao.
+    """
+    emitted = 0  # koliko je stranica već vraćeno
+    for read_pages in (_pdfplumber_pages, _pypdf2_pages):
+        blanks = 0
+        try:
+            for i, text in enumerate(read_pages(file_bytes, emitted), emitted):
+                if not emitted and not text.strip():
+                    blanks += 1
+                    continue
+                for _ in range(blanks):
+                    yield ""
+                blanks = 0
+                emitted = i + 1
+                yield text
+        except Exception:
+            continue
+        if emitted:
+            return
+
+
+def extract_pdf_pages_native(file_bytes: bytes) -> List[str]:
+    """Tekst po stranicama; prazna lista ako PDF nema tekstualni sloj"""
+    return list(iter_pdf_pages_native(file_bytes))
+
+
+def extract_pdf_text_native(file_bytes: bytes) -> str:
+    return "".join(p + "\n" for p in extract_pdf_pages_native(file_bytes))
@@ -0,0 +1,131 @@
+"""Prepoznavanje laboratorije (formata nalaza) i brzi parseri za poznate formate.
+
+Iz zaglavlja nalaza (prvih HEADER_LINES linija) pravi se otisak: prva
+linija (naziv ustanove) i red naslova kolona tabele. Otisak se mapira na
+poznati format; mapiranje se pamti, pa sljedeći nalaz iste laboratorije ne
+prolazi ni kroz provjeru markera. Za poznat format svaka linija ide kroz
+jedan-dva kompajlirana patterna tog formata umjesto kroz svih osam
+generičkih (lab_reader.auto); nepoznat format ide generičkim putem.
+
+Novi format: dodaj LabFormat u FORMATS (markeri iz zaglavlja + patterni
+sa grupama ``an``, ``val`` i po potrebi ``un``, ``ref``, ``fl``).
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from .common import NUM, QUAL, RANGE
+from .layout import HEADER_ROLES
+
+# Koliko linija sa početka teksta se gleda pri prepoznavanju formata
+HEADER_LINES = 40
+# Koliko različitih otisaka se pamti
+FINGERPRINT_CACHE_SIZE = 256
+
+_LETTER = "A-Za-zČĆŠĐŽčćšđž"
+# Kao common.UNIT, ali sa µ (µmol/L) - normalize_units ga ionako pretvara u u
+_UNIT = r"(?:10[\*\^]\d+\/[A-Za-z]+|[A-Za-zµ%\/\*\.\-\^]+)"
+
+Candidate = Tuple[str, str, Optional[str], str, str]  # (naziv, vrijednost, jedinica, referenca, flag)
+
+
+class LabFormat(NamedTuple):
+    name: str
+    heading: str  # početak reda naslova kolona (mala slova, razmaci normalizovani)
+    markers: Tuple[str, ...]  # bar jedan mora biti u zaglavlju (mala slova); prazno = dovoljan je heading
+    patterns: Tuple["re.Pattern", ...]
+
+    def matches(self, header: str, heading: str) -> bool:
+        if not heading.startswith(self.heading):
+            return False
+        return not self.markers or any(m in header for m in self.markers)
+
+    def candidates(self, line: str) -> Iterator[Candidate]:
+        """Kandidati (an, val, un, ref, fl) iz jedne linije, redom patterna"""
+        for pattern in self.patterns:
+            for m in pattern.finditer(line):
+                g = m.groupdict()
+                yield g["an"], g["val"], g.get("un"), g.get("ref") or "", g.get("fl") or ""
+
+
+# Državni laboratorijski sistem (domovi zdravlja): "Analit [H|L] Vrijednost JM Ref.vr Uzorak/Metoda",
+# često dvije tabele u istom redu - finditer nastavlja iza reference prve
+STATE = LabFormat(
+    name="state",
+    heading="analiza vrijednost jm ref.vr",
+    markers=(),
+    patterns=(
+        re.compile(
+            rf"(?P<an>[{_LETTER}][{_LETTER}\s\.\-%]*?)\s+(?:(?P<fl>[HL])\s+)?(?P<val>{NUM}|{QUAL})\s+"
+            rf"(?:(?P<un>{_UNIT})\s+)?(?P<ref>{RANGE})"
+        ),
+    ),
+)
+
+# Poliklinika MojLab: "K-Analit Rezultat low - high Jedinica"; OCR zna da ispremješta kolone
+# u "val unit low - high K-Analit" (isto kao auto.PAT_MOJLAB)
+MOJLAB = LabFormat(
+    name="mojlab",
+    heading="konstituent rezultat referentni interval jedinica",
+    markers=("mojlab",),
+    patterns=(
+        re.compile(
+            rf"^(?P<an>[KS]-[{_LETTER}\.\-% ]+?)\s+(?P<val>{NUM}|{QUAL})\s+"
+            rf"(?P<ref>{NUM}\s*-\s*{NUM}|[<>]\s*{NUM}|{QUAL})\s*(?P<un>{_UNIT})?$"
+        ),
+        re.compile(
+            rf"(?P<val>{NUM})\s+(?P<un>{_UNIT})\s*(?P<ref>{NUM}\s*-\s*{NUM})\s*(?P<an>[KS]-[{_LETTER}\.\-% ]+)$"
+        ),
+    ),
+)
+
+FORMATS = [STATE, MOJLAB]
+
+_WS = re.compile(r"\s+")
+_fingerprints: "OrderedDict[Tuple[str, str], Optional[str]]" = OrderedDict()
+_fingerprints_lock = threading.Lock()  # OCR/batch niti i radne niti reda poslova dijele mapu
+
+
+def _header(text: str) -> Tuple[str, str, str]:
+    """(zaglavlje malim slovima, prva linija, red naslova kolona) iz početka teksta"""
+    lines = []
+    for line in text.splitlines():
+        line = _WS.sub(" ", line).strip().lower()
+        if line:
+            lines.append(line)
+            if len(lines) >= HEADER_LINES:
+                break
+    heading = ""
+    for line in lines:
+        roles = {HEADER_ROLES.get(w.rstrip(".:")) for w in line.split()}
+        if "analyte" in roles and "value" in roles:
+            heading = line
+            break
+    return "\n".join(lines), lines[0] if lines else "", heading
+
+
+def fingerprint(text: str) -> Tuple[str, str]:
+    """Otisak nalaza: (prva linija, red naslova kolona)"""
+    _, first, heading = _header(text)
+    return first, heading
+
+
+def detect_format(text: str) -> Optional[LabFormat]:
+    """Poznati format nalaza ili None (generički parser)"""
+    header, first, heading = _header(text)
+    if not heading:
+        return None
+    key = (first, heading)
+    with _fingerprints_lock:
+        known = key in _fingerprints
+        if known:
+            _fingerprints.move_to_end(key)
+            name = _fingerprints[key]
+    if not known:
+        name = next((f.name for f in FORMATS if f.matches(header, heading)), None)
+        with _fingerprints_lock:
+            _fingerprints[key] = name
+            if len(_fingerprints) > FINGERPRINT_CACHE_SIZE:
+                _fingerprints.popitem(last=False)
+    return next((f for f in FORMATS if f.name == name), None) if name else None
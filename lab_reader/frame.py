@@ -0,0 +1,159 @@
+"""DataFrame rezultata: kolone umjesto liste rječnika, kategorije, status nad cijelim kolonama.
+
+Redovi parsera (LabResult zapisi ili rječnici) se skupljaju direktno po
+kolonama (ResultColumns), pa se DataFrame pravi iz nekoliko lista. Kolone sa malo
+različitih vrijednosti (CATEGORY_COLUMNS) su ``category`` - kombinovani
+nalazi sa stotinama hiljada redova drže po jedan string po analitu/jedinici/
+statusu i mali cijeli broj po redu. concat_results spaja frame-ove tako da
+kategorije ostanu kategorije (obični ``pd.concat`` ih pretvara nazad u
+stringove čim se skupovi kategorija razlikuju).
+
+Frame jednog nalaza (desetine redova) ostaje sa običnim kolonama: pravljenje
+kategorija ima fiksnu cijenu od ~1 ms po koloni, veću od cijelog parsiranja
+malog nalaza. Kategorije dobija frame od bar CATEGORY_MIN_ROWS redova.
+
+status_column računa status (isto kao common.status_from) nad cijelim
+kolonama vrijednosti i referenci.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+from .record import LabResult
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+CATEGORY_COLUMNS = ("Analit", "Tip", "Jedinica", "Status", "Izvor")
+CATEGORY_MIN_ROWS = 1000
+
+STATUS_OK = "✅ u referentnom"
+STATUS_LOW = "⬇️ ispod"
+STATUS_HIGH = "⬆️ iznad"
+STATUS_QUAL_MISMATCH = "⚠️ odstupanje"
+
+
+class ResultColumns:
+    """Redovi rezultata skupljeni po kolonama; ``frame()`` pravi DataFrame sa kategorijama"""
+
+    __slots__ = ("columns", "data", "index")
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns: List[str] = list(columns or [])
+        self.data: Dict[str, List] = {c: [] for c in self.columns}
+        self.index: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def append(self, row: Union[Dict, LabResult], idx: Optional[int] = None) -> None:
+        n = len(self.index)
+        if isinstance(row, LabResult):
+            if self.columns != row.COLUMNS:
+                self._add_columns(row.COLUMNS, n)
+            for key, values in self.data.items():
+                values.append(row[key])
+        else:
+            self._add_columns(row, n)
+            for key, values in self.data.items():
+                values.append(row.get(key))
+        self.index.append(n if idx is None else idx)
+
+    def _add_columns(self, keys: Iterable[str], n: int) -> None:
+        for key in keys:
+            if key not in self.data:  # kolona koje nema u ranijim redovima
+                self.columns.append(key)
+                self.data[key] = [None] * n
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def frame(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        data = self.data
+        if len(self) >= CATEGORY_MIN_ROWS:
+            # Kategorije direktno iz lista (bez međukoraka kroz string kolonu)
+            data = {c: pd.Categorical(v) if c in CATEGORY_COLUMNS else v for c, v in data.items()}
+        return pd.DataFrame(data, columns=self.columns, index=self.index)
+
+
+def results_frame(rows: Iterable[Dict], columns: Optional[List[str]] = None,
+                  index: Optional[List[int]] = None) -> "pd.DataFrame":
+    """DataFrame iz redova parsera (kolone redom ``columns``, pa ostale kako se pojave)"""
+    cols = ResultColumns(columns)
+    if index is None:
+        cols.extend(rows)
+    else:
+        for row, idx in zip(rows, index):
+            cols.append(row, idx)
+    return cols.frame()
+
+
+def categorize(df: "pd.DataFrame") -> "pd.DataFrame":
+    """CATEGORY_COLUMNS (one koje postoje) u ``category`` - u mjestu, vraća isti frame"""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+    return df
+
+
+def set_column(df: "pd.DataFrame", col: str, values) -> None:
+    """Postavlja kolonu; kolona iz CATEGORY_COLUMNS u velikom frame-u postaje ``category``"""
+    import pandas as pd
+
+    if col in CATEGORY_COLUMNS and len(df) >= CATEGORY_MIN_ROWS:
+        values = pd.Categorical(values)
+    df[col] = values
+
+
+def concat_results(frames: List["pd.DataFrame"]) -> "pd.DataFrame":
+    """``pd.concat(frames, ignore_index=True)``; veliki rezultat dobija kategorije (unija kategorija)"""
+    import pandas as pd
+
+    if sum(len(f) for f in frames) < CATEGORY_MIN_ROWS:
+        return pd.concat(frames, ignore_index=True)
+    frames = [categorize(f.copy(deep=False)) for f in frames]
+    for col in CATEGORY_COLUMNS:
+        parts = [f[col] for f in frames if col in f.columns]
+        if len(parts) < 2:
+            continue
+        categories = pd.Index(sorted({c for p in parts for c in p.cat.categories}, key=str))
+        for f in frames:
+            if col in f.columns:
+                f[col] = f[col].cat.set_categories(categories)
+    return categorize(pd.concat(frames, ignore_index=True))
+
+
+def status_column(values: "pd.Series", ref_low: "pd.Series", ref_high: "pd.Series",
+                  ref_type: "pd.Series", qual_ref: "pd.Series") -> "np.ndarray":
+    """Status za svaki red (kao common.status_from), jednom operacijom po koloni"""
+    import numpy as np
+    import pandas as pd
+
+    num = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    low = pd.to_numeric(ref_low, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    high = pd.to_numeric(ref_high, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    kind = ref_type.astype(object).to_numpy()
+    is_num = ~np.isnan(num)
+    has_low, has_high = ~np.isnan(low), ~np.isnan(high)
+
+    out = np.full(len(num), "", dtype=object)
+    with np.errstate(invalid="ignore"):
+        rng = is_num & (kind == "range") & has_low & has_high
+        out[rng] = STATUS_OK
+        out[rng & (num > high)] = STATUS_HIGH
+        out[rng & (num < low)] = STATUS_LOW
+
+        lt = is_num & (kind == "<") & has_high
+        out[lt] = np.where(num[lt] < high[lt], STATUS_OK, STATUS_HIGH)
+
+        gt = is_num & (kind == ">") & has_low
+        out[gt] = np.where(num[gt] > low[gt], STATUS_OK, STATUS_LOW)
+
+    # Kvalitativno: vrijednost (tekst) poređena sa kvalitativnom referencom
+    qual_values = values.astype(object).to_numpy()
+    qual_refs = qual_ref.astype(object).to_numpy()
+    qual = ~is_num & pd.notna(qual_values) & pd.notna(qual_refs)
+    out[qual] = np.where(qual_values[qual] == qual_refs[qual], STATUS_OK, STATUS_QUAL_MISMATCH)
+    return out
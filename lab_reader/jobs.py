@@ -0,0 +1,327 @@
+"""Red poslova za obradu upload-a u pozadini (SQLite tabela + radne niti).
+
+UI samo upiše fajlove u tabelu (``submit``) i odmah nastavi; radne niti
+(``start_workers``) uzimaju fajl po fajl, upisuju napredak po stranici i
+rezultat čim je fajl gotov (uz vremena faza i brojače - lab_reader.metrics),
+a UI povremeno čita stanje (``files``) i prikazuje djelimične rezultate. Posao je u bazi, ne u sesiji, pa preživljava
+osvježavanje stranice (UI drži id posla u URL-u), a jedan Streamlit server
+ne blokira skriptu korisnika dok traje obrada. Isti red mogu da prazne i
+posebni procesi (``lab-reader worker``) - fajl se uzima atomski.
+
+Dok obrađuje fajl, radnik ga osvježava svakih ``HEARTBEAT_SECONDS`` (i
+kad jedna stranica OCR-a traje dugo); fajl u stanju ``running`` bez
+osvježavanja duže od ``STALE_SECONDS`` (radnik je pao, server restartovan)
+vraća se u red. Stari poslovi se brišu poslije ``JOB_TTL_SECONDS``.
+
+Lokacija: ``LAB_READER_CACHE_DIR`` (kao keš, fajl ``jobs.sqlite3``), broj
+radnih niti: ``LAB_READER_JOB_WORKERS`` (podrazumijevano broj jezgara).
+"""
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import metrics
+from .cache import default_cache_dir
+from .store import frame_from_parquet, frame_to_parquet
+from .utils import default_workers
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 30  # radnik osvježava fajl koji obrađuje
+STALE_SECONDS = 120  # running bez osvježavanja duže od ovoga -> nazad u red
+JOB_TTL_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    parser TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    data BLOB,
+    pages INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    method TEXT,
+    error TEXT,
+    text TEXT,
+    frame BLOB,
+    metrics TEXT,
+    worker TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_files_state ON job_files (state, updated);
+"""
+# Kolone dodate poslije prve verzije tabele - baza napravljena ranije ih dobija pri otvaranju
+_ADDED_COLUMNS = {"metrics": "TEXT"}
+
+
+class FileJob(NamedTuple):
+    index: int
+    name: str
+    state: str
+    pages: int
+    rows: int
+    method: Optional[str]
+    error: Optional[str]
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, ERROR)
+
+
+def job_id_for(keys: Sequence[str], parser: str) -> str:
+    """Isti skup fajlova (lab_reader.session.file_key) i parser -> isti posao, pa ponovni submit ne duplira obradu"""
+    return hashlib.sha256("\n".join([parser, *keys]).encode("utf-8")).hexdigest()[:16]
+
+
+def default_job_workers() -> int:
+    return int(os.environ.get("LAB_READER_JOB_WORKERS") or default_workers())
+
+
+def _make_parser(name: str):
+    if name == "v4":
+        from .parser_v4 import LabResultParserV4
+        return LabResultParserV4()
+    from .parser import LabResultParser
+    return LabResultParser()
+
+
+class JobQueue:
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), "jobs.sqlite3")
+        self.path = path
+        self._wakeup = threading.Event()
+        self._workers: List[threading.Thread] = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(job_files)")}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE job_files ADD COLUMN {column} {kind}")
+            # Rezultati su ranije čuvani kao pickle - takvi poslovi se brišu, UI ih pravi ponovo
+            old = "SELECT job_id FROM job_files WHERE frame IS NOT NULL AND substr(frame, 1, 4) != X'50415231'"
+            conn.execute(f"DELETE FROM jobs WHERE id IN ({old})")
+            conn.execute("DELETE FROM job_files WHERE job_id NOT IN (SELECT id FROM jobs)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Nova konekcija po pozivu - radi iz više niti i procesa
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # ---- UI strana ----
+    def submit(self, files: Sequence[Tuple[str, bytes]], parser: str = "v3", job_id: Optional[str] = None) -> str:
+        """Upisuje (ime, sadržaj) fajlove kao novi posao
+
+        Postojeći posao sa istim id-jem se ne pravi ponovo: gotovi fajlovi i oni
+        koji se upravo obrađuju ostaju, a fajlovi sa greškom (i ``running`` bez
+        napretka, vidi ``STALE_SECONDS``) vraćaju se u red.
+        """
+        job_id = job_id or hashlib.sha256(os.urandom(16)).hexdigest()[:16]
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._purge(conn, now)
+                cur = conn.execute("INSERT OR IGNORE INTO jobs (id, parser, created) VALUES (?, ?, ?)",
+                                   (job_id, parser, now))
+                if cur.rowcount:
+                    conn.executemany(
+                        "INSERT INTO job_files (job_id, idx, name, state, data, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(job_id, i, name, QUEUED, data, now) for i, (name, data) in enumerate(files)])
+                else:
+                    # Sadržaj fajla sa greškom je obrisan - ponovo se upisuje iz ovog submit-a
+                    conn.executemany(
+                        "UPDATE job_files SET state = ?, data = ?, error = NULL, metrics = NULL, pages = 0, rows = 0, "
+                        "updated = ? WHERE job_id = ? AND idx = ? AND (state = ? OR (state = ? AND updated < ?))",
+                        [(QUEUED, data, now, job_id, i, ERROR, RUNNING, now - STALE_SECONDS)
+                         for i, (_, data) in enumerate(files)])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        self._wakeup.set()
+        return job_id
+
+    def exists(self, job_id: str) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def files(self, job_id: str) -> List[FileJob]:
+        """Stanje svih fajlova posla (bez rezultata - vidi ``result``)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT idx, name, state, pages, rows, method, error FROM job_files "
+                                "WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+        finally:
+            conn.close()
+        return [FileJob(*row) for row in rows]
+
+    def result(self, job_id: str, idx: int) -> Optional[Tuple[str, "pd.DataFrame"]]:
+        """(tekst, DataFrame) gotovog fajla ili None"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT text, frame FROM job_files WHERE job_id = ? AND idx = ? AND state = ?",
+                               (job_id, idx, DONE)).fetchone()
+        finally:
+            conn.close()
+        return (row[0], frame_from_parquet(row[1])) if row is not None else None
+
+    def file_metrics(self, job_id: str) -> List[Dict]:
+        """Vremena faza i brojači (lab_reader.metrics, ``to_dict``) gotovih fajlova posla, redom"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT metrics FROM job_files WHERE job_id = ? AND metrics IS NOT NULL "
+                                "ORDER BY idx", (job_id,)).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(r) for (r,) in rows]
+
+    # ---- radna strana ----
+    def claim(self, worker: str) -> Optional[Tuple[str, int, str, bytes, str]]:
+        """Atomski uzima sljedeći fajl iz reda: (job_id, idx, ime, sadržaj, parser) ili None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT f.job_id, f.idx, f.name, f.data, j.parser FROM job_files f JOIN jobs j ON j.id = f.job_id "
+                    "WHERE f.state = ? OR (f.state = ? AND f.updated < ?) ORDER BY j.created, f.idx LIMIT 1",
+                    (QUEUED, RUNNING, now - STALE_SECONDS)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE job_files SET state = ?, worker = ?, pages = 0, rows = 0, updated = ? "
+                                 "WHERE job_id = ? AND idx = ?", (RUNNING, worker, now, row[0], row[1]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return row
+
+    def _update(self, job_id: str, idx: int, **fields) -> None:
+        fields["updated"] = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE job_files SET {', '.join(k + ' = ?' for k in fields)} WHERE job_id = ? AND idx = ?",
+                         (*fields.values(), job_id, idx))
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def _heartbeat(self, job_id: str, idx: int, worker: str):
+        """Osvježava ``updated`` fajla iz posebne niti dok traje obrada, pa ga ``claim`` ne uzima ponovo"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    conn = self._connect()
+                    try:
+                        conn.execute("UPDATE job_files SET updated = ? WHERE job_id = ? AND idx = ? AND state = ? "
+                                     "AND worker = ?", (time.time(), job_id, idx, RUNNING, worker))
+                    finally:
+                        conn.close()
+                except sqlite3.Error:  # baza zaključana - sljedeći otkucaj
+                    pass
+
+        t = threading.Thread(target=beat, name=f"lab-reader-heartbeat-{job_id}-{idx}", daemon=True)
+        t.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            t.join()
+
+    def run_one(self, worker: str = "") -> bool:
+        """Obrađuje jedan fajl iz reda; False ako je red prazan"""
+        from .dedup import AnalyteDeduplicator
+        from .ocr import TesseractNotFoundError
+        from .pipeline import iter_page_results
+        from .routing import document_method
+
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        claimed = self.claim(worker)
+        if claimed is None:
+            return False
+        job_id, idx, name, data, parser_name = claimed
+        parser = _make_parser(parser_name)
+        dedup = AnalyteDeduplicator(parser.REF_COLUMNS)
+        texts, methods = [], []
+        error = frame = None
+        with metrics.collect(name) as m, self._heartbeat(job_id, idx, worker):
+            try:
+                for page, rows in iter_page_results(name, data, parser):
+                    texts.append(page.text)
+                    methods.append(page.method)
+                    dedup.extend(rows)
+                    self._update(job_id, idx, pages=len(texts), rows=len(dedup))
+                metrics.count("dedup_dropped", dedup.dropped)
+                frame = dedup.frame(parser.EMPTY_COLUMNS)
+            except TesseractNotFoundError as e:
+                error = str(e)
+            except ImportError as e:
+                error = f"OCR biblioteke nisu instalirane: {e}"
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            m.info["error"] = error
+            self._update(job_id, idx, state=ERROR, error=error, data=None, metrics=json.dumps(m.to_dict(), ensure_ascii=False))
+        else:
+            m.info["rows"] = len(frame)
+            self._update(job_id, idx, state=DONE, rows=len(frame), method=document_method(methods),
+                         text="".join(t + "\n" for t in texts), frame=frame_to_parquet(frame), data=None,
+                         metrics=json.dumps(m.to_dict(), ensure_ascii=False))
+        return True
+
+    def work(self, stop: Optional[threading.Event] = None) -> None:
+        """Petlja radnika: obrađuje dok ima posla, pa čeka novi submit (ili POLL_SECONDS)"""
+        while stop is None or not stop.is_set():
+            try:
+                busy = self.run_one()
+            except sqlite3.Error:  # baza zaključana/nedostupna - pokušaj ponovo kasnije
+                busy = False
+            if not busy:
+                self._wakeup.wait(POLL_SECONDS)
+                self._wakeup.clear()
+
+    def start_workers(self, count: Optional[int] = None) -> None:
+        """Pokreće ``count`` radnih niti u ovom procesu (samo jednom po redu)"""
+        if self._workers:
+            return
+        for i in range(count or default_job_workers()):
+            t = threading.Thread(target=self.work, name=f"lab-reader-job-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _purge(self, conn: sqlite3.Connection, now: float) -> None:
+        old = [j for (j,) in conn.execute("SELECT id FROM jobs WHERE created < ?", (now - JOB_TTL_SECONDS,))]
+        if old:
+            conn.executemany("DELETE FROM job_files WHERE job_id = ?", [(j,) for j in old])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(j,) for j in old])
@@ -0,0 +1,208 @@
+"""Tabela rezultata iz koordinata riječi (pdfplumber) umjesto pogađanja kolona po razmacima.
+
+Na stranici se traži red zaglavlja tabele ("Analiza Vrijednost JM Ref.vr",
+"Konstituent Rezultat Referentni interval Jedinica" ...). Položaj naslova
+kolona određuje granice kolona jednom za stranicu; svaka riječ ispod
+zaglavlja ide u kolonu u kojoj joj je sredina. Ako je više tabela jedna
+pored druge (državni laboratorij: dvije tabele u istom redu), svaki naslov
+analita započinje novu grupu kolona, pa se redovi dvije tabele ne miješaju.
+
+Red tabele sa analitom i vrijednošću postaje jedna linija sa ćelijama
+razdvojenim sa CELL_SEP, uvijek redom ``analit, flag, vrijednost, jedinica,
+referenca`` (vidi split_cells) - parseri je čitaju direktno, bez probanja
+regex formata. Sve ostale linije (i cijela stranica bez zaglavlja, ni na
+njoj ni na prethodnim stranicama) su riječi istog reda spojene jednim
+razmakom (riječi se u redove grupišu po ``LINE_TOLERANCE``) - ne prepisuju
+se iz ``page.extract_text()``, pa se od njegovog teksta mogu razlikovati.
+
+Isključuje se sa ``LAB_READER_LAYOUT=0`` (tada ide samo ``extract_text``).
+"""
+import os
+import re
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .common import NUM, QUAL
+
+# Razdvajač ćelija reda tabele u tekstu stranice: ASCII "unit separator" se ne
+# pojavljuje u izvučenom tekstu (pdfplumber ga tretira kao razmak između riječi),
+# za razliku od tabulatora koji dolaze iz zalijepljenog TSV-a, PyPDF2 i OCR-a
+CELL_SEP = "\x1f"
+
+# Prva riječ naslova kolone (mala slova, bez tačke/dvotačke na kraju) -> uloga kolone
+HEADER_ROLES = {
+    "analiza": "analyte", "analit": "analyte", "konstituent": "analyte", "parametar": "analyte",
+    "pretraga": "analyte", "naziv": "analyte", "test": "analyte",
+    "vrijednost": "value", "vrednost": "value", "rezultat": "value",
+    "jm": "unit", "j.m": "unit", "jedinica": "unit",
+    "ref.vr": "ref", "ref": "ref", "referentni": "ref", "referentne": "ref", "referentna": "ref",
+    "referenca": "ref",
+}
+# Oznake odstupanja koje laboratorije štampaju pored vrijednosti
+FLAG_WORDS = {"H", "L", "HH", "LL", "*", "+", "↑", "↓"}
+
+LINE_TOLERANCE = 3  # isto kao pdfplumber extract_text (y_tolerance)
+LABEL_GAP = 8  # riječi naslova bliže od ovoga su jedan naslov ("Referentni interval")
+FLAG_GAP = 15  # flag u koloni analita je odvojen od naziva bar ovoliko
+ANALYTE_SLACK = 4  # vrijednosti su centrirane ispod naslova, ali mogu malo da ga prebace ulijevo
+
+_VALUE_RE = re.compile(rf"(?:{NUM}|{QUAL})")
+
+
+class Cells(NamedTuple):
+    analyte: str
+    flag: str
+    value: str
+    unit: str
+    ref: str
+
+    def to_line(self) -> str:
+        return CELL_SEP.join(self)
+
+    def text(self) -> str:
+        """Ćelije kao obična linija teksta (za kolonu Linija)"""
+        return " ".join(c for c in self if c)
+
+
+def split_cells(line: str) -> Optional[Cells]:
+    """Ćelije iz linije koju je napravio layout_text, ili None za običnu liniju"""
+    if line.count(CELL_SEP) != len(Cells._fields) - 1:
+        return None
+    return Cells(*(c.strip() for c in line.split(CELL_SEP)))
+
+
+class _Column(NamedTuple):
+    role: str
+    left: float
+    right: float
+
+
+def _norm(word: str) -> str:
+    return word.lower().rstrip(".:")
+
+
+def _header_groups(line: List[Dict]) -> Optional[List[List[_Column]]]:
+    """Grupe kolona (po jedna tabela) iz reda zaglavlja, ili None ako red nije zaglavlje"""
+    labels: List[Tuple[float, float, str]] = []  # (x0, x1, uloga)
+    for w in line:
+        if labels and w["x0"] - labels[-1][1] < LABEL_GAP:
+            x0, _, role = labels[-1]
+            labels[-1] = (x0, w["x1"], role)
+        else:
+            labels.append((w["x0"], w["x1"], HEADER_ROLES.get(_norm(w["text"]), "other")))
+
+    starts = [i for i, (_, _, role) in enumerate(labels) if role == "analyte"]
+    if not starts:
+        return None
+    groups = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(labels)
+        group = labels[start:end]
+        roles = {role for _, _, role in group}
+        if "value" not in roles or not roles & {"unit", "ref"}:
+            return None
+        groups.append(group)
+
+    result = []
+    for n, group in enumerate(groups):
+        columns = []
+        for i, (x0, x1, role) in enumerate(group):
+            if i == 0:
+                left = (groups[n - 1][-1][1] + x0) / 2 if n else float("-inf")
+            else:
+                left = columns[-1].right
+            if i + 1 < len(group):
+                nx0 = group[i + 1][0]
+                right = nx0 - ANALYTE_SLACK if role == "analyte" else (x1 + nx0) / 2
+            elif n + 1 < len(groups):
+                right = (x1 + groups[n + 1][0][0]) / 2
+            else:
+                right = float("inf")
+            columns.append(_Column(role, left, right))
+        result.append(columns)
+    return result
+
+
+def _row_cells(words: List[Dict], columns: List[_Column]) -> Optional[Cells]:
+    """Ćelije jednog reda jedne tabele, ili None ako red nije rezultat (nema analita/vrijednosti)"""
+    by_role: Dict[str, List[Dict]] = {}
+    for w in words:
+        center = (w["x0"] + w["x1"]) / 2
+        for col in columns:
+            if col.left <= center < col.right:
+                by_role.setdefault(col.role, []).append(w)
+                break
+
+    analyte = by_role.get("analyte", [])
+    value = [w["text"] for w in by_role.get("value", [])]
+    flag = ""
+    # Flag odvojen od naziva (npr. "Ukupni bilirubin      H   26.9")
+    if len(analyte) > 1 and analyte[-1]["text"] in FLAG_WORDS and analyte[-1]["x0"] - analyte[-2]["x1"] > FLAG_GAP:
+        flag = analyte.pop()["text"]
+    # ... ili u koloni vrijednosti, ispred broja
+    if len(value) > 1 and value[0] in FLAG_WORDS:
+        flag = value.pop(0)
+
+    value_text = " ".join(value)
+    if not analyte or not _VALUE_RE.fullmatch(value_text):
+        return None
+    return Cells(
+        " ".join(w["text"] for w in analyte), flag, value_text,
+        " ".join(w["text"] for w in by_role.get("unit", [])),
+        " ".join(w["text"] for w in by_role.get("ref", [])),
+    )
+
+
+def layout_lines(words: List[Dict], groups: Optional[List[List[_Column]]] = None) -> Tuple[List[str], Optional[List[List[_Column]]]]:
+    """Linije stranice iz riječi (pdfplumber extract_words) - redovi tabele kao ćelije
+
+    ``groups`` su kolone zaglavlja sa prethodne stranice (tabela koja se
+    nastavlja bez novog zaglavlja); vraća se i zadnje zaglavlje ove stranice.
+    """
+    from pdfplumber.utils import cluster_objects
+
+    out = []
+    for line in cluster_objects(words, itemgetter("top"), LINE_TOLERANCE):
+        header = _header_groups(line)
+        if header is not None:
+            groups = header
+            out.append(" ".join(w["text"] for w in line))
+            continue
+        if groups is None:
+            out.append(" ".join(w["text"] for w in line))
+            continue
+
+        rest = []
+        for columns in groups:
+            part = [w for w in line if columns[0].left <= (w["x0"] + w["x1"]) / 2 < columns[-1].right]
+            cells = _row_cells(part, columns) if part else None
+            if cells is not None:
+                out.append(cells.to_line())
+            else:
+                rest.extend(part)
+        if rest:
+            out.append(" ".join(w["text"] for w in rest))
+    return out, groups
+
+
+class LayoutExtractor:
+    """Tekst stranica jednog dokumenta, redom - kolone zadnjeg zaglavlja važe i na sljedećoj stranici"""
+
+    def __init__(self):
+        self.groups: Optional[List[List[_Column]]] = None
+
+    def page_text(self, page) -> str:
+        lines, self.groups = layout_lines(page.extract_words(), self.groups)
+        return "\n".join(lines)
+
+
+def layout_text(page) -> str:
+    """Tekst jedne pdfplumber stranice sa redovima tabele rezultata kao ćelijama"""
+    return LayoutExtractor().page_text(page)
+
+
+def layout_enabled(layout: Optional[bool] = None) -> bool:
+    """``layout`` ako je zadat, inače ``LAB_READER_LAYOUT`` (podrazumijevano uključeno)"""
+    if layout is not None:
+        return layout
+    return os.environ.get("LAB_READER_LAYOUT", "1").strip().lower() not in ("0", "false", "no", "off", "ne")
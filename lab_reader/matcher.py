@@ -0,0 +1,79 @@
+"""Aho–Corasick automat za traženje više riječi odjednom.
+
+Zamjenjuje petlje tipa ``any(w in name for w in words)``: automat se gradi
+jednom nad cijelim rječnikom, a pretraga jednog naziva je jedan prolaz kroz
+njegove znakove, bez obzira na to koliko riječi rječnik ima.
+"""
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class KeywordMatcher:
+    def __init__(self, words: Iterable[str]):
+        self.words = sorted(set(w for w in words if w))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Indeksi riječi koje se završavaju u čvoru (uključujući one preko fail linkova)
+        self._out: List[List[int]] = [[]]
+
+        for idx, word in enumerate(self.words):
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(idx)
+
+        # BFS - fail link čvora je najduži pravi sufiks koji je i prefiks neke riječi
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+        # Memoizovani DFA prelazi (goto + fail razriješeni) - popunjavaju se pri pretrazi
+        self._delta: List[Dict[str, int]] = [dict(g) for g in self._goto]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _transition(self, node: int, ch: str) -> int:
+        n = node
+        while n and ch not in self._goto[n]:
+            n = self._fail[n]
+        nxt = self._goto[n].get(ch, 0)
+        self._delta[node][ch] = nxt
+        return nxt
+
+    def search(self, text: str) -> bool:
+        """Da li tekst sadrži bar jednu riječ iz rječnika (kao podstring)"""
+        delta, out = self._delta, self._out
+        node = 0
+        for ch in text:
+            nxt = delta[node].get(ch)
+            node = self._transition(node, ch) if nxt is None else nxt
+            if out[node]:
+                return True
+        return False
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Sva (i preklapajuća) pojavljivanja kao (početak, kraj, riječ) - po kraju, pa od najduže"""
+        delta, out, words = self._delta, self._out, self.words
+        node = 0
+        for i, ch in enumerate(text):
+            nxt = delta[node].get(ch)
+            node = self._transition(node, ch) if nxt is None else nxt
+            for idx in out[node]:
+                word = words[idx]
+                yield i + 1 - len(word), i + 1, word
@@ -0,0 +1,171 @@
+"""Vremena po fazi i brojači obrade - po fajlu i po stranici, za JSON logove (CLI) i panel u UI-ju.
+
+Faze (STAGES): native izvlačenje teksta stranice, renderovanje stranice za
+OCR, OCR prepoznavanje, parsiranje, deduplikacija i izvoz. Brojači: stranice,
+linije, pokušaji formata linije (regex), prepoznati redovi, redovi koje je
+deduplikacija odbacila, pogoci/promašaji keša izvučenog teksta.
+
+Mjeri se samo unutar ``collect()``: aktivni ``Metrics`` je u ContextVar-u,
+pa pipeline ne prosljeđuje parametar kroz svaki poziv, a bez ``collect()``
+su ``stage``/``count`` samo jedno čitanje ContextVar-a. OCR niti ne vide
+kontekst - vrijeme prepoznavanja prijavljuje nit koja troši stranice
+(lab_reader.ocr.iter_ocr_ordered). ``Metrics`` je thread-safe.
+
+``lab-reader batch folder/ -o izlaz.csv --metrics metrics.jsonl``
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+STAGES = ("extract", "ocr_render", "ocr", "parse", "dedup", "export")
+COUNTERS = ("pages", "lines", "attempts", "matches", "dedup_dropped", "cache_hit", "cache_miss")
+
+
+class Metrics:
+    """Vremena (sekunde) po fazi i brojači jednog fajla ili cijelog pokretanja"""
+
+    def __init__(self, name: str = "", scope: str = "file"):
+        self.name = name
+        self.scope = scope
+        self.info: Dict = {}  # metod, laboratorija, broj redova, greška...
+        self._started = time.perf_counter()
+        self._seconds: Optional[float] = None
+        self._stages: Dict[str, float] = {}
+        self._counters: Dict[str, int] = {}
+        self._pages: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, page: Optional[int] = None) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+            if page is not None:
+                row = self._pages.setdefault(page, {})
+                row[stage] = row.get(stage, 0.0) + seconds
+
+    def count(self, counter: str, n: int = 1, page: Optional[int] = None) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+            if page is not None:
+                row = self._pages.setdefault(page, {})
+                row[counter] = row.get(counter, 0) + n
+
+    def page_info(self, page: int, **fields) -> None:
+        """Podaci stranice koji nisu vremena ni brojači (npr. metod: native/ocr)"""
+        with self._lock:
+            self._pages.setdefault(page, {}).update(fields)
+
+    def merge(self, data: Dict) -> None:
+        """Dodaje faze i brojače iz ``to_dict()`` drugog fajla (zbir za cijelo pokretanje)"""
+        for stage, seconds in data.get("stages", {}).items():
+            self.add(stage, seconds)
+        for counter, n in data.get("counters", {}).items():
+            self.count(counter, n)
+
+    def finish(self) -> None:
+        if self._seconds is None:
+            self._seconds = time.perf_counter() - self._started
+
+    @property
+    def seconds(self) -> float:
+        return self._seconds if self._seconds is not None else time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = {s: round(v, 6) for s, v in sorted(self._stages.items(), key=lambda kv: _order(kv[0]))}
+            pages = [{"page": p, **{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items()}}
+                     for p, row in sorted(self._pages.items())]
+            counters = dict(self._counters)
+        out = {"event": self.scope, self.scope: self.name, **self.info, "seconds": round(self.seconds, 6),
+               "stages": stages, "counters": counters}
+        if pages:
+            out["pages"] = pages
+        return out
+
+
+def _order(stage: str) -> int:
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+
+_current: ContextVar[Optional[Metrics]] = ContextVar("lab_reader_metrics", default=None)
+
+
+def current() -> Optional[Metrics]:
+    return _current.get()
+
+
+@contextmanager
+def collect(name: str = "", scope: str = "file") -> Iterator[Metrics]:
+    """Mjerenje unutar bloka ide u novi ``Metrics`` (ugniježđeni ``collect`` ima svoj)"""
+    metrics = Metrics(name, scope)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str, page: Optional[int] = None) -> Iterator[None]:
+    """Vrijeme bloka ide u fazu ``name`` aktivnog mjerenja (bez njega ne radi ništa)"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start, page)
+
+
+def add(name: str, seconds: float, page: Optional[int] = None) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(name, seconds, page)
+
+
+def count(counter: str, n: int = 1, page: Optional[int] = None) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(counter, n, page)
+
+
+def write_json_line(record: Dict, out: IO[str]) -> None:
+    """Jedan zapis po liniji (JSON Lines) - lako za grep/jq i uvoz u alate za logove"""
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def timing_frame(records: Iterable[Dict]) -> "pd.DataFrame":
+    """Tabela za UI: red po fajlu, faze u milisekundama, pa brojači"""
+    import pandas as pd
+
+    rows = []
+    for r in records:
+        row = {"Fajl": r.get("file", r.get("run", "")), "Laboratorija": r.get("lab", ""),
+               "Metod": r.get("method", ""), "Ukupno ms": round(r["seconds"] * 1000, 1)}
+        row.update({f"{s} ms": round(r["stages"].get(s, 0.0) * 1000, 1) for s in STAGES})
+        row.update({c: r["counters"].get(c, 0) for c in COUNTERS})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def page_frame(records: Iterable[Dict]) -> "pd.DataFrame":
+    """Tabela za UI: red po stranici svakog fajla"""
+    import pandas as pd
+
+    rows: List[Dict] = []
+    for r in records:
+        for p in r.get("pages", []):
+            row = {"Fajl": r.get("file", ""), "Strana": p["page"] + 1, "Metod": p.get("method", "")}
+            row.update({f"{s} ms": round(p.get(s, 0.0) * 1000, 1) for s in STAGES[:4]})
+            row.update({c: p.get(c, 0) for c in ("lines", "attempts", "matches")})
+            rows.append(row)
+    return pd.DataFrame(rows)
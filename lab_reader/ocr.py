@@ -0,0 +1,295 @@
+"""OCR za slike i skenirane PDF-ove (pytesseract + PyMuPDF).
+
+Slike se prije OCR-a pripremaju u lab_reader.preprocess (DPI, sivi tonovi, isijecanje).
+
+Greške se ne prikazuju ovdje - funkcije bacaju izuzetke, a UI/CLI odlučuju
+kako da ih prikažu. Nedostajuće biblioteke daju ``ImportError``.
+"""
+import io
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from . import metrics
+from .preprocess import OcrSettings, prepare_image, render_page
+from .utils import default_workers
+
+T = TypeVar("T")
+
+OCR_LANG = "eng+srp"
+
+TESSERACT_PATHS = [
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
+    'tesseract'  # If in PATH
+]
+
+
+class TesseractNotFoundError(RuntimeError):
+    """Tesseract OCR nije instaliran (ili nije pronađen)"""
+
+
+class OcrEngine:
+    """Tesseract se pronalazi i provjerava jednom po procesu, a OCR backend ostaje topao
+
+    Ako je instaliran ``tesserocr``, koristi se on: API handle-ovi (sa već
+    učitanim jezičkim modelom) se čuvaju i ponovo koriste, po jedan za svaku
+    nit koja istovremeno radi OCR - nema novog procesa ni učitavanja modela
+    po stranici. Inače ide pytesseract (tesseract proces po slici), ali se
+    izvršni fajl traži i provjerava (``get_tesseract_version``) samo jednom.
+    Rezultat pretrage se pamti i kad Tesseract nije pronađen; ``reset()``
+    traži ponovo (npr. nakon instalacije bez restarta).
+
+    Backend se može izabrati sa ``LAB_READER_OCR_BACKEND`` (auto, tesserocr, pytesseract).
+    """
+
+    def __init__(self, lang: str = OCR_LANG, paths: Optional[List[str]] = None, backend: Optional[str] = None):
+        self.lang = lang
+        self.paths = paths or TESSERACT_PATHS
+        self.preferred = backend or os.environ.get("LAB_READER_OCR_BACKEND", "auto")
+        self.backend: Optional[str] = None  # "tesserocr" | "pytesseract"
+        self.tesseract_cmd: Optional[str] = None
+        self._lock = threading.Lock()
+        self._error: Optional[TesseractNotFoundError] = None
+        self._apis: "queue.SimpleQueue" = queue.SimpleQueue()  # slobodni tesserocr handle-ovi
+        self._apis_lock = threading.Lock()
+        self._all_apis: List[Any] = []
+
+    def ensure_ready(self) -> "OcrEngine":
+        """Pronalazi backend pri prvom pozivu; kasnije samo vraća zapamćeni rezultat"""
+        if self.backend is not None:
+            return self
+        with self._lock:
+            if self.backend is None:
+                if self._error is not None:
+                    raise self._error
+                try:
+                    self._discover()
+                except TesseractNotFoundError as e:
+                    self._error = e
+                    raise
+        return self
+
+    def _discover(self) -> None:
+        if self.preferred in ("auto", "tesserocr"):
+            try:
+                self._release(self._new_api())
+                self.backend = "tesserocr"
+                return
+            except ImportError:
+                if self.preferred == "tesserocr":
+                    raise
+            except RuntimeError as e:  # tesserocr postoji, ali nema modela za self.lang
+                if self.preferred == "tesserocr":
+                    raise TesseractNotFoundError(f"tesserocr: {e}") from e
+
+        import pytesseract
+
+        for path in self.paths:
+            if os.path.exists(path) or path == 'tesseract':
+                try:
+                    pytesseract.pytesseract.tesseract_cmd = path
+                    pytesseract.get_tesseract_version()
+                except Exception:
+                    continue
+                self.tesseract_cmd = path
+                self.backend = "pytesseract"
+                return
+        raise TesseractNotFoundError("Tesseract OCR nije instaliran")
+
+    def _new_api(self):
+        import tesserocr
+
+        api = tesserocr.PyTessBaseAPI(lang=self.lang)
+        with self._apis_lock:
+            self._all_apis.append(api)
+        return api
+
+    def _release(self, api) -> None:
+        self._apis.put(api)
+
+    def image_to_string(self, image) -> str:
+        """OCR jedne PIL slike; sigurno za poziv iz više niti"""
+        self.ensure_ready()
+        if self.backend == "tesserocr":
+            try:
+                api = self._apis.get_nowait()
+            except queue.Empty:
+                api = self._new_api()
+            try:
+                api.SetImage(image)
+                return api.GetUTF8Text()
+            finally:
+                self._release(api)
+
+        import pytesseract
+
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+    def reset(self) -> None:
+        """Zaboravlja pronađeni backend (i grešku) i oslobađa tesserocr handle-ove"""
+        with self._lock, self._apis_lock:
+            for api in self._all_apis:
+                api.End()
+            self._all_apis = []
+            self._apis = queue.SimpleQueue()
+            self.backend = self.tesseract_cmd = None
+            self._error = None
+
+
+_engine: Optional[OcrEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> OcrEngine:
+    """Zajednički OCR engine procesa"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OcrEngine()
+        return _engine
+
+
+def configure_tesseract() -> str:
+    """Pronalazi Tesseract (jednom po procesu) - vraća putanju do izvršnog fajla (ili 'tesserocr')"""
+    engine = get_engine().ensure_ready()
+    return engine.tesseract_cmd or engine.backend
+
+
+def extract_text_from_image(file_bytes: bytes, settings: Optional[OcrSettings] = None) -> str:
+    """Extract text from image using OCR"""
+    from PIL import Image
+
+    configure_tesseract()
+
+    with metrics.stage("ocr_render", 0):
+        image = prepare_image(Image.open(io.BytesIO(file_bytes)), settings)
+
+    # Extract text using OCR
+    with metrics.stage("ocr", 0):
+        text = get_engine().image_to_string(image)
+    return text.strip()
+
+
+def _render_page(page, settings: Optional[OcrSettings] = None):
+    """Renderuje stranicu u PIL sliku za OCR - vidi lab_reader.preprocess"""
+    return render_page(page, settings)
+
+
+def _timed_render(page, settings: Optional[OcrSettings] = None):
+    with metrics.stage("ocr_render", page.number):
+        return _render_page(page, settings)
+
+
+def _ocr_image(image) -> Tuple[str, float]:
+    start = time.perf_counter()
+    text = get_engine().image_to_string(image)
+    return text, time.perf_counter() - start
+
+
+def iter_ocr_ordered(jobs: Iterable[Tuple[T, Union[str, Callable[[], Any]]]], workers: Optional[int] = None,
+                     max_inflight: Optional[int] = None,
+                     on_recognized: Optional[Callable[[T, float], None]] = None) -> Iterator[Tuple[T, str]]:
+    """(oznaka, tekst) redom poslova, čim je koji gotov
+
+    Posao je ``(oznaka, tekst)`` za stranicu koja ne treba OCR ili ``(oznaka,
+    render)``, gdje ``render()`` vraća PIL sliku. Slike se renderuju redom, u
+    niti koja troši generator (PDF dokumenti nisu thread-safe), a OCR ide
+    paralelno na ``workers`` niti - svaki pytesseract poziv je poseban
+    tesseract proces. Najviše ``max_inflight`` renderovanih slika čeka na OCR
+    u isto vrijeme, pa memorija ostaje ograničena i za velike skenove.
+    ``on_recognized(oznaka, sekunde)`` se poziva u niti koja troši generator,
+    za svaku OCR-ovanu stranicu (lab_reader.metrics).
+    """
+    def result(tag, item) -> str:
+        if isinstance(item, str):
+            return item
+        text, seconds = item.result()
+        if on_recognized is not None:
+            on_recognized(tag, seconds)
+        return text
+
+    workers = workers or default_workers()
+    slots = threading.BoundedSemaphore(max_inflight or 2 * workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending: Deque = deque()  # (oznaka, tekst ili future), redom poslova
+        try:
+            for tag, job in jobs:
+                if isinstance(job, str):
+                    pending.append((tag, job))
+                else:
+                    slots.acquire()
+                    try:
+                        image = job()
+                    except BaseException:
+                        slots.release()
+                        raise
+                    fut = ex.submit(_ocr_image, image)
+                    fut.add_done_callback(lambda _f: slots.release())
+                    pending.append((tag, fut))
+
+                # Vrati sve poslove sa početka reda koji su već gotovi
+                while pending and (isinstance(pending[0][1], str) or pending[0][1].done()):
+                    tag, item = pending.popleft()
+                    yield tag, result(tag, item)
+
+            while pending:
+                tag, item = pending.popleft()
+                yield tag, result(tag, item)
+        finally:
+            for _, item in pending:
+                if not isinstance(item, str):
+                    item.cancel()
+
+
+def iter_pages_from_pdf_with_ocr(file_bytes: bytes, workers: Optional[int] = None,
+                                 max_inflight: Optional[int] = None,
+                                 settings: Optional[OcrSettings] = None) -> Iterator[str]:
+    """Tekst stranicu po stranicu (redom), čim je OCR te stranice gotov - vidi iter_ocr_ordered"""
+    import fitz  # PyMuPDF
+
+    configure_tesseract()
+
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+
+    def jobs():
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+
+            # First try to extract text normally
+            page_text = page.get_text()
+            if page_text.strip():
+                yield page_num, page_text
+            else:
+                # If no text, use OCR on the page image
+                yield page_num, lambda page=page: _timed_render(page, settings)
+
+    try:
+        for _, text in iter_ocr_ordered(jobs(), workers=workers, max_inflight=max_inflight,
+                                        on_recognized=lambda page_num, seconds: metrics.add("ocr", seconds, page_num)):
+            yield text
+    finally:
+        doc.close()
+
+
+def extract_pages_from_pdf_with_ocr(file_bytes: bytes, workers: Optional[int] = None,
+                                    max_inflight: Optional[int] = None,
+                                    settings: Optional[OcrSettings] = None) -> List[str]:
+    """Extract text per page from PDF using OCR (for scanned PDFs) - vidi iter_pages_from_pdf_with_ocr"""
+    return list(iter_pages_from_pdf_with_ocr(file_bytes, workers=workers, max_inflight=max_inflight,
+                                             settings=settings))
+
+
+def extract_text_from_pdf_with_ocr(file_bytes: bytes, workers: Optional[int] = None,
+                                   max_inflight: Optional[int] = None,
+                                   settings: Optional[OcrSettings] = None) -> str:
+    """Extract text from PDF using OCR (for scanned PDFs)"""
+    pages = extract_pages_from_pdf_with_ocr(file_bytes, workers=workers, max_inflight=max_inflight,
+                                            settings=settings)
+    return "".join(t + "\n" for t in pages).strip()
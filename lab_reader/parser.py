@@ -0,0 +1,384 @@
+"""Univerzalni parser (v3) - prepoznaje Analit / Vrijednost / Jedinica / Ref po liniji."""
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import profiling
+from .dedup import drop_duplicate_analytes
+from .frame import ResultColumns, set_column, status_column
+from .layout import Cells, split_cells
+from .matcher import KeywordMatcher
+from .record import LabResult, line_spans, strip_span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Kvalitativni analiti (npr. urin analiza)
+_QUALITATIVE_MATCHER = KeywordMatcher([
+    "glukoza u urinu", "eritrociti u urinu", "proteini u urinu",
+    "bilirubin u urinu", "urobilinogen u urinu", "krv u urinu",
+    "ketoni u urinu", "nitriti", "leukociti u urinu"
+])
+
+_WS = re.compile(r"\s+")
+_COLUMN_SPLIT = re.compile(r"\s{2,}")
+_RANGE_SEP = re.compile(r"[~\-]")
+
+COLUMNS = ["Analit", "Tip", "Vrijednost", "Jedinica", "Ref_low", "Ref_high", "Ref_tip", "Ref_kval", "Flag", "Status", "Izvor", "Linija"]
+
+# Poznati analiti (polazni rječnik parsera v3 i auto parsera)
+KNOWN_ANALYTES = frozenset({
+    "hemoglobin", "hb", "eritrociti", "rbc", "leukociti", "wbc", "trombociti", "plt",
+    "hematokrit", "hct", "glukoza", "glucose", "urea", "kreatinin", "creatinine",
+    "alt", "gpt", "ast", "got", "ggt", "gamma gt", "holesterol", "cholesterol",
+    "hdl", "ldl", "trigliceridi", "triglycerides", "natrijum", "na", "kalijum", "k",
+    "kalcijum", "ca", "neutrofili", "neutrophils", "limfociti", "lymphocytes",
+    "monociti", "monocytes", "eozinofili", "eosinophils", "bazofili", "basophils",
+    "mcv", "mch", "mchc", "rdw", "pdw", "mpv", "pct", "p-lcr", "ig", "sedimentacija",
+    "protrombinsko", "inr", "aptt", "fibrinogen", "bilirubin", "urobilinogen",
+    "glukoza u urinu", "eritrociti u urinu", "proteini u urinu", "ketoni u urinu",
+    "nitriti", "leukociti u urinu", "krv u urinu", "ph urina", "specifina težina"
+})
+
+# Riječi zbog kojih naziv nije analit
+SKIP_WORDS = frozenset({
+    "laboratorijska", "dijagnostika", "uzorkovanja", "vrijeme", "datum", "pacijent",
+    "doktor", "dr", "serum", "plazma", "citrat", "punkt", "protokola", "br.",
+    "aligrudić", "golubovci", "filip", "mara", "džomić", "qo", "med", "dijag",
+    "normalan", "negativan", "pozitivan", "granulociti", "epitelne", "cel",
+    "neskvamozne", "bubrežni", "epitel", "elije", "težina", "specifina"
+})
+
+
+class LabResultParser:
+    # Kolone reference koje odlučuju koji duplikat analita ostaje
+    REF_COLUMNS = ["Ref_low", "Ref_high", "Ref_tip"]
+    EMPTY_COLUMNS = COLUMNS
+
+    def __init__(self):
+        # Rječnici su po instanci (mogu se mijenjati), polazne vrijednosti su zajedničke sa auto parserom
+        self.known_analytes = set(KNOWN_ANALYTES)
+        self.skip_words = set(SKIP_WORDS)
+        
+        # Rječnici kao Aho–Corasick automati - jedan prolaz kroz naziv umjesto
+        # provjere svake riječi posebno (grade se jednom, nad skupovima iznad;
+        # ko mijenja skupove nakon konstrukcije, treba da pozove rebuild_matchers)
+        self.rebuild_matchers()
+        # Broj pokušaja formata linije (regex) - brojač za lab_reader.metrics
+        self.pattern_attempts = 0
+        # Broj linija (raspona iz line_spans) koje je iter_text prošao - brojač za lab_reader.metrics
+        self.line_count = 0
+        
+        # Regex patterni
+        self.num_pattern = r"[-+]?\d+(?:[.,]\d+)?"
+        self.qual_pattern = r"(?:Negativan|Normalan|Pozitivan)"
+        self.unit_pattern = r"(?:10[\*\^]\d+\/[A-Za-z]+|[A-Za-z%\/\*\.\-\^]+)"
+        self.range_pattern = rf"(?:{self.num_pattern}\s*[~\-]\s*{self.num_pattern}|<\s*{self.num_pattern}|>\s*{self.num_pattern}|{self.qual_pattern})"
+
+        # Sve se kompajlira jednom po parseru, ne za svaku liniju
+        self._qual_re = re.compile(self.qual_pattern)
+        self._range_re = re.compile(rf"^{self.num_pattern}\s*[~\-]\s*{self.num_pattern}$")
+        self._lt_re = re.compile(rf"^<\s*{self.num_pattern}$")
+        self._gt_re = re.compile(rf"^>\s*{self.num_pattern}$")
+
+        # Svaki format linije mora imati vrijednost (broj ili kvalitativnu) - jeftin predfilter
+        self._value_hint_re = re.compile(rf"\d|{self.qual_pattern}")
+
+        # Formati linije, redom po prioritetu. Spojeni su u jednu alternaciju
+        # (?P<p0>...)|(?P<p1>...)|... pa se linija skenira jednom; regex proba
+        # alternative istim redom kao ranija petlja, a lastgroup kaže koja je prošla.
+        self._line_groups = []
+        self._line_names = []
+        self._line_res = []
+        alternatives = []
+        for i, (pattern, names) in enumerate(self._line_patterns()):
+            self._line_groups.append(names)
+            self._line_names.append(" ".join(names))
+            self._line_res.append(re.compile(pattern.format(**{n: n for n in names})))
+            alternatives.append(f"(?P<p{i}>" + pattern.format(**{n: f"{n}_{i}" for n in names}) + ")")
+        self._line_re = re.compile("|".join(alternatives))
+
+    def _line_patterns(self) -> List[Tuple[str, List[str]]]:
+        """Formati linije kao (šablon sa {imenima} grupa, imena grupa)"""
+        analyte = r"(?P<{analyte}>[A-Za-zČĆŠĐŽčćšđž][A-Za-zČĆŠĐŽčćšđž\s\.\-%]+?)"
+        value = rf"(?P<{{value}}>{self.num_pattern}|{self.qual_pattern})"
+        unit = rf"(?P<{{unit}}>{self.unit_pattern})"
+        ref = rf"(?P<{{ref}}>{self.range_pattern})"
+        return [
+            # Format: Analit Vrijednost Jedinica Ref
+            (rf"^{analyte}\s+{value}\s+{unit}?\s*{ref}?\s*$", ["analyte", "value", "unit", "ref"]),
+
+            # Format: Analit Vrijednost Jedinica (bez ref)
+            (rf"^{analyte}\s+{value}\s+{unit}\s*$", ["analyte", "value", "unit"]),
+
+            # Format: Vrijednost Jedinica Analit
+            (rf"^{value}\s+{unit}\s+{analyte}\s*$", ["value", "unit", "analyte"]),
+
+            # Format: Analit Vrijednost (bez jedinice)
+            (rf"^{analyte}\s+{value}\s*$", ["analyte", "value"]),
+        ]
+    
+    def rebuild_matchers(self) -> None:
+        """Ponovo gradi automate nad known_analytes i skip_words"""
+        self._skip_matcher = KeywordMatcher(self.skip_words)
+        self._known_matcher = KeywordMatcher(self.known_analytes)
+    
+    def is_valid_analyte(self, name: str) -> bool:
+        """Proverava da li je naziv valjan analit"""
+        if not name or len(name.strip()) < 2:
+            return False
+        
+        name_lower = name.lower().strip()
+        
+        # Preskoči ako sadrži skip reči
+        if self._skip_matcher.search(name_lower):
+            return False
+        
+        # Proveri da li sadrži poznate analite
+        if self._known_matcher.search(name_lower):
+            return True
+        
+        # Proveri da li je kratak i smislen (1-3 reči)
+        words = name_lower.split()
+        if len(words) <= 3 and all(len(w) > 1 for w in words):
+            if not all(w.isdigit() or len(w) < 3 for w in words):
+                return True
+        
+        return False
+    
+    def parse_value(self, val_str: str) -> Tuple[Optional[float], Optional[str]]:
+        """Parsira vrednost - vraća (numerička_vrednost, kvalitativna_vrednost)"""
+        if not val_str:
+            return None, None
+        
+        val_str = val_str.strip()
+        
+        # Proveri da li je kvalitativna vrednost
+        if self._qual_re.fullmatch(val_str):
+            return None, val_str
+        
+        # Pokušaj da parsiraš numeričku vrednost
+        try:
+            # Zameni zarez tačkom
+            val_clean = val_str.replace(",", ".")
+            return float(val_clean), None
+        except:
+            return None, val_str
+    
+    def is_qualitative_result(self, analyte: str, value: str) -> bool:
+        """Proverava da li je kvalitativni rezultat (npr. urin analiza)"""
+        return _QUALITATIVE_MATCHER.search(analyte.lower())
+    
+    def parse_reference(self, ref_str: str) -> Tuple[Optional[float], Optional[float], str, Optional[str]]:
+        """Parsira referentne vrednosti - vraća (low, high, type, qual_ref)"""
+        if not ref_str:
+            return None, None, "none", None
+        
+        ref_str = ref_str.strip()
+        
+        # Kvalitativna referenca
+        if self._qual_re.fullmatch(ref_str):
+            return None, None, "qual", ref_str
+        
+        # Range format (npr. "4.5-6.2")
+        range_match = self._range_re.match(ref_str)
+        if range_match:
+            parts = _RANGE_SEP.split(ref_str)
+            low = float(parts[0].strip().replace(",", "."))
+            high = float(parts[1].strip().replace(",", "."))
+            return low, high, "range", None
+        
+        # Less than format (npr. "<10")
+        lt_match = self._lt_re.match(ref_str)
+        if lt_match:
+            high = float(lt_match.group(0).split("<")[1].strip().replace(",", "."))
+            return None, high, "<", None
+        
+        # Greater than format (npr. ">5")
+        gt_match = self._gt_re.match(ref_str)
+        if gt_match:
+            low = float(gt_match.group(0).split(">")[1].strip().replace(",", "."))
+            return low, None, ">", None
+        
+        return None, None, "none", None
+    
+    def calculate_status(self, val_num: Optional[float], val_qual: Optional[str], 
+                        ref_low: Optional[float], ref_high: Optional[float], 
+                        ref_type: str, qual_ref: Optional[str]) -> str:
+        """Računa status vrednosti"""
+        if val_num is not None:
+            if ref_type == "range" and ref_low is not None and ref_high is not None:
+                if val_num < ref_low:
+                    return "⬇️ ispod"
+                elif val_num > ref_high:
+                    return "⬆️ iznad"
+                else:
+                    return "✅ u referentnom"
+            elif ref_type == "<" and ref_high is not None:
+                return "✅ u referentnom" if val_num < ref_high else "⬆️ iznad"
+            elif ref_type == ">" and ref_low is not None:
+                return "✅ u referentnom" if val_num > ref_low else "⬇️ ispod"
+            else:
+                return ""
+        
+        if val_qual is not None and qual_ref is not None:
+            return "✅ u referentnom" if val_qual == qual_ref else "⚠️ odstupanje"
+        
+        return ""
+    
+    def clean_analyte_name(self, name: str) -> Tuple[str, str]:
+        """Čisti naziv analita i određuje tip"""
+        name = name.strip()
+        
+        # Ukloni prefikse
+        if name.lower().startswith(("k-", "s-")):
+            name = name[2:].strip()
+        
+        # Normalizuj razmake
+        name = _WS.sub(" ", name.replace("aps.", "aps")).strip()
+        
+        typ = ""
+        
+        # Proveri tip
+        if name.endswith("%"):
+            typ = "%"
+            name = name[:-1].strip()
+        elif name.lower().endswith(" aps"):
+            typ = "aps"
+            name = name[:-3].strip()
+        
+        return name, typ
+    
+    def parse_line(self, line: str, status: bool = True) -> Optional[LabResult]:
+        """Parsira jednu liniju teksta (``status=False``: Status ostaje None, računa se kasnije nad kolonom)"""
+        return self._parse_line(line, status)[0]
+
+    def _parse_line(self, line: str, status: bool = True) -> Tuple[Optional[LabResult], str]:
+        """(red ili None, format koji je odlučio o liniji) - ime formata koristi lab_reader.profiling"""
+        cells = split_cells(line)
+        if cells is not None:
+            return self.parse_cells(cells, status), "tabela"
+
+        stripped = line.strip()
+        if not stripped or not self._value_hint_re.search(stripped):
+            return None, "bez vrijednosti"
+
+        # Jedan prolaz kroz sve formate; prvi format koji se poklopi daje grupe
+        self.pattern_attempts += 1
+        match = self._line_re.match(stripped)
+        if not match:
+            return None, "bez poklapanja"
+        k = int(match.lastgroup[1:])
+        pattern = self._line_names[k]
+        result = self._result_from_groups({n: match.group(f"{n}_{k}") for n in self._line_groups[k]}, line, status)
+        if result:
+            return result, pattern
+
+        # Analit nije validan - kao i ranije, probaj preostale formate redom
+        for j in range(k + 1, len(self._line_res)):
+            self.pattern_attempts += 1
+            match = self._line_res[j].match(stripped)
+            if match:
+                pattern = self._line_names[j]
+                result = self._result_from_groups(match.groupdict(), line, status)
+                if result:
+                    return result, pattern
+
+        return None, pattern
+
+    def parse_cells(self, cells: Cells, status: bool = True) -> Optional[LabResult]:
+        """Red tabele iz lab_reader.layout - kolone su već poznate, pa nema probanja formata"""
+        groups = {"analyte": cells.analyte, "value": cells.value, "unit": cells.unit, "ref": cells.ref}
+        result = self._result_from_groups(groups, cells.to_line(), status)
+        if result and cells.flag:
+            result.flag = cells.flag
+        return result
+
+    def _result_from_groups(self, groups: Dict[str, Optional[str]], line: str,
+                            status: bool = True) -> Optional[LabResult]:
+        """Pravi red rezultata iz grupa jednog formata (None ako analit nije validan)"""
+        analyte = (groups.get("analyte") or "").strip()
+        value = (groups.get("value") or "").strip()
+        unit = (groups.get("unit") or "").strip()
+        ref = (groups.get("ref") or "").strip()
+        
+        # Validiraj analit
+        if not self.is_valid_analyte(analyte):
+            return None
+        
+        # Parsiraj vrednost
+        val_num, val_qual = self.parse_value(value)
+        
+        # Specijalna logika za kvalitativne rezultate
+        if self.is_qualitative_result(analyte, value):
+            # Za kvalitativne rezultate, vrednost je kvalitativna, ne jedinica
+            if val_qual and unit.lower() in ["negativan", "normalan", "pozitivan"]:
+                unit = ""  # Jedinica je zapravo vrednost
+                val_qual = unit
+        
+        # Parsiraj referencu
+        ref_low, ref_high, ref_type, qual_ref = self.parse_reference(ref)
+        
+        # Čisti naziv analita
+        clean_name, typ = self.clean_analyte_name(analyte)
+        
+        return LabResult(
+            clean_name, val_num if val_num is not None else val_qual, unit, typ=typ,
+            ref_low=ref_low, ref_high=ref_high, ref_type=ref_type, qual_ref=qual_ref,
+            status=self.calculate_status(val_num, val_qual, ref_low, ref_high, ref_type, qual_ref) if status else None,
+            source="smart", text=line,
+        )
+    
+    def line_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(početak, kraj) linija za parsiranje; kolone razdvojene sa 2+ razmaka postaju posebne linije"""
+        for start, end in line_spans(text):
+            if split_cells(text[start:end]) is not None:
+                yield start, end  # red tabele (lab_reader.layout) - ćelije se ne diraju
+                continue
+            start, end = strip_span(text, start, end)
+            
+            # Pokušaj da podeliš na kolone (ako su razdvojene sa 2+ razmaka)
+            for m in _COLUMN_SPLIT.finditer(text, start, end):
+                yield start, m.start()
+                start = m.end()
+            if start < end:
+                yield start, end
+
+    def split_lines(self, text: str) -> Iterator[str]:
+        """Linije teksta; kolone razdvojene sa 2+ razmaka postaju posebne linije"""
+        return (text[start:end] for start, end in self.line_spans(text))
+
+    def iter_results(self, lines: Iterable[str], status: bool = True) -> Iterator[LabResult]:
+        """Prepoznati redovi, jedan po jedan kako linije stižu (bez deduplikacije)"""
+        parse_line = profiling.timed_lines(self._parse_line, "v3")
+        for line in lines:
+            result, _ = parse_line(line, status)
+            if result:
+                yield result
+
+    def iter_text(self, text: str, page: int = 0, status: bool = True) -> Iterator[LabResult]:
+        """Kao iter_results(split_lines(text)), ali red pamti raspon linije u ``text`` umjesto kopije linije"""
+        parse_line = profiling.timed_lines(self._parse_line, "v3")
+        n = 0
+        try:
+            for n, (start, end) in enumerate(self.line_spans(text), 1):
+                result, _ = parse_line(text[start:end], status)
+                if result:
+                    result.locate(text, start, end, page)
+                    yield result
+        finally:
+            self.line_count += n
+
+    def parse_text(self, text: str) -> "pd.DataFrame":
+        """Parsira ceo tekst"""
+        import pandas as pd
+
+        results = ResultColumns(COLUMNS)
+        results.extend(self.iter_text(text, status=False))
+        if not len(results):
+            return pd.DataFrame(columns=COLUMNS)
+
+        df = results.frame()
+        set_column(df, "Status", status_column(df["Vrijednost"], df["Ref_low"], df["Ref_high"],
+                                               df["Ref_tip"], df["Ref_kval"]))
+        # Deduplikacija - prioritet rezultatima sa referentnim vrednostima
+        return drop_duplicate_analytes(df, self.REF_COLUMNS)
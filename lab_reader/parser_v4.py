@@ -0,0 +1,358 @@
+"""Jednostavniji parser iz app_v4 (statusi Normalno / Povišeno / Sniženo)."""
+import re
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Tuple
+
+from . import profiling
+from .dedup import drop_duplicate_analytes
+from .frame import ResultColumns, set_column
+from .layout import Cells, split_cells
+from .matcher import KeywordMatcher
+from .record import LabResult
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Qualitative analytes (e.g. urinalysis)
+_QUALITATIVE_MATCHER = KeywordMatcher([
+    "glukoza u urinu", "eritrociti u urinu", "proteini u urinu",
+    "bilirubin u urinu", "urobilinogen u urinu", "krv u urinu",
+    "ketoni u urinu", "nitriti", "leukociti u urinu"
+])
+
+_WS = re.compile(r'\s+')
+_DIGIT = re.compile(r'\d')
+_NAME_PREFIX = re.compile(r'^(test|analiza|vrijednost|rezultat)\s+', re.IGNORECASE)
+_NAME_SUFFIX = re.compile(r'\s+(test|analiza|vrijednost|rezultat)$', re.IGNORECASE)
+
+_REF_PATTERNS = [
+    re.compile(r'(\d+[,.]?\d*)\s*-\s*(\d+[,.]?\d*)'),  # 3.5-5.0
+    re.compile(r'(\d+[,.]?\d*)\s*do\s*(\d+[,.]?\d*)'),  # 3.5 do 5.0
+    re.compile(r'(\d+[,.]?\d*)\s*-\s*(\d+[,.]?\d*)\s*(\w+)'),  # 3.5-5.0 g/dl
+]
+
+_LINE_PATTERNS = [
+    # Pattern 1: Analyte Value Unit Ref
+    r'^([^0-9]+?)\s+(\d+[,.]?\d*)\s+(\w+)\s+(\d+[,.]?\d*)\s*-\s*(\d+[,.]?\d*)$',
+    # Pattern 2: Analyte Value Unit
+    r'^([^0-9]+?)\s+(\d+[,.]?\d*)\s+(\w+)$',
+    # Pattern 3: Value Unit Analyte
+    r'^(\d+[,.]?\d*)\s+(\w+)\s+([^0-9]+?)$',
+    # Pattern 4: Analyte Value
+    r'^([^0-9]+?)\s+(\d+[,.]?\d*)$',
+]
+_LINE_NAMES = ["analyte value unit ref", "analyte value unit", "value unit analyte", "analyte value"]
+
+# All line patterns in one alternation, each wrapped in its own group, so a line
+# is scanned once; alternatives are tried in the same order as the old loop.
+_LINE_RE = re.compile("|".join(f"({p})" for p in _LINE_PATTERNS))
+_LINE_SLICES = {}  # wrapper group index -> (pattern index, first inner group, last inner group)
+_group = 1
+for _i, _p in enumerate(_LINE_PATTERNS):
+    _n = re.compile(_p).groups
+    _LINE_SLICES[_group] = (_i, _group + 1, _group + _n)
+    _group += _n + 1
+del _group, _i, _p, _n
+
+
+class ResultV4(LabResult):
+    """Row of the simpler parser - only the columns app_v4 shows"""
+
+    __slots__ = ()
+
+    COLUMNS = ["Analit", "Vrijednost", "Jedinica", "Ref_low", "Ref_high", "Status"]
+
+
+class LabResultParserV4:
+    # Reference columns that decide which duplicate of an analyte is kept
+    REF_COLUMNS = ["Ref_low", "Ref_high"]
+    EMPTY_COLUMNS = None
+
+    def __init__(self):
+        # Poznati analiti
+        self.known_analytes = {
+            "glukoza", "hemoglobin", "hematokrit", "leukociti", "eritrociti", "trombociti",
+            "kreatinin", "ureja", "bilirubin", "alt", "ast", "ggt", "alkalna fosfataza",
+            "ldh", "ck", "troponin", "crp", "esr", "feritin", "vitamin d", "b12", "folna kiselina",
+            "tsh", "ft3", "ft4", "testosteron", "estradiol", "progesteron", "insulin",
+            "hba1c", "lipidi", "holesterol", "trigliceridi", "hdl", "ldl", "apolipoprotein",
+            "sodium", "kalijum", "kalcijum", "fosfor", "magnezijum", "kloridi", "bikarbonati",
+            "ph", "pco2", "po2", "hco3", "base excess", "laktat", "glukoza u urinu",
+            "proteini u urinu", "eritrociti u urinu", "leukociti u urinu", "nitriti",
+            "ketoni u urinu", "bilirubin u urinu", "urobilinogen u urinu", "krv u urinu"
+        }
+        
+        # Reči koje treba preskočiti
+        self.skip_words = {
+            "datum", "vrijeme", "ime", "prezime", "jmbg", "adresa", "telefon", "email",
+            "doktor", "dr", "prof", "država", "grad", "ulica", "broj", "kat", "stan",
+            "laboratorij", "analiza", "rezultat", "vrijednost", "jedinica", "referenca",
+            "normalan", "povišen", "snižen", "kritičan", "urgentno", "hitno", "redovno",
+            "kontrola", "pregled", "dijagnoza", "terapija", "lijek", "doza", "tableta",
+            "kapsula", "sirup", "injeksija", "infuzija", "operacija", "hirurgija",
+            "bolnica", "klinika", "ambulanta", "ordinacija", "sestra", "tehničar",
+            "direktor", "upravnik", "sekretar", "administrator", "račun", "faktura",
+            "plaćanje", "osiguranje", "kartica", "bankovni", "transfer", "depozit"
+        }
+        
+        # Vocabularies as Aho–Corasick automata - one pass over the name instead
+        # of a substring check per word (built once, from the sets above; call
+        # rebuild_matchers after changing the sets on an existing parser)
+        self.rebuild_matchers()
+        # Line-pattern (regex) attempts - counter for lab_reader.metrics
+        self.pattern_attempts = 0
+        # Lines (line_spans) walked by iter_text - counter for lab_reader.metrics
+        self.line_count = 0
+        
+        # Regex patterns
+        self.num_pattern = r'(\d+[,.]?\d*)'
+        self.qual_pattern = r'^(pozitivno|negativno|normalno|povišeno|sniženo|kritično|da|ne|\+|\-|pos|neg|norm|elevated|low|high|critical)$'
+        self.unit_pattern = r'(g/dl|mg/dl|μg/dl|ng/ml|pg/ml|U/L|IU/L|mmol/L|μmol/L|%|cells/μL|×10³/μL|×10⁶/μL|mm/h|mg/L|ng/dL|pmol/L|mIU/L|μIU/mL)'
+        self.range_pattern = r'(\d+[,.]?\d*)\s*-\s*(\d+[,.]?\d*)'
+        self._qual_re = re.compile(self.qual_pattern, re.IGNORECASE)
+    
+    def rebuild_matchers(self) -> None:
+        """Rebuild the automata over known_analytes and skip_words"""
+        self._skip_matcher = KeywordMatcher(self.skip_words)
+        self._known_matcher = KeywordMatcher(self.known_analytes)
+    
+    def is_valid_analyte(self, name: str) -> bool:
+        """Check if analyte name is valid"""
+        if not name or len(name.strip()) < 2:
+            return False
+        
+        name_lower = name.lower().strip()
+        
+        # Skip if contains skip words
+        if self._skip_matcher.search(name_lower):
+            return False
+        
+        # Check if contains known analytes
+        if self._known_matcher.search(name_lower):
+            return True
+        
+        # Check if it's a reasonable analyte name (2-3 words, not all numbers)
+        words = name_lower.split()
+        if len(words) <= 3 and all(len(w) > 1 for w in words):
+            if not all(w.isdigit() or len(w) < 3 for w in words):
+                return True
+        
+        return False
+    
+    def parse_value(self, val_str: str) -> Tuple[Optional[float], Optional[str]]:
+        """Parse value string into numeric or qualitative value"""
+        if not val_str:
+            return None, None
+        
+        val_str = val_str.strip()
+        
+        # Check if it's qualitative
+        if self._qual_re.fullmatch(val_str):
+            return None, val_str
+        
+        try:
+            # Try to convert to float
+            val_clean = val_str.replace(",", ".")
+            return float(val_clean), None
+        except:
+            return None, val_str
+    
+    def is_qualitative_result(self, analyte: str, value: str) -> bool:
+        """Check if result is qualitative"""
+        return _QUALITATIVE_MATCHER.search(analyte.lower())
+    
+    def parse_reference(self, ref_str: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """Parse reference range"""
+        if not ref_str:
+            return None, None, None
+        
+        # Try different patterns
+        for pattern in _REF_PATTERNS:
+            match = pattern.search(ref_str)
+            if match:
+                try:
+                    low = float(match.group(1).replace(",", "."))
+                    high = float(match.group(2).replace(",", "."))
+                    unit = match.group(3) if len(match.groups()) > 2 else None
+                    return low, high, unit
+                except:
+                    continue
+        
+        return None, None, None
+    
+    def clean_analyte_name(self, name: str) -> str:
+        """Clean analyte name"""
+        if not name:
+            return ""
+        
+        # Remove extra spaces and clean up
+        name = _WS.sub(' ', name.strip())
+        
+        # Remove common prefixes/suffixes
+        name = _NAME_PREFIX.sub('', name)
+        name = _NAME_SUFFIX.sub('', name)
+        
+        return name.strip()
+    
+    def calculate_status(self, value: float, ref_low: float, ref_high: float) -> str:
+        """Calculate status based on value and reference range"""
+        if value < ref_low:
+            return "Sniženo"
+        elif value > ref_high:
+            return "Povišeno"
+        else:
+            return "Normalno"
+    
+    def parse_line(self, line: str, status: bool = True) -> Optional["ResultV4"]:
+        """Parse a single line for lab results (``status=False`` leaves Status to the column pass)"""
+        return self._parse_line(line, status)[0]
+
+    def _parse_line(self, line: str, status: bool = True) -> Tuple[Optional["ResultV4"], str]:
+        """(row or None, name of the pattern that decided the line) - the name is for lab_reader.profiling"""
+        cells = split_cells(line)
+        if cells is not None:
+            return self.parse_cells(cells, status), "table"
+
+        if not line or len(line.strip()) < 3:
+            return None, "too short"
+        
+        line = line.strip()
+        
+        # Every pattern needs a number - cheap prefilter before the full scan
+        if not _DIGIT.search(line):
+            return None, "no number"
+        
+        # One scan over all patterns; the first matching pattern wins, as before
+        self.pattern_attempts += 1
+        match = _LINE_RE.search(line)
+        if match:
+            i, first, last = _LINE_SLICES[match.lastindex]
+            groups = match.group(*range(first, last + 1))
+            
+            if i == 0:  # Pattern 1: Analyte Value Unit Ref
+                analyte, value, unit, ref_low, ref_high = groups
+                ref_low = float(ref_low.replace(",", "."))
+                ref_high = float(ref_high.replace(",", "."))
+            elif i == 1:  # Pattern 2: Analyte Value Unit
+                analyte, value, unit = groups
+                ref_low, ref_high = None, None
+            elif i == 2:  # Pattern 3: Value Unit Analyte
+                value, unit, analyte = groups
+                ref_low, ref_high = None, None
+            else:  # Pattern 4: Analyte Value
+                analyte, value = groups
+                unit = None
+                ref_low, ref_high = None, None
+            
+            return self._result(analyte, value, unit, ref_low, ref_high, status), _LINE_NAMES[i]
+        
+        return None, "no match"
+
+    def parse_cells(self, cells: Cells, status: bool = True) -> Optional["ResultV4"]:
+        """Table row from lab_reader.layout - columns are already known, no pattern guessing"""
+        ref_low, ref_high, _ = self.parse_reference(cells.ref)
+        return self._result(cells.analyte, cells.value, cells.unit or None, ref_low, ref_high, status)
+
+    def _result(self, analyte: str, value: str, unit: Optional[str],
+                ref_low: Optional[float], ref_high: Optional[float], status: bool = True) -> Optional["ResultV4"]:
+        """Build a result row (None if the analyte is not valid)"""
+        # Clean analyte name
+        analyte = self.clean_analyte_name(analyte)
+        
+        # Validate analyte
+        if not self.is_valid_analyte(analyte):
+            return None
+        
+        # Parse value
+        numeric_value, qual_value = self.parse_value(value)
+        
+        # Handle qualitative results
+        if self.is_qualitative_result(analyte, value):
+            if unit and unit.lower() in ['pozitivno', 'negativno', 'normalno', 'povišeno', 'sniženo']:
+                qual_value = unit
+                unit = None
+        
+        # Calculate status
+        row_status = None
+        if status:
+            if numeric_value is not None and ref_low is not None and ref_high is not None:
+                row_status = self.calculate_status(numeric_value, ref_low, ref_high)
+            elif qual_value:
+                row_status = "Kvalitativno"
+        
+        return ResultV4(
+            analyte, numeric_value if numeric_value is not None else qual_value, unit,
+            ref_low=ref_low, ref_high=ref_high, status=row_status,
+        )
+    
+    def line_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(start, end) of raw lines split on newlines - parse_line strips and skips short ones itself"""
+        start = 0
+        while True:
+            end = text.find('\n', start)
+            if end < 0:
+                yield start, len(text)
+                return
+            yield start, end
+            start = end + 1
+
+    def split_lines(self, text: str) -> Iterator[str]:
+        """Raw lines - parse_line strips and skips short ones itself"""
+        return iter(text.split('\n'))
+
+    def iter_results(self, lines: Iterable[str], status: bool = True) -> Iterator["ResultV4"]:
+        """Yield parsed rows as lines arrive (no deduplication)"""
+        parse_line = profiling.timed_lines(self._parse_line, "v4")
+        for line in lines:
+            result, _ = parse_line(line, status)
+            if result:
+                yield result
+
+    def iter_text(self, text: str, page: int = 0, status: bool = True) -> Iterator["ResultV4"]:
+        """Like iter_results(split_lines(text)), but each row keeps a span into ``text`` instead of a line copy"""
+        parse_line = profiling.timed_lines(self._parse_line, "v4")
+        n = 0
+        try:
+            for n, (start, end) in enumerate(self.line_spans(text), 1):
+                result, _ = parse_line(text[start:end], status)
+                if result:
+                    result.locate(text, start, end, page)
+                    yield result
+        finally:
+            self.line_count += n
+
+    def parse_text(self, text: str) -> "pd.DataFrame":
+        """Parse text and return DataFrame"""
+        import pandas as pd
+
+        if not text:
+            return pd.DataFrame()
+        
+        results = ResultColumns(ResultV4.COLUMNS)
+        results.extend(self.iter_text(text, status=False))
+        if not len(results):
+            return pd.DataFrame()
+        
+        df = results.frame()
+        set_column(df, "Status", _status_column(df["Vrijednost"], df["Ref_low"], df["Ref_high"]))
+        # Enhanced deduplication (reference values first, then units, then alphabetically)
+        return drop_duplicate_analytes(df, self.REF_COLUMNS)
+
+
+def _status_column(values: "pd.Series", ref_low: "pd.Series", ref_high: "pd.Series"):
+    """Status for every row at once (same rules as calculate_status / _result)"""
+    import numpy as np
+    import pandas as pd
+
+    num = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    low = pd.to_numeric(ref_low, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    high = pd.to_numeric(ref_high, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    has_ref = ~np.isnan(num) & ~np.isnan(low) & ~np.isnan(high)
+
+    out = np.full(len(num), None, dtype=object)
+    # Qualitative: a non-empty text value without a numeric reading
+    raw = values.astype(object).to_numpy()
+    out[np.isnan(num) & pd.notna(raw) & (raw != "")] = "Kvalitativno"
+    with np.errstate(invalid="ignore"):
+        out[has_ref] = np.where(num[has_ref] < low[has_ref], "Sniženo",
+                                np.where(num[has_ref] > high[has_ref], "Povišeno", "Normalno"))
+    return out
@@ -0,0 +1,159 @@
+"""Obrada jednog fajla: izvlačenje teksta (native ili OCR, po stranici) i parsiranje - stranicu po stranicu."""
+import glob
+import os
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple, Union
+
+from . import metrics
+from .cache import get_default_cache, make_key
+from .dedup import AnalyteDeduplicator
+from .layout import layout_enabled
+from .ocr import OCR_LANG, extract_text_from_image
+from .parser import LabResultParser
+from .parser_v4 import LabResultParserV4
+from .preprocess import OcrSettings
+from .record import LabResult
+from .routing import Page, document_method, iter_pdf_pages
+from .store import report_lab
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+IMAGE_EXTENSIONS = ["png", "jpg", "jpeg", "tiff", "bmp", "gif"]
+UPLOAD_TYPES = ["pdf"] + IMAGE_EXTENSIONS
+FOLDER_PATTERNS = ["*.pdf", "*.png", "*.jpg", "*.jpeg", "*.tiff", "*.bmp"]
+
+Parser = Union[LabResultParser, LabResultParserV4]
+
+# Povećati kad god se promijeni šta ekstrakcija/OCR vraća - stari unosi u kešu se tada ignorišu
+EXTRACTOR_VERSION = 4
+
+
+def file_extension(name: str) -> str:
+    return name.lower().split('.')[-1] if '.' in name else ''
+
+
+def list_input_files(folder: str) -> List[str]:
+    """Svi PDF-ovi pa slike iz foldera (sortirano po tipu pa po imenu)"""
+    paths = []
+    for pattern in FOLDER_PATTERNS:
+        paths.extend(sorted(glob.glob(os.path.join(folder, pattern))))
+    return paths
+
+
+def extraction_settings(name: str, ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None) -> str:
+    """Sve što utiče na izvučeni tekst, osim samog sadržaja fajla (dio ključa keša)"""
+    ocr_settings = ocr_settings or OcrSettings.from_env()
+    if file_extension(name) != 'pdf':
+        return f"v{EXTRACTOR_VERSION}|image|lang={OCR_LANG}|{ocr_settings.key()}"
+    return f"v{EXTRACTOR_VERSION}|pdf|lang={OCR_LANG}|{ocr_settings.key()}|layout={int(layout_enabled(layout))}"
+
+
+def _iter_pages_uncached(name: str, file_bytes: bytes, ocr_workers: Optional[int], ocr: bool,
+                         on_ocr: Optional[Callable[[], None]], ocr_settings: OcrSettings,
+                         layout: bool) -> Iterator[Page]:
+    if file_extension(name) == 'pdf':
+        yield from iter_pdf_pages(file_bytes, ocr=ocr, ocr_workers=ocr_workers, on_ocr=on_ocr,
+                                  ocr_settings=ocr_settings, layout=layout)
+        return
+    if on_ocr:
+        on_ocr()
+    yield Page(0, extract_text_from_image(file_bytes, ocr_settings), "ocr")
+
+
+def iter_pages(name: str, file_bytes: bytes, ocr_workers: Optional[int] = None, use_cache: bool = True,
+               on_ocr: Optional[Callable[[], None]] = None, ocr: bool = True,
+               ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None) -> Iterator[Page]:
+    """Stranice redom, čim je koja izvučena - za PDF se za svaku stranicu bira native ili OCR (lab_reader.routing)
+
+    Rezultat se čuva u trajnom kešu (lab_reader.cache) tek kad se pročita cijeli
+    dokument; ``on_ocr`` se poziva neposredno prije prvog OCR-a, npr. da UI
+    prikaže poruku. Sa ``ocr=False`` skenirane stranice ostaju bez teksta i
+    dokument se ne upisuje u keš (neki kasniji poziv sa OCR-om hoće), kao ni
+    dokument koji je pdfplumber pročitao samo djelimično (``Page.fallback``).
+    ``ocr_settings`` (podrazumijevano iz okruženja, vidi lab_reader.preprocess)
+    i ``layout`` (tabela iz koordinata riječi, vidi lab_reader.layout) su dio
+    ključa keša.
+    """
+    ocr_settings = ocr_settings or OcrSettings.from_env()
+    layout = layout_enabled(layout)
+    cache = get_default_cache() if use_cache else None
+    if cache is not None:
+        key = make_key(file_bytes, extraction_settings(name, ocr_settings, layout))
+        hit = cache.get(key)
+        metrics.count("cache_hit" if hit is not None else "cache_miss")
+        if hit is not None:
+            for i, (text, method) in enumerate(zip(*hit)):
+                yield Page(i, text, method)
+            return
+
+    texts, methods, fallback = [], [], False
+    for page in _iter_pages_uncached(name, file_bytes, ocr_workers, ocr, on_ocr, ocr_settings, layout):
+        texts.append(page.text)
+        methods.append(page.method)
+        fallback = fallback or page.fallback
+        yield page
+    if cache is not None and "missing" not in methods and not fallback:
+        cache.put(key, texts, methods)
+
+
+def extract_pages(name: str, file_bytes: bytes, ocr_workers: Optional[int] = None, use_cache: bool = True,
+                  on_ocr: Optional[Callable[[], None]] = None, ocr: bool = True,
+                  ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None) -> Tuple[List[str], str]:
+    """Vraća (tekst po stranicama, metod) - vidi iter_pages"""
+    pages = list(iter_pages(name, file_bytes, ocr_workers=ocr_workers, use_cache=use_cache, on_ocr=on_ocr, ocr=ocr,
+                            ocr_settings=ocr_settings, layout=layout))
+    return [p.text for p in pages], document_method([p.method for p in pages])
+
+
+def extract_text(name: str, file_bytes: bytes, ocr_workers: Optional[int] = None, use_cache: bool = True,
+                 on_ocr: Optional[Callable[[], None]] = None,
+                 ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None) -> Tuple[str, str]:
+    """Vraća (tekst, metod) - vidi extract_pages"""
+    pages, method = extract_pages(name, file_bytes, ocr_workers=ocr_workers, use_cache=use_cache, on_ocr=on_ocr,
+                                  ocr_settings=ocr_settings, layout=layout)
+    return "".join(p + "\n" for p in pages), method
+
+
+def iter_page_results(name: str, file_bytes: bytes, parser: Optional[Parser] = None,
+                      ocr_workers: Optional[int] = None, use_cache: bool = True,
+                      on_ocr: Optional[Callable[[], None]] = None, ocr_settings: Optional[OcrSettings] = None,
+                      layout: Optional[bool] = None) -> Iterator[Tuple[Page, List[LabResult]]]:
+    """(stranica, redovi prepoznati na njoj) čim je stranica izvučena - redovi nisu deduplikovani
+
+    Linije se parsiraju po stranicama, pa prvi rezultati stižu nakon prve
+    stranice, a u memoriji je samo tekst tekuće stranice (za deduplikaciju u
+    toku vidi AnalyteDeduplicator).
+    """
+    parser = parser or LabResultParser()
+    methods = []
+    for page in iter_pages(name, file_bytes, ocr_workers=ocr_workers, use_cache=use_cache, on_ocr=on_ocr,
+                           ocr_settings=ocr_settings, layout=layout):
+        m = metrics.current()
+        if m is None:
+            yield page, list(parser.iter_text(page.text, page.number))
+            continue
+        attempts, lines = parser.pattern_attempts, parser.line_count
+        with metrics.stage("parse", page.number):
+            rows = list(parser.iter_text(page.text, page.number))
+        methods.append(page.method)
+        m.info["method"] = document_method(methods)
+        m.page_info(page.number, method=page.method)
+        for counter, n in (("pages", 1), ("lines", parser.line_count - lines),
+                           ("attempts", parser.pattern_attempts - attempts), ("matches", len(rows))):
+            m.count(counter, n, None if counter == "pages" else page.number)
+        if page.number == 0 and "lab" not in m.info:
+            m.info["lab"] = report_lab(page.text)
+        yield page, rows
+
+
+def process_file(name: str, file_bytes: bytes, parser: Optional[Parser] = None,
+                 use_cache: bool = True, ocr_settings: Optional[OcrSettings] = None,
+                 layout: Optional[bool] = None) -> "pd.DataFrame":
+    """Izvlači tekst iz fajla i parsira ga stranicu po stranicu u DataFrame (kolone kao COLUMNS)"""
+    parser = parser or LabResultParser()
+    dedup = AnalyteDeduplicator(parser.REF_COLUMNS)
+    for _, rows in iter_page_results(name, file_bytes, parser, use_cache=use_cache, ocr_settings=ocr_settings,
+                                     layout=layout):
+        dedup.extend(rows)
+    metrics.count("dedup_dropped", dedup.dropped)
+    return dedup.frame(parser.EMPTY_COLUMNS)
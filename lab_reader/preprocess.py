@@ -0,0 +1,162 @@
+"""Priprema slike za OCR: rezolucija po veličini stranice, sivi tonovi, binarizacija, isijecanje.
+
+Stranica PDF-a se renderuje direktno u sive piksele (``get_pixmap`` sa
+``csGRAY``) i PIL slika se pravi iz sirovih uzoraka - bez PNG kodiranja i
+ponovnog dekodiranja. DPI se bira prema fizičkoj veličini stranice: duža
+strana slike je oko ``target_px`` piksela (A4 ≈ 153 DPI), uz granice
+``min_dpi``/``max_dpi``, pa ni sitna stranica ni "stranica" od fotografije
+telefona (nekoliko hiljada tačaka) ne daju ogromnu sliku. Na kraju se slika
+isiječe na oblast sa sadržajem (tabela/tekst bez praznih margina) i po
+želji binarizuje (Otsu prag).
+
+Sivi tonovi i isijecanje ne mijenjaju ono što Tesseract vidi (on i sam
+radi nad sivom slikom), a slika je 3x manja u memoriji i bez praznih
+margina; binarizacija je podrazumijevano isključena jer na lošim
+fotografijama zna da izbriše tanke cifre.
+
+Podešavanja (OcrSettings) su dio ključa keša; iz okruženja:
+``LAB_READER_OCR_DPI`` (``auto`` ili broj), ``LAB_READER_OCR_GRAYSCALE``,
+``LAB_READER_OCR_BINARIZE``, ``LAB_READER_OCR_CROP`` (``1``/``0``).
+"""
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+# Ćelija CROP_CELL x CROP_CELL piksela čiji je prosjek tamniji od ovoga ima sadržaj
+INK_LEVEL = 240
+# Veličina ćelije - usamljene tačkice (prašina sa skenera) ne zatamne cijelu ćeliju
+CROP_CELL = 8
+# Margina oko isječenog sadržaja (u pikselima) - Tesseract loše čita tekst zalijepljen uz ivicu
+CROP_MARGIN = 16
+
+_TRUE = ("1", "true", "yes", "on", "da")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in _TRUE
+
+
+class OcrSettings(NamedTuple):
+    dpi: int = 0  # 0 = automatski prema veličini stranice
+    target_px: int = 1800  # ciljana duža strana renderovane stranice (auto DPI)
+    min_dpi: int = 72
+    max_dpi: int = 300
+    grayscale: bool = True
+    binarize: bool = False
+    crop: bool = True
+    max_image_px: int = 3000  # fotografije veće od ovoga se umanjuju
+
+    @classmethod
+    def from_env(cls) -> "OcrSettings":
+        dpi = os.environ.get("LAB_READER_OCR_DPI", "auto").strip().lower()
+        return cls(
+            dpi=0 if dpi in ("", "auto", "0") else int(dpi),
+            grayscale=_env_flag("LAB_READER_OCR_GRAYSCALE", True),
+            binarize=_env_flag("LAB_READER_OCR_BINARIZE", False),
+            crop=_env_flag("LAB_READER_OCR_CROP", True),
+        )
+
+    def key(self) -> str:
+        """Kratak opis podešavanja za ključ keša"""
+        dpi = str(self.dpi) if self.dpi else f"auto{self.target_px}/{self.min_dpi}-{self.max_dpi}"
+        return (f"dpi={dpi}|gray={int(self.grayscale)}|bin={int(self.binarize)}"
+                f"|crop={int(self.crop)}|max={self.max_image_px}")
+
+
+def page_dpi(width_pt: float, height_pt: float, settings: OcrSettings) -> int:
+    """DPI za stranicu datih dimenzija (u tačkama, 72 po inču)"""
+    if settings.dpi:
+        return settings.dpi
+    longest_in = max(width_pt, height_pt) / 72.0
+    if longest_in <= 0:
+        return settings.max_dpi
+    return max(settings.min_dpi, min(settings.max_dpi, int(settings.target_px / longest_in)))
+
+
+def render_page(page, settings: Optional[OcrSettings] = None):
+    """PyMuPDF stranica -> PIL slika spremna za OCR"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    settings = settings or OcrSettings()
+    dpi = page_dpi(page.rect.width, page.rect.height, settings)
+    colorspace = fitz.csGRAY if settings.grayscale else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+    return _finish(image, settings)
+
+
+def prepare_image(image, settings: Optional[OcrSettings] = None):
+    """Slika (fotografija/sken) -> PIL slika spremna za OCR"""
+    from PIL import Image
+
+    settings = settings or OcrSettings()
+    mode = "L" if settings.grayscale else "RGB"
+    limit = settings.max_image_px
+    if limit and max(image.size) > limit:
+        # JPEG se dekodira odmah u manjoj razmjeri (DCT), ostalo se umanjuje poslije
+        image.draft(mode, (limit, limit))
+    if image.mode != mode:
+        image = image.convert(mode)
+    if limit and max(image.size) > limit:
+        image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+    return _finish(image, settings)
+
+
+def _finish(image, settings: OcrSettings):
+    if settings.crop:
+        box = content_bbox(image)
+        if box is not None:
+            image = image.crop(box)
+    if settings.binarize:
+        gray = image if image.mode == "L" else image.convert("L")
+        t = otsu_threshold(gray.histogram())
+        image = gray.point([0 if v <= t else 255 for v in range(256)])
+    return image
+
+
+def content_bbox(image) -> Optional[Tuple[int, int, int, int]]:
+    """Oblast sa sadržajem (bez praznih margina) ili None ako je isijecanje nepotrebno"""
+    gray = image if image.mode == "L" else image.convert("L")
+    w, h = gray.size
+    if w < 2 * CROP_CELL or h < 2 * CROP_CELL:
+        return None
+    # Prosjek po ćelijama: ćelija sa par tamnih piksela (šum) ostaje svijetla, redovi teksta ne
+    cells = gray.reduce(CROP_CELL)
+    bbox = cells.point([255 if v < INK_LEVEL else 0 for v in range(256)]).getbbox()
+    if bbox is None:
+        return None
+    x0, y0, x1, y1 = bbox
+    box = (max(0, x0 * CROP_CELL - CROP_MARGIN), max(0, y0 * CROP_CELL - CROP_MARGIN),
+           min(w, x1 * CROP_CELL + CROP_MARGIN), min(h, y1 * CROP_CELL + CROP_MARGIN))
+    if box == (0, 0, w, h):
+        return None
+    return box
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Otsu prag nad histogramom sive slike (256 vrijednosti)"""
+    hist = histogram[:256]
+    total = sum(hist)
+    if not total:
+        return 127
+    sum_all = sum(i * c for i, c in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best_t, best_var = 127, -1.0
+    for t, count in enumerate(hist):
+        weight_bg += count
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += t * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best_t, best_var = t, var
+    return best_t
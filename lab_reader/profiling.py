@@ -0,0 +1,217 @@
+"""Profilisanje obrade (izvlačenje, OCR, parsiranje) i vrijeme po formatu linije / stavci kataloga.
+
+Dva načina (MODES): ``cprofile`` - deterministički cProfile samo za nit koja
+obrađuje fajlove, izlaz je pstats fajl (``<prefiks>.prof``, za ``python -m
+pstats``, snakeviz, flameprof); ``sample`` - uzorkovanje steka svih niti
+(uključujući OCR niti) svakih ``interval`` sekundi, izlaz su složeni stekovi
+(``<prefiks>.folded``, format za flamegraph.pl i speedscope). Uzorkovanje
+skoro ne usporava obradu, cProfile je precizniji za kratke funkcije.
+
+Profiler kaže samo da vrijeme ide u ``parse_line`` ili ``targeted_parse``, pa
+se uz njega mjeri i vrijeme po formatu linije parsera (v3, v4) i po stavci
+ANALYTE_CATALOG-a (ciljani parser) - ``<prefiks>.patterns.json``. Tabela je u
+ContextVar-u kao i lab_reader.metrics; bez ``profile()`` parseri rade bez
+mjerenja (jedno čitanje ContextVar-a po stranici).
+
+``lab-reader batch folder/ -o izlaz.csv --profile spor-lab``
+"""
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+MODES = ("cprofile", "sample")
+DEFAULT_INTERVAL = 0.005
+
+
+class PatternTimes:
+    """Vrijeme, pozivi i prepoznati redovi po formatu linije ili stavci kataloga (``parser:ime``)"""
+
+    def __init__(self):
+        self._rows: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, seconds: float, matches: int = 0, calls: int = 1) -> None:
+        with self._lock:
+            row = self._rows.setdefault(key, [0, 0, 0.0])
+            row[0] += calls
+            row[1] += matches
+            row[2] += seconds
+
+    def to_rows(self) -> List[Dict]:
+        """Najskuplji prvi"""
+        with self._lock:
+            items = sorted(self._rows.items(), key=lambda kv: -kv[1][2])
+        return [{"pattern": key, "calls": calls, "matches": matches, "seconds": round(seconds, 6)}
+                for key, (calls, matches, seconds) in items]
+
+
+_patterns: ContextVar[Optional[PatternTimes]] = ContextVar("lab_reader_patterns", default=None)
+
+
+def pattern_table() -> Optional[PatternTimes]:
+    return _patterns.get()
+
+
+def timed_lines(parse_line: Callable, prefix: str) -> Callable:
+    """``parse_line`` koji vraća (red, ime formata) i upisuje vrijeme linije pod tim formatom (bez profilisanja isti)"""
+    table = _patterns.get()
+    if table is None:
+        return parse_line
+
+    def timed(line: str, status: bool = True):
+        start = time.perf_counter()
+        result, pattern = parse_line(line, status)
+        table.add(f"{prefix}:{pattern}", time.perf_counter() - start, 1 if result else 0)
+        return result, pattern
+
+    return timed
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Uzorkuje stek svih niti procesa na posebnoj niti; broji složene stekove (root;...;list)"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="lab-reader-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class Profile:
+    """Jedno profilisano pokretanje: cProfile ili uzorkovanje + vrijeme po formatu/stavci kataloga"""
+
+    def __init__(self, mode: str = "cprofile", interval: float = DEFAULT_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Nepoznat način profilisanja: {mode}")
+        self.mode = mode
+        self.patterns = PatternTimes()
+        self.seconds = 0.0
+        self._profiler = cProfile.Profile() if mode == "cprofile" else None
+        self._sampler = StackSampler(interval) if mode == "sample" else None
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        else:
+            self._sampler.start()
+
+    def stop(self) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+        else:
+            self._sampler.stop()
+        self.seconds = time.perf_counter() - self._started
+
+    @property
+    def suffix(self) -> str:
+        return ".prof" if self.mode == "cprofile" else ".folded"
+
+    def dump(self) -> bytes:
+        """Sadržaj izlaza profilera (pstats ili složeni stekovi)"""
+        if self._profiler is None:
+            return self._sampler.folded().encode("utf-8")
+        self._profiler.create_stats()  # isto što i dump_stats, ali u memoriji (preuzimanje u UI-ju)
+        return marshal.dumps(self._profiler.stats)
+
+    def write(self, prefix: str) -> List[str]:
+        """Upisuje ``<prefix>.prof``/``.folded`` i ``<prefix>.patterns.json``; vraća putanje"""
+        folder = os.path.dirname(prefix)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        paths = [prefix + self.suffix, prefix + ".patterns.json"]
+        with open(paths[0], "wb") as fh:
+            fh.write(self.dump())
+        with open(paths[1], "w", encoding="utf-8") as fh:
+            json.dump(self.report(), fh, ensure_ascii=False, indent=2)
+        return paths
+
+    def report(self) -> Dict:
+        """Sadržaj ``<prefix>.patterns.json``"""
+        return {"mode": self.mode, "seconds": round(self.seconds, 6), "patterns": self.patterns.to_rows()}
+
+    def summary(self, limit: int = 15) -> str:
+        """Kratak pregled za terminal/UI: najskuplje funkcije i najskuplji formati/stavke kataloga"""
+        out = io.StringIO()
+        if self._profiler is not None:
+            stats = pstats.Stats(self._profiler, stream=out)
+            stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        else:
+            total = sum(self._sampler.stacks.values()) or 1
+            leaves = Counter()
+            for stack, n in self._sampler.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += n
+            out.write(f"{total} uzoraka, najčešće na vrhu steka:\n")
+            for leaf, n in leaves.most_common(limit):
+                out.write(f"{100 * n / total:6.1f}%  {leaf}\n")
+        rows = self.patterns.to_rows()
+        if rows:
+            out.write(f"\n{'ms':>10}{'poziva':>9}{'redova':>8}  format / stavka kataloga\n")
+            for r in rows[:limit]:
+                out.write(f"{r['seconds'] * 1000:>10.1f}{r['calls']:>9}{r['matches']:>8}  {r['pattern']}\n")
+        return out.getvalue()
+
+
+@contextmanager
+def profile(mode: str = "cprofile", interval: float = DEFAULT_INTERVAL) -> Iterator[Profile]:
+    """Profilisanje bloka; parseri unutar bloka mjere vrijeme po formatu linije / stavci kataloga"""
+    prof = Profile(mode, interval)
+    token = _patterns.set(prof.patterns)
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _patterns.reset(token)
+
+
+def default_prefix() -> str:
+    return time.strftime("lab-reader-profile-%Y%m%d-%H%M%S")
+
+
+def ui_enabled(query_flag: Optional[str] = None) -> bool:
+    """Prekidač u UI-ju je skriven: vidi se sa ``?profile=1`` u URL-u ili LAB_READER_PROFILE=1"""
+    return bool(query_flag) or os.environ.get("LAB_READER_PROFILE", "0") not in ("", "0")
@@ -0,0 +1,113 @@
+"""Prepoznati red nalaza kao mali zapis sa ``__slots__`` umjesto rječnika od 12 ključeva.
+
+Zapis nema ``__dict__``, naziv analita i jedinica su internovani (isti
+string za sve redove istog analita), a linija izvora se ne kopira: čuva se
+referenca na tekst stranice i početak/kraj linije u njemu (``page``,
+``start``, ``end``), a kolona Linija se pravi tek kad zatreba. U DataFrame
+se pretvara tek na izlazu (lab_reader.frame.ResultColumns).
+
+Zapis se čita i po nazivu kolone (``row["Analit"]``, ``row.get("Jedinica")``),
+pa kod koji je radio sa rječnicima radi i dalje.
+"""
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+from .layout import split_cells
+
+# Kolona u DataFrame-u -> atribut zapisa
+COLUMN_FIELDS = {
+    "Analit": "analyte", "Tip": "typ", "Vrijednost": "value", "Jedinica": "unit",
+    "Ref_low": "ref_low", "Ref_high": "ref_high", "Ref_tip": "ref_type", "Ref_kval": "qual_ref",
+    "Flag": "flag", "Status": "status", "Izvor": "source", "Linija": "line",
+}
+
+
+def line_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """(početak, kraj) svake linije teksta, bez znaka za novi red - iste linije kao ``text.splitlines()``"""
+    pos = 0
+    for chunk in text.splitlines(True):
+        line = chunk.splitlines()[0]
+        yield pos, pos + len(line)
+        pos += len(chunk)
+
+
+def strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Raspon bez bjelina na početku i kraju (kao ``text[start:end].strip()``)"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class LabResult:
+    """Jedan prepoznati red; kolone kao lab_reader.parser.COLUMNS"""
+
+    __slots__ = ("analyte", "typ", "value", "unit", "ref_low", "ref_high", "ref_type", "qual_ref",
+                 "flag", "status", "source", "page", "text", "start", "end")
+
+    COLUMNS: List[str] = list(COLUMN_FIELDS)
+
+    def __init__(self, analyte: str, value, unit: Optional[str] = "", *, typ: str = "",
+                 ref_low: Optional[float] = None, ref_high: Optional[float] = None,
+                 ref_type: Optional[str] = None, qual_ref: Optional[str] = None,
+                 flag: str = "", status: Optional[str] = None, source: str = "",
+                 text: str = "", start: int = 0, end: Optional[int] = None, page: int = 0):
+        self.analyte = sys.intern(analyte)
+        self.typ = typ
+        self.value = value
+        self.unit = sys.intern(unit) if unit else unit
+        self.ref_low = ref_low
+        self.ref_high = ref_high
+        self.ref_type = ref_type
+        self.qual_ref = qual_ref
+        self.flag = flag
+        self.status = status
+        self.source = source
+        self.locate(text, start, len(text) if end is None else end, page)
+
+    def locate(self, text: str, start: int, end: int, page: int = 0) -> None:
+        """Linija izvora je ``text[start:end]`` (text je obično cijela stranica - dijeli se, ne kopira)"""
+        self.text = text
+        self.start = start
+        self.end = end
+        self.page = page
+
+    @property
+    def line(self) -> str:
+        """Linija iz koje je red prepoznat (kolona Linija); red tabele iz layout-a kao običan tekst"""
+        line = self.text[self.start:self.end]
+        cells = split_cells(line)
+        return cells.text() if cells is not None else line
+
+    # Pristup po nazivu kolone (kao kod rječnika)
+    def keys(self) -> List[str]:
+        return self.COLUMNS
+
+    def __iter__(self):
+        return iter(self.COLUMNS)
+
+    def __len__(self) -> int:
+        return len(self.COLUMNS)
+
+    def __getitem__(self, column: str):
+        try:
+            return getattr(self, COLUMN_FIELDS[column])
+        except KeyError:
+            raise KeyError(column) from None
+
+    def __setitem__(self, column: str, value) -> None:
+        setattr(self, COLUMN_FIELDS[column], value)
+
+    def get(self, column: str, default=None):
+        field = COLUMN_FIELDS.get(column)
+        return getattr(self, field) if field is not None else default
+
+    def values(self, columns: Optional[List[str]] = None) -> list:
+        return [getattr(self, COLUMN_FIELDS[c]) for c in (columns or self.COLUMNS)]
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.COLUMNS, self.values()))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
@@ -0,0 +1,201 @@
+"""Odluka native-vs-OCR za svaku stranicu PDF-a posebno.
+
+PDF se otvara jednom (pdfplumber): za svaku stranicu se izvuče tekst i
+izmjeri koliko stranice pokrivaju slike. Stranica bez teksta, ili sa par
+znakova preko skenirane slike (npr. samo broj strane), ide na OCR; ostale
+zadržavaju native tekst. PyMuPDF se otvara tek ako neka stranica treba OCR i
+služi samo za renderovanje tih stranica, pa miješani PDF (tekstualne
+stranice + skenirani prilog) ne gubi skenirani dio, a tekstualni PDF nikad
+ne ide kroz drugu biblioteku.
+
+Ako pdfplumber ne može da pročita PDF (greška parsiranja iz pdfminer-a),
+ostatak dokumenta ide preko PyPDF2; takve stranice su označene ``fallback``
+i dokument se ne upisuje u keš.
+"""
+import io
+import logging
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import metrics
+from .extract import iter_pdf_pages_native, _pypdf2_pages
+from .layout import LayoutExtractor, layout_enabled
+from .ocr import TesseractNotFoundError, _render_page, configure_tesseract, iter_ocr_ordered, iter_pages_from_pdf_with_ocr
+from .preprocess import OcrSettings
+
+# Stranica sa manje znakova od ovoga, a pokrivena slikom bar MIN_IMAGE_COVERAGE, smatra se skenom
+MIN_NATIVE_CHARS = 30
+MIN_IMAGE_COVERAGE = 0.5
+
+log = logging.getLogger(__name__)
+
+
+class Page(NamedTuple):
+    number: int  # od 0
+    text: str
+    method: str  # "native", "ocr" ili "missing" (sken bez OCR-a, ili stranica koju ni PyPDF2 ne čita)
+    fallback: bool = False  # tekst preko PyPDF2 jer pdfplumber nije uspio - ne ide u keš
+
+
+def pdf_errors() -> Tuple[type, ...]:
+    """Greške parsiranja PDF-a (pdfminer; pdfplumber >= 0.11 ih pri otvaranju pakuje u svoje)"""
+    from pdfminer.psparser import PSException
+
+    try:
+        from pdfplumber.utils.exceptions import MalformedPDFException, PdfminerException
+    except ImportError:
+        return (PSException,)
+    return (PSException, MalformedPDFException, PdfminerException)
+
+
+def pypdf2_errors() -> Tuple[type, ...]:
+    """Greške čitanja PDF-a iz PyPDF2 (sve nasljeđuju PyPdfError)"""
+    from PyPDF2.errors import PyPdfError
+
+    return (PyPdfError,)
+
+
+def image_coverage(page) -> float:
+    """Udio površine stranice pokriven slikama (pdfplumber stranica, 0-1)"""
+    x0, top, x1, bottom = page.bbox
+    area = (x1 - x0) * (bottom - top)
+    if area <= 0:
+        return 0.0
+    covered = 0.0
+    for img in page.images:
+        w = min(img["x1"], x1) - max(img["x0"], x0)
+        h = min(img["bottom"], bottom) - max(img["top"], top)
+        if w > 0 and h > 0:
+            covered += w * h
+    return min(1.0, covered / area)
+
+
+def needs_ocr(text: str, coverage: float, has_graphics: bool) -> bool:
+    """Da li stranicu treba OCR-ovati umjesto da se koristi native tekst"""
+    chars = len("".join(text.split()))
+    if not chars:
+        return has_graphics  # potpuno prazna stranica nema šta da se OCR-uje
+    return chars < MIN_NATIVE_CHARS and coverage >= MIN_IMAGE_COVERAGE
+
+
+def document_method(methods: List[str]) -> str:
+    """Metod za cijeli dokument: native, ocr ili mixed"""
+    kinds = set(methods) - {"missing"}
+    if len(kinds) > 1:
+        return "mixed"
+    return kinds.pop() if kinds else "native"
+
+
+def iter_pdf_pages(file_bytes: bytes, ocr: bool = True, ocr_workers: Optional[int] = None,
+                   on_ocr: Optional[Callable[[], None]] = None,
+                   ocr_settings: Optional[OcrSettings] = None, layout: Optional[bool] = None) -> Iterator[Page]:
+    """Stranice PDF-a redom, svaka native ili preko OCR-a - vidi opis modula
+
+    Sa ``ocr=False`` (ili bez Tesseract-a) stranice koje bi trebale OCR
+    zadržavaju native tekst; ako tada nijedna stranica nema teksta, baca se
+    TesseractNotFoundError kao i ranije za skenirane PDF-ove. ``ocr_settings``
+    određuje renderovanje stranica za OCR (lab_reader.preprocess), a ``layout``
+    da li se tabela rezultata čita iz koordinata riječi (lab_reader.layout).
+    """
+    try:
+        import pdfplumber
+    except ImportError:
+        yield from _iter_pdf_pages_fallback(file_bytes, ocr, ocr_workers, on_ocr, ocr_settings)
+        return
+    errors = pdf_errors()
+    try:
+        pdf = pdfplumber.open(io.BytesIO(file_bytes))
+    except errors:
+        log.warning("pdfplumber ne može da otvori PDF - tekst preko PyPDF2", exc_info=True)
+        yield from _iter_pdf_pages_fallback(file_bytes, ocr, ocr_workers, on_ocr, ocr_settings)
+        return
+
+    tables = LayoutExtractor() if layout_enabled(layout) else None
+    state = {"fitz_doc": None, "ocr_error": None, "ocr_started": False, "done": 0, "failed": False}
+
+    def render(page_num: int):
+        with metrics.stage("ocr_render", page_num):
+            if state["fitz_doc"] is None:
+                import fitz  # PyMuPDF
+                state["fitz_doc"] = fitz.open(stream=file_bytes, filetype="pdf")
+            return _render_page(state["fitz_doc"].load_page(page_num), ocr_settings)
+
+    def ocr_available() -> bool:
+        if not ocr or state["ocr_error"] is not None:
+            return False
+        if not state["ocr_started"]:
+            try:
+                configure_tesseract()
+            except (TesseractNotFoundError, ImportError) as e:
+                state["ocr_error"] = e
+                return False
+            state["ocr_started"] = True
+            if on_ocr:
+                on_ocr()
+        return True
+
+    def jobs():
+        try:
+            for page in pdf.pages:
+                page_num = state["done"]
+                start = time.perf_counter()
+                text = tables.page_text(page) if tables is not None else (page.extract_text() or "")
+                scanned = needs_ocr(text, image_coverage(page), bool(page.images or page.curves or page.rects))
+                page.close()  # oslobađa keš stranice - u memoriji je samo tekuća stranica
+                metrics.add("extract", time.perf_counter() - start, page_num)
+                state["done"] += 1
+                if not scanned:
+                    yield (page_num, "native"), text
+                elif ocr_available():
+                    yield (page_num, "ocr"), lambda n=page_num: render(n)
+                else:
+                    yield (page_num, "missing"), text
+        except errors:
+            log.warning("pdfplumber je pukao na stranici %d - ostatak preko PyPDF2", state["done"] + 1, exc_info=True)
+            state["failed"] = True  # ostatak ide preko PyPDF2 (vidi ispod)
+
+    any_text = False
+    try:
+        recognized = lambda tag, seconds: metrics.add("ocr", seconds, tag[0])
+        for (page_num, method), text in iter_ocr_ordered(jobs(), workers=ocr_workers, on_recognized=recognized):
+            any_text = any_text or bool(text.strip())
+            yield Page(page_num, text, method)
+    finally:
+        pdf.close()
+        if state["fitz_doc"] is not None:
+            state["fitz_doc"].close()
+
+    if state["failed"]:
+        if not state["done"]:
+            yield from _iter_pdf_pages_fallback(file_bytes, ocr, ocr_workers, on_ocr, ocr_settings)
+            return
+        # pdfplumber je pukao usred dokumenta - ostatak native preko PyPDF2
+        page_num = state["done"]
+        try:
+            for text in _pypdf2_pages(file_bytes, page_num):
+                any_text = any_text or bool(text.strip())
+                yield Page(page_num, text, "native", fallback=True)
+                page_num += 1
+        except pypdf2_errors():
+            # Ni PyPDF2 ne može dalje - stranica ostaje bez teksta, a dokument se ne upisuje u keš
+            log.warning("ni PyPDF2 ne može da pročita stranicu %d", page_num + 1, exc_info=True)
+            yield Page(page_num, "", "missing", fallback=True)
+
+    if not any_text and state["ocr_error"] is not None:
+        raise state["ocr_error"]
+
+
+def _iter_pdf_pages_fallback(file_bytes: bytes, ocr: bool, ocr_workers: Optional[int],
+                             on_ocr: Optional[Callable[[], None]],
+                             ocr_settings: Optional[OcrSettings]) -> Iterator[Page]:
+    """Kad pdfplumber ne može da otvori PDF: PyPDF2 tekst, pa OCR cijelog dokumenta ako teksta nema"""
+    found = False
+    for i, text in enumerate(iter_pdf_pages_native(file_bytes)):
+        found = True
+        yield Page(i, text, "native", fallback=True)
+    if found or not ocr:
+        return
+    if on_ocr:
+        on_ocr()
+    for i, text in enumerate(iter_pages_from_pdf_with_ocr(file_bytes, workers=ocr_workers, settings=ocr_settings)):
+        yield Page(i, text, "ocr", fallback=True)
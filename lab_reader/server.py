@@ -0,0 +1,297 @@
+"""Lokalni HTTP servis za ekstrakciju - za sisteme koji nalaze šalju programski (bez UI-ja).
+
+``POST /extract`` - tijelo zahtjeva je PDF ili slika (sirovi bajtovi), odgovor
+je JSON sa redovima u istoj šemi kao CSV izlaz (kolone parsera). Tip fajla se
+uzima iz ``?name=nalaz.pdf``, pa iz ``Content-Type``, pa iz prvih bajtova;
+parser iz ``?parser=v3|v4`` (podrazumijevano v3). ``GET /health`` - stanje
+servisa.
+
+Obradu rade radni procesi napravljeni i zagrijani pri pokretanju (parseri,
+PyMuPDF, pronalaženje Tesseract-a), pa prvi zahtjev ne plaća uvoz biblioteka.
+Istovremeno se obrađuje najviše ``max_concurrent`` fajlova; zahtjev koji ne
+dobije mjesto za ``queue_wait`` sekundi dobija 503. Zahtjev duži od
+``timeout`` sekundi dobija 504, a fajl se ipak završi u pozadini i izvučeni
+tekst ostaje u trajnom kešu (lab_reader.cache, isti kao za UI i CLI), pa je
+ponovljeni zahtjev brz. Mjesto se oslobađa tek kad radni proces završi, pa
+ograničenje važi i za takve fajlove.
+
+Servis sluša samo na localhost-u (podrazumijevano) i ne treba ništa osim
+ovog paketa:
+
+``lab-reader serve --port 8765 -j 4``
+
+``curl --data-binary @nalaz.pdf -H 'Content-Type: application/pdf' localhost:8765/extract``
+"""
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .pipeline import IMAGE_EXTENSIONS, file_extension
+from .preprocess import OcrSettings
+from .utils import default_workers
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_QUEUE_WAIT = 10.0
+DEFAULT_MAX_MB = 50
+WARM_UP_TIMEOUT = 120.0  # najduže čekanje da se svi radni procesi zagriju
+PARSERS = ("v3", "v4")
+
+_CONTENT_TYPES = {
+    "application/pdf": "pdf", "image/png": "png", "image/jpeg": "jpg", "image/jpg": "jpg",
+    "image/tiff": "tiff", "image/bmp": "bmp", "image/gif": "gif",
+}
+_MAGIC = [(b"%PDF", "pdf"), (b"\x89PNG", "png"), (b"\xff\xd8", "jpg"), (b"II*\x00", "tiff"),
+          (b"MM\x00*", "tiff"), (b"BM", "bmp"), (b"GIF8", "gif")]
+
+_parsers: Dict[str, object] = {}  # parser po radnom procesu, pravi se jednom (kao u lab_reader.batch)
+
+
+def _worker_parser(name: str):
+    from .jobs import _make_parser
+
+    if name not in _parsers:
+        _parsers[name] = _make_parser(name)
+    return _parsers[name]
+
+
+def _warm_up(ready) -> None:
+    """Initializer radnog procesa: mali sintetički PDF kroz cijeli put (bez keša) i OCR engine
+
+    Po završetku javlja ``{"pid", "ocr"}`` u red ``ready`` - start() čeka sve procese.
+    """
+    from .corpus import generate_report, to_pdf
+    from .ocr import TesseractNotFoundError, configure_tesseract
+
+    ocr = ""
+    try:
+        try:
+            pdf = to_pdf(generate_report("state", 5))
+        except ImportError:  # bez PyMuPDF-a - bar parseri i pandas
+            for name in PARSERS:
+                _worker_parser(name).parse_text("Glukoza 5.1 mmol/L 3.9-5.9")
+        else:
+            for name in PARSERS:
+                extract_bytes("warm-up.pdf", pdf, name, use_cache=False)
+        try:
+            ocr = configure_tesseract()
+        except (TesseractNotFoundError, ImportError) as e:
+            ocr = f"nedostupan: {e or type(e).__name__}"
+    finally:
+        ready.put({"pid": os.getpid(), "ocr": ocr})
+
+
+def extract_bytes(name: str, data: bytes, parser_name: str = "v3",
+                  ocr_settings: Optional[OcrSettings] = None, use_cache: bool = True) -> Dict:
+    """Obrađuje jedan fajl u radnom procesu; vraća rječnik spreman za JSON (``error`` ako nije uspjelo)"""
+    from .dedup import AnalyteDeduplicator
+    from .ocr import TesseractNotFoundError
+    from .pipeline import iter_page_results
+    from .routing import document_method
+
+    start = time.perf_counter()
+    parser = _worker_parser(parser_name)
+    dedup = AnalyteDeduplicator(parser.REF_COLUMNS)
+    methods, text_found = [], False
+    out = {"file": name, "parser": parser_name}
+    try:
+        # Paralelizam je po zahtjevima (radni procesi) - OCR stranica unutar procesa ide na jednoj niti
+        for page, rows in iter_page_results(name, data, parser, ocr_workers=1, use_cache=use_cache,
+                                            ocr_settings=ocr_settings):
+            methods.append(page.method)
+            text_found = text_found or bool(page.text.strip())
+            dedup.extend(rows)
+    except TesseractNotFoundError as e:
+        out["error"] = str(e)
+    except ImportError as e:
+        out["error"] = f"OCR biblioteke nisu instalirane: {e}"
+    except Exception as e:
+        out["error"] = str(e) or type(e).__name__
+    else:
+        if not text_found:
+            out["error"] = "Nije moguće izvući tekst."
+    if methods:
+        out["method"] = document_method(methods)
+    out["pages"] = len(methods)
+    if "error" not in out:
+        frame = dedup.frame(parser.EMPTY_COLUMNS)
+        out["rows"] = json.loads(frame.to_json(orient="records", force_ascii=False))
+    out["seconds"] = round(time.perf_counter() - start, 6)
+    return out
+
+
+def detect_name(data: bytes, name: str = "", content_type: str = "") -> Optional[str]:
+    """Ime fajla sa poznatom ekstenzijom (po njoj pipeline bira PDF ili OCR slike); None za nepoznat tip"""
+    if name and file_extension(name) in ["pdf"] + IMAGE_EXTENSIONS:
+        return name
+    ext = _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    if ext is None:
+        ext = next((e for magic, e in _MAGIC if data.startswith(magic)), None)
+    if ext is None:
+        return None
+    return f"{os.path.splitext(name)[0] or 'upload'}.{ext}"
+
+
+class ExtractionService:
+    """Zagrijani radni procesi + ograničenje istovremenih zahtjeva i vremena po zahtjevu"""
+
+    def __init__(self, workers: Optional[int] = None, max_concurrent: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT, queue_wait: float = DEFAULT_QUEUE_WAIT,
+                 max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, ocr_settings: Optional[OcrSettings] = None):
+        self.workers = workers or default_workers()
+        self.max_concurrent = max_concurrent or self.workers
+        self.timeout = timeout
+        self.queue_wait = queue_wait
+        self.max_bytes = max_bytes
+        self.ocr_settings = ocr_settings
+        self.ocr = ""
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self, warm_up_timeout: float = WARM_UP_TIMEOUT) -> None:
+        """Pravi radne procese i čeka da se svi zagriju
+
+        RuntimeError ako neki proces pukne ili se svi ne jave za ``warm_up_timeout`` sekundi.
+        """
+        ctx = multiprocessing.get_context()
+        ready = ctx.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                         initializer=_warm_up, initargs=(ready,))
+        # Procesi se prave tek uz zadatke - po jedan prazan zadatak za svaki, pa se čeka svaki initializer
+        spawned = [self._pool.submit(os.getpid) for _ in range(self.workers)]
+        deadline = time.monotonic() + warm_up_timeout
+        warm = []
+        while len(warm) < self.workers:
+            # Pao initializer ili proces (BrokenProcessPool) - ne čeka se do isteka vremena
+            failed = next((f.exception() for f in spawned if f.done() and f.exception() is not None), None)
+            left = deadline - time.monotonic()
+            if failed is not None or left <= 0:
+                self.close()
+                reason = f"radni proces je pao ({failed})" if failed is not None else \
+                    f"nisu se zagrijali za {warm_up_timeout:g} s"
+                raise RuntimeError(f"Servis nije pokrenut: {reason}, spremno {len(warm)}/{self.workers}.") from failed
+            try:
+                warm.append(ready.get(timeout=min(left, 1.0)))
+            except queue.Empty:
+                pass
+        self.ocr = warm[0]["ocr"]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._busy -= 1
+        self._slots.release()
+
+    def extract(self, name: str, data: bytes, parser_name: str = "v3") -> Tuple[int, Dict]:
+        """(HTTP status, JSON odgovor) za jedan fajl"""
+        if not self._slots.acquire(timeout=self.queue_wait):
+            return 503, {"error": f"Servis je zauzet ({self.max_concurrent} zahtjeva u obradi)."}
+        with self._lock:
+            self._busy += 1
+        try:
+            future = self._pool.submit(extract_bytes, name, data, parser_name, self.ocr_settings)
+        except Exception:
+            self._release()
+            raise
+        # Mjesto se oslobađa kad radni proces završi, i kad je zahtjev već dobio 504
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            return 504, {"file": name, "error": f"Obrada traje duže od {self.timeout:g} s."}
+        return (422 if "error" in result else 200), result
+
+    def health(self) -> Dict:
+        with self._lock:
+            busy = self._busy
+        return {"status": "ok", "workers": self.workers, "max_concurrent": self.max_concurrent, "busy": busy,
+                "timeout": self.timeout, "ocr": self.ocr, "parsers": list(PARSERS)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "lab-reader"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> ExtractionService:
+        return self.server.service
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path == "/health":
+            self._send_json(200, self.service.health())
+        else:
+            self._send_json(404, {"error": "Nepoznata putanja (POST /extract, GET /health)."})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/extract":
+            self._send_json(404, {"error": "Nepoznata putanja (POST /extract, GET /health)."})
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            self._send_json(411, {"error": "Nedostaje Content-Length."})
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": "Neispravan Content-Length."})
+            return
+        if length > self.service.max_bytes:
+            self.close_connection = True  # tijelo se ne čita
+            self._send_json(413, {"error": f"Fajl je veći od {self.service.max_bytes // (1024 * 1024)} MB."})
+            return
+        data = self.rfile.read(length)
+        if not data:
+            self._send_json(400, {"error": "Prazno tijelo zahtjeva - pošalji PDF ili sliku."})
+            return
+        query = parse_qs(url.query)
+        parser_name = query.get("parser", ["v3"])[0]
+        if parser_name not in PARSERS:
+            self._send_json(400, {"error": f"Nepoznat parser: {parser_name} ({', '.join(PARSERS)})."})
+            return
+        name = detect_name(data, os.path.basename(query.get("name", [""])[0]), self.headers.get("Content-Type", ""))
+        if name is None:
+            self._send_json(415, {"error": "Nepoznat tip fajla - podržani su PDF i slike."})
+            return
+        status, body = self.service.extract(name, data, parser_name)
+        self._send_json(status, body)
+
+    def log_message(self, format: str, *args) -> None:
+        sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+def make_server(service: ExtractionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """HTTP server nad servisom (servis mora biti pokrenut - ``service.start()``)"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
@@ -0,0 +1,49 @@
+"""Rezultati obrade po fajlu koji preživljavaju ponovno pokretanje UI skripte.
+
+Streamlit ponovo izvršava cijelu skriptu na svaku promjenu widget-a (checkbox,
+preview, ...), pa bi se bez ovoga svi učitani fajlovi ponovo čitali, OCR-ovali
+i parsirali. Rezultat (tekst, DataFrame) se čuva u mapi koju UI daje (obično
+``st.session_state``) pod ključem id fajla + hash sadržaja: obrađuju se samo
+novi fajlovi, a uklonjeni se brišu (``retain``). Modul ne zavisi od Streamlit-a.
+"""
+import hashlib
+from typing import TYPE_CHECKING, Iterable, MutableMapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FileResult = Tuple[str, "pd.DataFrame"]
+
+
+def file_key(file_id: str, data: bytes) -> str:
+    """Ključ fajla: id (upload id ili putanja) + hash sadržaja - izmijenjen fajl pod istim imenom je novi unos"""
+    return f"{file_id}:{hashlib.sha256(data).hexdigest()[:16]}"
+
+
+class FileResults:
+    """Rezultati po ``file_key`` u ``state[namespace]``"""
+
+    def __init__(self, state: MutableMapping, namespace: str):
+        if namespace not in state:
+            state[namespace] = {}
+        self._results: dict = state[namespace]
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._results
+
+    def get(self, key: str) -> Optional[FileResult]:
+        return self._results.get(key)
+
+    def put(self, key: str, text: str, frame: "pd.DataFrame") -> None:
+        self._results[key] = (text, frame)
+
+    def retain(self, keys: Iterable[str]) -> int:
+        """Briše rezultate fajlova kojih više nema među ``keys``; vraća broj obrisanih"""
+        keep = set(keys)
+        stale = [k for k in self._results if k not in keep]
+        for k in stale:
+            del self._results[k]
+        return len(stale)
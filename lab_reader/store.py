@@ -0,0 +1,301 @@
+"""Trajna arhiva rezultata u Parquet formatu, particionisana po datumu, laboratoriji i pacijentu.
+
+Svaki obrađeni nalaz postaje jedan Parquet fajl u folderu particije
+(Hive raspored, kao što ga čitaju pyarrow, pandas, DuckDB, Spark)::
+
+    <root>/Datum=2024-06-15/Laboratorija=mojlab/Pacijent=3f1c0a9e2b7d4c51/part-<hash nalaza>.parquet
+
+Fajlovi se samo dodaju: postojeći fajl se nikad ne mijenja, osim što ponovna
+obrada istog nalaza (isti sadržaj fajla, isti hash) atomski zamijeni svoj
+fajl, pa ponovljeni batch ne duplira redove. Hash važi za cijelu arhivu:
+ako nalaz pri ponovnoj obradi završi u drugoj particiji (nalaz bez datuma
+obrađen drugog dana, izmijenjen parser), stari ``part-<hash>`` fajl iz
+prethodne particije se briše. Čitanje mjesec dana rezultata
+je filter nad particijama + čitanje samo traženih kolona, bez ponovnog
+parsiranja PDF-ova i bez učitavanja ogromnog CSV-a.
+
+Datum je datum uzorkovanja iz zaglavlja nalaza (ako ga nema, datum obrade),
+laboratorija je prepoznati format (lab_reader.formats) ili skraćeni naziv iz
+prve linije, a pacijent je skraćeni SHA-256 imena i datuma rođenja - ime se
+ne upisuje u putanju.
+
+Kolone su iste kao u CSV izvozu; Vrijednost je broj, a kvalitativni
+rezultat (Negativan, ...) je u koloni Vrijednost_tekst. Potreban je
+``pyarrow`` (``pip install pyarrow``). Lokacija:
+``LAB_READER_STORE_DIR`` (podrazumijevano ``~/.local/share/lab_reader/results``).
+"""
+import datetime
+import glob
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import uuid
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Optional
+
+from .formats import detect_format
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+PARTITION_COLUMNS = ["Datum", "Laboratorija", "Pacijent"]
+# (kolona, tip) - redom kao OUTPUT_COLUMNS iz batch-a, Vrijednost razdvojena na broj i tekst
+STORE_COLUMNS = [
+    ("Analit", "string"), ("Tip", "string"), ("Vrijednost", "float64"), ("Vrijednost_tekst", "string"),
+    ("Jedinica", "string"), ("Ref_low", "float64"), ("Ref_high", "float64"), ("Ref_tip", "string"),
+    ("Ref_kval", "string"), ("Flag", "string"), ("Status", "string"), ("Izvor", "string"),
+    ("Linija", "string"), ("Fajl", "string"),
+]
+UNKNOWN = "nepoznato"
+
+_DATE_RE = r"(\d{1,2})\.\s?(\d{1,2})\.\s?(\d{4})"
+_SAMPLED_RE = re.compile(rf"uzorkovanja\s*:?\s*{_DATE_RE}", re.IGNORECASE)
+_ANY_DATE_RE = re.compile(_DATE_RE)
+_BIRTH_RE = re.compile(rf"rođenja\s*:?\s*{_DATE_RE}", re.IGNORECASE)
+_NAME_RE = re.compile(r"Ime i prezime\s*:?\s*(.+?)(?:\s+Lab\.?\s*broj.*)?$", re.IGNORECASE | re.MULTILINE)
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def default_store_dir() -> str:
+    return os.environ.get("LAB_READER_STORE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".local", "share", "lab_reader", "results")
+
+
+class ReportInfo(NamedTuple):
+    date: str  # YYYY-MM-DD
+    lab: str
+    patient: str  # skraćeni hash imena + datuma rođenja, ili UNKNOWN
+    digest: str  # hash sadržaja fajla nalaza (ime Parquet fajla)
+
+
+def _slug(text: str, limit: int = 40) -> str:
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return _SLUG_RE.sub("-", text).strip("-")[:limit].strip("-")
+
+
+def _iso(match) -> Optional[str]:
+    day, month, year = (int(g) for g in match.groups())
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def report_lab(text: str) -> str:
+    """Laboratorija: poznati format (lab_reader.formats) ili prva linija zaglavlja kao slug"""
+    fmt = detect_format(text)
+    if fmt is not None:
+        return fmt.name
+    first = next((line for line in text.splitlines() if line.strip()), "")
+    return _slug(first) or UNKNOWN
+
+
+def report_info(text: str, file_bytes: bytes = b"", today: Optional[datetime.date] = None) -> ReportInfo:
+    """Particija nalaza iz teksta zaglavlja (prva stranica je dovoljna)"""
+    date = None
+    m = _SAMPLED_RE.search(text)
+    if m:
+        date = _iso(m)
+    if date is None:
+        birth = _BIRTH_RE.search(text)
+        for m in _ANY_DATE_RE.finditer(text):
+            if birth is None or m.start() != birth.start(1):
+                date = _iso(m)
+                if date:
+                    break
+    if date is None:
+        date = (today or datetime.date.today()).isoformat()
+
+    lab = report_lab(text)
+
+    patient = UNKNOWN
+    name = _NAME_RE.search(text)
+    if name:
+        # Redosljed imena ("FILIP, GORAN, ALIGRUDIĆ" / "Mihailo Đurović") ne mijenja hash
+        tokens = sorted(re.findall(r"\w+", name.group(1).lower()))
+        birth = _BIRTH_RE.search(text)
+        key = " ".join(tokens) + "|" + ((_iso(birth) or "") if birth else "")
+        patient = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    digest = hashlib.sha256(file_bytes).hexdigest()[:16] if file_bytes else uuid.uuid4().hex[:16]
+    return ReportInfo(date, lab, patient, digest)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet arhiva traži pyarrow: pip install pyarrow") from e
+
+
+def store_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in STORE_COLUMNS])
+
+
+def partition_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS])
+
+
+def to_arrow(df: "pd.DataFrame") -> "pa.Table":
+    """Rezultati (kolone kao OUTPUT_COLUMNS) -> Arrow tabela po STORE_COLUMNS"""
+    import pandas as pd
+    import pyarrow as pa
+
+    values = df["Vrijednost"] if "Vrijednost" in df.columns else pd.Series([None] * len(df), index=df.index)
+    numbers = pd.to_numeric(values, errors="coerce")
+    texts = values.astype(object).where(numbers.isna() & values.notna(), None)
+    columns = {"Vrijednost": numbers, "Vrijednost_tekst": texts}
+
+    arrays = []
+    for name, kind in STORE_COLUMNS:
+        col = columns.get(name)
+        if col is None:
+            col = df[name] if name in df.columns else pd.Series([None] * len(df), index=df.index)
+        if kind == "string":
+            col = col.astype(object).where(col.notna(), None)
+            col = col.map(lambda v: v if v is None or isinstance(v, str) else str(v))
+        arrays.append(pa.array(col.to_numpy(), type=getattr(pa, kind)(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=store_schema())
+
+
+def _text_values(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Kvalitativni rezultati (Vrijednost_tekst) nazad u Vrijednost - kolona je tada mješovita, kao kod parsera"""
+    df["Vrijednost"] = df["Vrijednost"].astype(object).where(df["Vrijednost"].notna(), df["Vrijednost_tekst"])
+    return df
+
+
+def frame_to_parquet(df: "pd.DataFrame") -> bytes:
+    """Rezultati jednog nalaza kao Parquet bajtovi (red poslova, lab_reader.jobs); vidi ``frame_from_parquet``"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Kolone i indeks rezultata parsera (redom) - tabela ima sve STORE_COLUMNS
+    layout = {"columns": list(df.columns), "index": df.index.tolist()}
+    table = to_arrow(df).replace_schema_metadata({"lab_reader": json.dumps(layout)})
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_parquet(data: bytes) -> "pd.DataFrame":
+    """DataFrame sa istim kolonama, indeksom i vrijednostima kao frame dat ``frame_to_parquet``"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(pa.BufferReader(data))
+    layout = json.loads(table.schema.metadata[b"lab_reader"])
+    df = _text_values(table.to_pandas())[layout["columns"]]
+    df.index = layout["index"]
+    return df
+
+
+class ResultStore:
+    """Particionisana Parquet arhiva (vidi opis modula)"""
+
+    def __init__(self, root: Optional[str] = None):
+        _require_pyarrow()
+        self.root = root or default_store_dir()
+
+    def partition_dir(self, info: ReportInfo) -> str:
+        return os.path.join(self.root, *(f"{k}={v}" for k, v in zip(PARTITION_COLUMNS, info[:3])))
+
+    def append(self, df: "pd.DataFrame", info: ReportInfo) -> str:
+        """Upisuje rezultate jednog nalaza kao novi fajl u njegovoj particiji; vraća putanju
+
+        Isti nalaz u drugim particijama (ranija obrada) se briše tek kad je novi
+        fajl upisan, pa nalaz ni u jednom trenutku ne nedostaje iz arhive.
+        """
+        import pyarrow.parquet as pq
+
+        folder = self.partition_dir(info)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"part-{info.digest}.parquet")
+        # Privremeni fajl počinje tačkom - dataset ga ne vidi dok nije gotov
+        tmp = os.path.join(folder, f".{info.digest}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            pq.write_table(to_arrow(df), tmp, compression="zstd")
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        for old in self._parts(info.digest):
+            if os.path.abspath(old) != os.path.abspath(path):
+                try:
+                    os.remove(old)
+                    # Prazni folderi stare particije se brišu da ih partitions() ne bi prijavio
+                    os.removedirs(os.path.dirname(old))
+                except OSError:
+                    pass
+        return path
+
+    def _parts(self, digest: str) -> List[str]:
+        """Fajlovi nalaza u svim particijama arhive"""
+        pattern = os.path.join(glob.escape(self.root), *["*"] * len(PARTITION_COLUMNS), f"part-{digest}.parquet")
+        return glob.glob(pattern)
+
+    def dataset(self):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(self.root, format="parquet", schema=_full_schema(),
+                          partitioning=ds.partitioning(partition_schema(), flavor="hive"))
+
+    def read(self, columns: Optional[List[str]] = None, start: Optional[str] = None, end: Optional[str] = None,
+             labs: Optional[Iterable[str]] = None, patients: Optional[Iterable[str]] = None,
+             analytes: Optional[Iterable[str]] = None, text_values: bool = False) -> "pd.DataFrame":
+        """Rezultati iz arhive: samo ``columns`` (sve ako je None), datum u [start, end] (YYYY-MM-DD)
+
+        Filteri po datumu/laboratoriji/pacijentu preskaču cijele particije, a
+        čitaju se samo tražene kolone. Sa ``text_values`` kvalitativni
+        rezultati se vraćaju u Vrijednost (kao kod parsera, kolona je tada
+        mješovita).
+        """
+        import pyarrow.dataset as ds
+
+        names = [f.name for f in _full_schema()]
+        if columns is None:
+            columns = names
+        unknown = [c for c in columns if c not in names]
+        if unknown:
+            raise ValueError(f"Nepoznate kolone: {', '.join(unknown)}")
+        if not os.path.isdir(self.root):
+            import pandas as pd
+            return pd.DataFrame(columns=columns)
+
+        expr = None
+        for cond in (
+            ds.field("Datum") >= start if start else None,
+            ds.field("Datum") <= end if end else None,
+            ds.field("Laboratorija").isin(list(labs)) if labs else None,
+            ds.field("Pacijent").isin(list(patients)) if patients else None,
+            ds.field("Analit").isin(list(analytes)) if analytes else None,
+        ):
+            if cond is not None:
+                expr = cond if expr is None else expr & cond
+
+        read_cols = list(columns)
+        if text_values and "Vrijednost" in read_cols and "Vrijednost_tekst" not in read_cols:
+            read_cols.append("Vrijednost_tekst")
+        df = self.dataset().to_table(columns=read_cols, filter=expr).to_pandas()
+        if text_values and "Vrijednost" in df.columns:
+            _text_values(df)
+            if "Vrijednost_tekst" not in columns:
+                df = df.drop(columns=["Vrijednost_tekst"])
+        return df
+
+    def partitions(self, column: str) -> List[str]:
+        """Vrijednosti jedne particije koje postoje u arhivi (iz imena foldera, bez čitanja fajlova)"""
+        level = PARTITION_COLUMNS.index(column)
+        pattern = os.path.join(glob.escape(self.root), *["*"] * level, f"{column}=*")
+        return sorted({os.path.basename(p).split("=", 1)[1] for p in glob.glob(pattern) if os.path.isdir(p)})
+
+
+def _full_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    return pa.schema(list(store_schema()) + list(partition_schema()))
@@ -0,0 +1,234 @@
+"""Ciljani parser (riječnik analita) iz app_v2.
+
+Za svaki naziv iz ANALYTE_CATALOG traži vrijednost, jedinicu i referencu u
+prozoru od WINDOW_CHARS znakova oko naziva - prvo desno, pa lijevo, pa u
+cijelom prozoru.
+
+Tekst se obrađuje u jednom prolazu: svi aliasi svih analita su u jednom
+Aho–Corasick automatu, a vrijednosti/jedinice/reference se pronađu jednom
+za cijeli tekst (indeks tokena), pa se za svaki pogodak samo binarnom
+pretragom uzme prvi token u prozoru. Rezultat je isti kao kad se za svaki
+analit kompajlira regex aliasa i pretražuju isječci oko svakog pogotka.
+"""
+import re
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from . import profiling
+from .common import NUM_RE, QUAL, RANGE, UNIT, NUM, clean_name_and_type, d2f, normalize_units, parse_ref
+from .dedup import best_positions
+from .frame import concat_results, results_frame, set_column, status_column
+from .matcher import KeywordMatcher
+from .parser import COLUMNS
+from .record import LabResult
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Sinonimi po laboratorijama/jezičkim varijantama; slobodno proširi
+ANALYTE_CATALOG = [
+    {"name": "Hemoglobin",      "aliases": ["Hemoglobin","Hb"]},
+    {"name": "Leukociti",       "aliases": ["Leukociti","Leukocite","WBC"]},
+    {"name": "Eritrociti",      "aliases": ["Eritrociti","Eritrocite","RBC","K-Eritrociti"]},
+    {"name": "Hematokrit",      "aliases": ["Hematokrit","HCT"]},
+    {"name": "Trombociti",      "aliases": ["Trombociti","PLT"]},
+    {"name": "Glukoza",         "aliases": ["Glukoza","Glucose"]},
+    {"name": "Urea",            "aliases": ["Urea"]},
+    {"name": "Kreatinin",       "aliases": ["Kreatinin","Creatinine"]},
+    {"name": "ALT",             "aliases": ["ALT","GPT"]},
+    {"name": "AST",             "aliases": ["AST","GOT"]},
+    {"name": "GGT",             "aliases": ["GGT","Gamma GT","Gamma-GT"]},
+    {"name": "Ukupni holesterol","aliases": ["Ukupni holesterol","Holesterol ukupni","Cholesterol total"]},
+    {"name": "HDL",             "aliases": ["HDL"]},
+    {"name": "LDL",             "aliases": ["LDL"]},
+    {"name": "Trigliceridi",    "aliases": ["Trigliceridi","Triglycerides","Trigl."]},
+    {"name": "Natrijum",        "aliases": ["Natrijum","Na"]},
+    {"name": "Kalijum",         "aliases": ["Kalijum","K"]},
+    {"name": "Kalcijum",        "aliases": ["Kalcijum","Ca"]},
+    {"name": "Neutrofili %",    "aliases": ["Neutrofili %","Neutrofili%","Neutrofili procenat","Neutrophils %"]},
+    {"name": "Neutrofili aps",  "aliases": ["Neutrofili aps","Neutrofili aps.","Neutrofili abs","Neutrophils abs"]},
+    {"name": "Limfociti %",     "aliases": ["Limfociti %","Lymphocytes %","Limfociti%"]},
+    {"name": "Limfociti aps",   "aliases": ["Limfociti aps","Lymphocytes abs","Limfociti aps."]},
+    {"name": "Monociti %",      "aliases": ["Monociti %","Monocytes %","Monociti%"]},
+    {"name": "Monociti aps",    "aliases": ["Monociti aps","Monocytes abs","Monociti aps."]},
+]
+
+# oko svakog “pogođenog” naziva gledamo susjedni prozor teksta i tražimo broj + (jedinicu) + (referencu)
+WINDOW_CHARS = 120  # koliko znakova lijevo/desno od naziva gledamo
+
+VAL_PAT   = re.compile(rf"(?P<val>{NUM}|{QUAL})")
+UNIT_PAT  = re.compile(rf"(?P<un>{UNIT})")
+RANGE_PAT = re.compile(rf"(?P<ref>{RANGE})")
+
+CatalogKey = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+def _fold(text: str) -> str:
+    """lower() koji čuva dužinu teksta (pozicije pogodaka ostaju iste kao u originalu)"""
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class _AliasIndex:
+    """Jedan automat nad aliasima svih analita iz kataloga"""
+
+    def __init__(self, catalog: CatalogKey):
+        self.names = [name for name, _ in catalog]
+        # alias (lowercase) -> [(indeks analita, redni broj aliasa)]
+        self.owners: Dict[str, List[Tuple[int, int]]] = {}
+        for item_idx, (_, aliases) in enumerate(catalog):
+            for alias_idx, alias in enumerate(aliases):
+                if alias:
+                    self.owners.setdefault(_fold(alias), []).append((item_idx, alias_idx))
+        self.matcher = KeywordMatcher(self.owners)
+
+    def hits(self, text: str) -> List[List[Tuple[int, int]]]:
+        """Za svaki analit lista (početak, kraj) pogodaka - isto što bi dao finditer nad
+        alternacijom njegovih aliasa: na istoj poziciji pobjeđuje raniji alias, bez preklapanja"""
+        candidates: List[List[Tuple[int, int, int]]] = [[] for _ in self.names]
+        for start, end, word in self.matcher.find_all(_fold(text)):
+            for item_idx, alias_idx in self.owners[word]:
+                candidates[item_idx].append((start, alias_idx, end))
+
+        result = []
+        for cands in candidates:
+            cands.sort()
+            spans, pos, last_start = [], 0, -1
+            for start, _, end in cands:
+                if start < pos or start == last_start:
+                    continue
+                spans.append((start, end))
+                pos, last_start = end, start
+            result.append(spans)
+        return result
+
+
+@lru_cache(maxsize=16)
+def _alias_index(catalog: CatalogKey) -> _AliasIndex:
+    return _AliasIndex(catalog)
+
+
+def catalog_key(catalog: List[Dict]) -> CatalogKey:
+    return tuple((item["name"], tuple(item["aliases"])) for item in catalog)
+
+
+class _TokenIndex:
+    """Sva poklapanja jednog patterna u tekstu, da prozori ne pretražuju tekst iznova"""
+
+    def __init__(self, pattern: "re.Pattern", text: str):
+        self.pattern = pattern
+        self.text = text
+        self.spans = [m.span() for m in pattern.finditer(text)]
+        self.starts = [s for s, _ in self.spans]
+
+    def first(self, a: int, b: int) -> str:
+        """Isto što i ``pattern.search(text[a:b])`` - prvi token u [a, b) ili ""
+
+        Token koji presijeca granicu prozora daje drugačiji (skraćen) rezultat
+        nego u cijelom tekstu, pa se tada pretražuje samo taj isječak.
+        """
+        i = bisect_left(self.starts, a)
+        if i > 0 and self.spans[i - 1][1] > a:
+            return self._search(a, b)
+        if i < len(self.spans):
+            start, end = self.spans[i]
+            if end <= b:
+                return self.text[start:end]
+            if start < b:
+                return self._search(a, b)
+        return ""
+
+    def _search(self, a: int, b: int) -> str:
+        m = self.pattern.search(self.text, a, b)
+        return m.group(0) if m else ""
+
+
+def targeted_parse(text: str, catalog: Optional[List[Dict]] = None) -> "pd.DataFrame":
+    import numpy as np
+    import pandas as pd
+
+    # Sa lab_reader.profiling: vrijeme po stavci kataloga, a zajednički dio (automat aliasa, indeksi tokena) posebno
+    table = profiling.pattern_table()
+    started = time.perf_counter() if table is not None else 0.0
+    index = _alias_index(catalog_key(ANALYTE_CATALOG if catalog is None else catalog))
+    values = _TokenIndex(VAL_PAT, text)
+    units = _TokenIndex(UNIT_PAT, text)
+    ranges = _TokenIndex(RANGE_PAT, text)
+    n = len(text)
+
+    rows = []
+    hits = index.hits(text)
+    if table is not None:
+        table.add("targeted:(aliasi i tokeni)", time.perf_counter() - started)
+    for name, spans in zip(index.names, hits):
+        if table is not None:
+            started, found = time.perf_counter(), len(rows)
+        for start, end in spans:
+            # Prioritet: prvo potraži broj/qual “desno” od naziva (češći raspored),
+            # pa lijevo, pa u cijelom prozoru
+            sides = (
+                (end, min(n, end + WINDOW_CHARS)),
+                (max(0, start - WINDOW_CHARS), start),
+                (max(0, start - WINDOW_CHARS), min(n, end + WINDOW_CHARS)),
+            )
+            val_raw = unit_raw = ref_raw = ""
+            for a, b in sides:
+                if not val_raw:
+                    val_raw = values.first(a, b)
+                if not unit_raw:
+                    unit_raw = units.first(a, b)
+                if not ref_raw:
+                    ref_raw = ranges.first(a, b)
+
+            # interpretiraj
+            clean_name, typ = clean_name_and_type(name, unit_raw or "")
+            unit = normalize_units(unit_raw or "")
+            v_num = d2f(val_raw) if NUM_RE.fullmatch(val_raw or "") else None
+            v_qual = val_raw if v_num is None and val_raw else None
+
+            ref_low, ref_high, ref_type, qual_ref = parse_ref(ref_raw)
+
+            # Only add if we have a meaningful result
+            if clean_name and (v_num is not None or v_qual):
+                # Status se računa nad kolonom, samo za redove koji ostanu; Linija je raspon naziva u tekstu
+                rows.append(LabResult(
+                    clean_name, v_num if v_num is not None else v_qual, unit, typ=typ,
+                    ref_low=ref_low, ref_high=ref_high, ref_type=ref_type, qual_ref=qual_ref,
+                    source="ciljani", text=text, start=start, end=end,
+                ))
+        if table is not None:
+            table.add(f"targeted:{name}", time.perf_counter() - started, len(rows) - found, len(spans))
+
+    if not rows:
+        return pd.DataFrame(columns=COLUMNS)
+    df = results_frame(rows, COLUMNS)
+
+    # Ako isti analit dobijemo više puta, zadrži najinformativniji (onaj koji ima i ref) - groupby-argmax
+    best = best_positions(df["Analit"].array, df[["Ref_low","Ref_high","Ref_tip"]].notna().sum(axis=1).to_numpy())
+    names = np.asarray(df["Analit"].array[best], dtype=object)
+    df = df.iloc[best[np.argsort(names, kind="stable")]]
+    set_column(df, "Status", status_column(df["Vrijednost"], df["Ref_low"], df["Ref_high"],
+                                           df["Ref_tip"], df["Ref_kval"]))
+    return df
+
+
+def merge_auto_target(text: str, catalog: Optional[List[Dict]] = None) -> "pd.DataFrame":
+    """Parser iz app_v2: ciljani rezultati + redovi auto parsera za (Analit, Tip) koje ciljani nije našao"""
+    import pandas as pd
+
+    from .auto import auto_parse
+
+    df_auto = auto_parse(text)
+    df_target = targeted_parse(text, catalog)
+    if not df_auto.empty and not df_target.empty:
+        # Ključevi (Analit, Tip) direktno iz kolona - bez set_index kopija oba frame-a
+        auto_keys = pd.MultiIndex.from_arrays([df_auto["Analit"], df_auto["Tip"]])
+        target_keys = pd.MultiIndex.from_arrays([df_target["Analit"], df_target["Tip"]])
+        return concat_results([df_target, df_auto[~auto_keys.isin(target_keys)]])
+    if not df_target.empty:
+        return df_target
+    return df_auto
@@ -0,0 +1,9 @@
+"""Sitne zajedničke pomoćne funkcije."""
+import os
+
+
+def default_workers() -> int:
+    """Broj jezgara dostupnih procesu (poštuje CPU affinity u kontejnerima)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
@@ -8,7 +8,7 @@ setup(
     author_email="micko@example.com",
     packages=find_packages(),
     install_requires=[
-        "streamlit>=1.50.0",
+        "streamlit>=1.52.0",
         "pandas>=2.0.0",
         "pdfplumber>=0.11.0",
         "PyPDF2>=3.0.0",
@@ -17,9 +17,13 @@ setup(
         "pytesseract>=0.3.13",
         "Pillow>=10.4.0",
     ],
+    extras_require={
+        "parquet": ["pyarrow>=14.0.0"],
+        "ocr": ["tesserocr>=2.6.0"],
+    },
     entry_points={
         "console_scripts": [
-            "lab-reader=app_v3:main",
+            "lab-reader=lab_reader.cli:main",
         ],
     },
     classifiers=[
@@ -27,10 +31,9 @@ setup(
         "Intended Audience :: Healthcare Industry",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
 )
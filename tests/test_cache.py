@@ -0,0 +1,26 @@
+import sqlite3
+
+from lab_reader.cache import ExtractionCache
+
+
+def test_per_page_methods_round_trip(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extract.sqlite3"))
+    cache.put("k", ["tekst", "sken"], ["native", "ocr"])
+    assert cache.get("k") == (["tekst", "sken"], ["native", "ocr"])
+
+
+def test_legacy_entries(tmp_path):
+    path = str(tmp_path / "extract.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE entries (key TEXT PRIMARY KEY, method TEXT NOT NULL, size INTEGER NOT NULL,
+                              last_access REAL NOT NULL);
+        CREATE TABLE pages (key TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, PRIMARY KEY (key, page));
+        INSERT INTO entries VALUES ('ocr', 'ocr', 1, 0), ('mixed', 'mixed', 1, 0);
+        INSERT INTO pages VALUES ('ocr', 0, 'a'), ('ocr', 1, 'b'), ('mixed', 0, 'a'), ('mixed', 1, 'b');
+    """)
+    conn.close()
+    cache = ExtractionCache(path)
+    # Metod cijelog dokumenta važi za svaku stranicu, osim "mixed" - takav unos se čita ponovo
+    assert cache.get("ocr") == (["a", "b"], ["ocr", "ocr"])
+    assert cache.get("mixed") is None
@@ -0,0 +1,13 @@
+import pytest
+
+from lab_reader.cli import build_arg_parser
+
+
+@pytest.mark.parametrize("argv", [["batch", "nalazi", "-j", "0"], ["worker", "-j", "-1"], ["serve", "-j", "dva"]])
+def test_workers_must_be_positive(argv):
+    with pytest.raises(SystemExit):
+        build_arg_parser().parse_args(argv)
+
+
+def test_workers_accepts_positive():
+    assert build_arg_parser().parse_args(["serve", "-j", "2"]).workers == 2
@@ -0,0 +1,61 @@
+import time
+
+from lab_reader.jobs import DONE, ERROR, JobQueue
+from lab_reader.parser import COLUMNS, LabResultParser
+
+TEXT = "Glukoza 5.1 mmol/L 3.9-5.9    Urea 4.2 mmol/L 2.5-7.5\nKreatinin 80 umol/L 62-106"
+
+
+def test_run_one_stores_file_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv("LAB_READER_CACHE", "0")
+    monkeypatch.setattr("lab_reader.pipeline.extract_text_from_image", lambda data, settings: TEXT)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit([("nalaz.png", b"png")], "v3")
+    assert queue.run_one()
+    assert [f.state for f in queue.files(job_id)] == [DONE]
+    text, df = queue.result(job_id, 0)
+    assert text == TEXT + "\n" and list(df.columns) == COLUMNS
+    assert df["Vrijednost"].tolist() == [5.1, 80.0, 4.2] and df.index.tolist() == [0, 2, 1]
+    [record] = queue.file_metrics(job_id)
+    assert record["file"] == "nalaz.png" and record["rows"] == 3
+    # Linije su rasponi koje parser prolazi (dvokolonski red je dvije linije), ne broj '\n'
+    assert record["counters"]["lines"] == len(list(LabResultParser().line_spans(TEXT))) == 3
+
+
+def test_resubmit_retries_failed_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("LAB_READER_CACHE", "0")
+
+    def missing_tesseract(data, settings):
+        raise RuntimeError("tesseract nije pronađen")
+
+    monkeypatch.setattr("lab_reader.pipeline.extract_text_from_image", missing_tesseract)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    files = [("nalaz.png", b"png")]
+    job_id = queue.submit(files, "v3", "posao")
+    assert queue.run_one()
+    assert [f.state for f in queue.files(job_id)] == [ERROR]
+
+    monkeypatch.setattr("lab_reader.pipeline.extract_text_from_image", lambda data, settings: TEXT)
+    assert queue.submit(files, "v3", "posao") == job_id
+    assert queue.run_one()
+    assert [(f.state, f.rows) for f in queue.files(job_id)] == [(DONE, 3)]
+
+
+def test_slow_file_is_not_reclaimed(tmp_path, monkeypatch):
+    monkeypatch.setenv("LAB_READER_CACHE", "0")
+    monkeypatch.setattr("lab_reader.jobs.HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr("lab_reader.jobs.STALE_SECONDS", 0.2)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    claims = []
+
+    def slow_ocr(data, settings):
+        # Jedna stranica traje duže od STALE_SECONDS - drugi radnik je ne smije uzeti
+        time.sleep(0.5)
+        claims.append(queue.claim("drugi"))
+        return TEXT
+
+    monkeypatch.setattr("lab_reader.pipeline.extract_text_from_image", slow_ocr)
+    job_id = queue.submit([("nalaz.png", b"png")], "v3")
+    assert queue.run_one()
+    assert claims == [None]
+    assert [f.state for f in queue.files(job_id)] == [DONE]
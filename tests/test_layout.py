@@ -0,0 +1,23 @@
+from lab_reader.auto import auto_parse
+from lab_reader.layout import CELL_SEP, Cells, split_cells
+from lab_reader.parser import LabResultParser
+from lab_reader.parser_v4 import LabResultParserV4
+
+TAB_LINE = "Glukoza\t5.5\tmmol/L\t3.3-6.1\tH"
+
+
+def test_tab_line_is_not_table_row():
+    # Pasted TSV / PyPDF2 / OCR lines with four tabs are plain text, not layout cells
+    assert split_cells(TAB_LINE) is None
+    assert LabResultParser().parse_text(TAB_LINE).empty
+    assert LabResultParserV4().parse_text(TAB_LINE).empty
+    df = auto_parse(TAB_LINE)
+    assert df.empty or df.iloc[0]["Vrijednost"] == 5.5
+
+
+def test_layout_cells_round_trip():
+    cells = Cells("Glukoza", "H", "6.8", "mmol/L", "3.9-5.9")
+    assert split_cells(cells.to_line()) == cells
+    assert CELL_SEP not in cells.text()
+    row = LabResultParser().parse_text(cells.to_line()).iloc[0]
+    assert (row["Analit"], row["Vrijednost"], row["Jedinica"], row["Flag"]) == ("Glukoza", 6.8, "mmol/L", "H")
@@ -0,0 +1,71 @@
+import pdfplumber
+import pytest
+from pdfplumber.utils.exceptions import PdfminerException
+
+from lab_reader import cache, pipeline, routing
+
+TEXT = "Glukoza 5.1 mmol/L 3.9-5.9"
+
+
+@pytest.fixture
+def extraction_cache(tmp_path, monkeypatch):
+    store = cache.ExtractionCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(pipeline, "get_default_cache", lambda: store)
+    return store
+
+
+def test_fallback_pages_are_not_cached(extraction_cache, monkeypatch):
+    def broken(*args, **kwargs):
+        raise PdfminerException("broken xref")
+
+    monkeypatch.setattr(pdfplumber, "open", broken)
+    monkeypatch.setattr(routing, "iter_pdf_pages_native", lambda data: iter([TEXT]))
+    pages = list(pipeline.iter_pages("nalaz.pdf", b"%PDF-1.4 broken", ocr=False))
+    assert [(p.text, p.method, p.fallback) for p in pages] == [(TEXT, "native", True)]
+    assert extraction_cache.stats()["entries"] == 0
+
+
+def test_unexpected_errors_are_not_swallowed(extraction_cache, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(pdfplumber, "open", broken)
+    with pytest.raises(RuntimeError):
+        list(pipeline.iter_pages("nalaz.pdf", b"%PDF-1.4", ocr=False))
+
+
+class _Page:
+    bbox = (0, 0, 100, 100)
+    images = curves = rects = []
+
+    def extract_text(self):
+        return TEXT
+
+    def close(self):
+        pass
+
+
+class _BrokenPdf:
+    """Prva stranica se čita, na drugoj pdfminer pukne"""
+
+    @property
+    def pages(self):
+        yield _Page()
+        raise PdfminerException("broken page")
+
+    def close(self):
+        pass
+
+
+def test_unreadable_rest_of_document_is_missing(extraction_cache, monkeypatch):
+    from PyPDF2.errors import PdfReadError
+
+    def unreadable(data, start):
+        raise PdfReadError("EOF marker not found")
+        yield
+
+    monkeypatch.setattr(pdfplumber, "open", lambda *args, **kwargs: _BrokenPdf())
+    monkeypatch.setattr(routing, "_pypdf2_pages", unreadable)
+    pages = list(pipeline.iter_pages("nalaz.pdf", b"%PDF-1.4", ocr=False, layout=False))
+    assert [(p.number, p.method, p.fallback) for p in pages] == [(0, "native", False), (1, "missing", True)]
+    assert extraction_cache.stats()["entries"] == 0
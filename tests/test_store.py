@@ -0,0 +1,21 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from lab_reader.store import ResultStore, report_info  # noqa: E402
+
+TEXT = "Ime i prezime: Petar Petrović\nGlukoza 5.1 mmol/L 3.9-5.9"
+
+
+def test_reprocessing_replaces_report_in_other_partition(tmp_path):
+    store = ResultStore(str(tmp_path))
+    df = pd.DataFrame({"Analit": ["Glukoza"], "Vrijednost": [5.1], "Fajl": ["nalaz.pdf"]})
+    # Nalaz bez datuma uzorkovanja: particija je datum obrade, koji se razlikuje između pokretanja
+    first = store.append(df, report_info(TEXT, b"pdf", today=datetime.date(2024, 6, 15)))
+    second = store.append(df, report_info(TEXT, b"pdf", today=datetime.date(2024, 6, 16)))
+    assert first != second
+    assert store.partitions("Datum") == ["2024-06-16"]
+    assert len(store.read()) == 1
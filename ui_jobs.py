@@ -0,0 +1,113 @@
+"""Zajednički Streamlit prikaz poslova u pozadini (lab_reader.jobs) za app_v3 i app_v4.
+
+Id posla je u ``st.session_state`` i u URL-u (``?job=``): posao se šalje u red
+samo kad se promijeni skup izabranih fajlova, a osvježena stranica nastavlja
+praćenje istog posla. Napredak se osvježava u fragmentu (``st.fragment`` sa
+``run_every``) - skripta se ponovo pokreće cijela samo kad neki fajl završi.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+from lab_reader.jobs import DONE, ERROR, RUNNING, JobQueue, job_id_for
+from lab_reader.session import FileResults, file_key
+
+
+@st.cache_resource
+def job_queue() -> JobQueue:
+    """Jedan red poslova i jedne radne niti po serveru, zajednički za sve sesije"""
+    queue = JobQueue()
+    queue.start_workers()
+    return queue
+
+
+def _finished(files) -> int:
+    return sum(f.state in (DONE, ERROR) for f in files)
+
+
+def current_job(files: Sequence, parser: str) -> Optional[str]:
+    """Id posla za izabrane fajlove; novi posao se pravi samo kad se skup fajlova promijeni
+
+    Fajlovi se čitaju i heširaju samo tada - ponovna pokretanja skripte (widget-i,
+    gotovi fajlovi) koriste id iz sesije. Bez fajlova ostaje posao iz sesije ili URL-a.
+    """
+    state = st.session_state.setdefault(f"{parser}_job", {})
+    if files:
+        selection = [(f.file_id, getattr(f, "size", None)) for f in files]
+        if state.get("selection") != selection:
+            payload = [(f.name, f.read()) for f in files]
+            job_id = job_id_for([file_key(f.file_id, data) for f, (_, data) in zip(files, payload)], parser)
+            job_queue().submit(payload, parser, job_id)
+            state.update(selection=selection, id=job_id)
+    elif "job" in st.query_params and st.query_params["job"] != state.get("id"):
+        state.update(selection=None, id=st.query_params["job"])
+    job_id = state.get("id")
+    if job_id is None or not job_queue().exists(job_id):
+        return None
+    st.query_params["job"] = job_id
+    return job_id
+
+
+def forget_job(parser: str) -> None:
+    """Obrada bez reda poslova - posao se više ne prati (ni u URL-u)"""
+    st.session_state.pop(f"{parser}_job", None)
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+@st.fragment(run_every=1)
+def _job_progress(job_id: str, finished: int) -> None:
+    """Napredak fajlova koji još nisu gotovi; kad neki završi, cijela skripta se ponovo pokreće"""
+    files = job_queue().files(job_id)
+    if _finished(files) != finished:
+        st.rerun()
+    st.progress(finished / max(len(files), 1), text=f"⏳ Posao {job_id}: {finished}/{len(files)} fajlova")
+    for f in files:
+        if f.state == RUNNING:
+            st.caption(f"📄 {f.name}: strana {f.pages} – {f.rows} analita do sada")
+        elif f.state not in (DONE, ERROR):
+            st.caption(f"🕓 {f.name}: čeka u redu")
+
+
+def show_job(job_id: str, parser: str, preview: bool = False,
+             file_column: bool = False) -> Tuple[List, int, List[Dict]]:
+    """Rezultati gotovih fajlova i napredak ostalih; vraća (DataFrame-ovi, broj fajlova u poslu,
+    vremena obrade gotovih fajlova za panel lab_reader.metrics)
+
+    ``preview`` prikazuje izvučeni tekst, ``file_column`` dodaje kolonu ``Fajl``.
+    """
+    queue = job_queue()
+    files = queue.files(job_id)
+    finished = _finished(files)
+    if finished < len(files):
+        _job_progress(job_id, finished)
+    else:
+        st.progress(1.0, text=f"✅ Posao {job_id}: {finished}/{len(files)} fajlova")
+    # Gotovi rezultati se čitaju iz baze samo jednom po sesiji
+    results = FileResults(st.session_state, f"{parser}_job_results")
+    frames, keys = [], []
+    for f in files:
+        if f.state == ERROR:
+            st.error(f"❌ {f.name}: {f.error}")
+        elif f.state == DONE:
+            key = f"{job_id}:{f.index}"
+            keys.append(key)
+            cached = results.get(key)
+            if cached is None:
+                cached = queue.result(job_id, f.index)
+                results.put(key, *cached)
+            text, df = cached
+            if not text.strip():
+                st.error(f"❌ {f.name}: Nije moguće izvući tekst.")
+                continue
+            if preview:
+                with st.expander(f"📄 Tekst: {f.name}"):
+                    st.text_area("", text, height=200)
+            if df.empty:
+                st.warning(f"⚠️ {f.name}: Nije prepoznat nijedan red.")
+                continue
+            if file_column:
+                df = df.assign(Fajl=f.name)  # frame iz sesije se ne mijenja
+            frames.append(df)
+    results.retain(keys)
+    return frames, len(files), queue.file_metrics(job_id) if finished else []